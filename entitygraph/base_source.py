@@ -1,5 +1,14 @@
 #!/usr/bin/env python
 import abc
+import inspect
+import typing
+
+import pandas as pd
+import pyarrow
+
+from entitygraph.cache import SampleCache
+from entitygraph.column_catalog import ColumnCatalog
+from entitygraph.entity import Entity
 
 class BaseSource(metaclass=abc.ABCMeta):
     @abc.abstractmethod
@@ -21,3 +30,172 @@ class BaseSource(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def get_sample(self, n):
         raise NotImplementedError('`get_sample` must be implemented')
+
+    def get_sample_cache(self) -> SampleCache:
+        """
+The sample cache shared by every entity of this source
+        """
+        if getattr(self, '_sample_cache', None) is None:
+            self._sample_cache = SampleCache()
+        return self._sample_cache
+
+    def set_sample_cache(self, cache : SampleCache):
+        self._sample_cache = cache
+
+    def get_cached_sample(self,
+            entity,
+            n : int = 100,
+            columns : typing.Optional[typing.List[str]] = None,
+            as_arrow : bool = False,
+            **kwargs
+            ) -> typing.Union[pd.DataFrame, pyarrow.Table]:
+        """
+`get_sample` through the source's sample cache, keyed by
+(entity identifier, n, columns) and any other sampling arguments, samples
+are requested as Arrow from sources whose `get_sample` takes `as_arrow`
+and cached as Arrow
+        """
+        cache = self.get_sample_cache()
+        key = (entity.identifier, n, tuple(columns) if columns else None) + tuple(
+                (k, repr(v)) for k, v in sorted(kwargs.items()))
+        table = cache.get(key)
+        if table is None:
+            parameters = inspect.signature(self.get_sample).parameters
+            if 'as_arrow' in parameters or any(p.kind == p.VAR_KEYWORD for p in parameters.values()):
+                kwargs['as_arrow'] = True
+            sample = self.get_sample(entity, n=n, columns=columns, **kwargs)
+            table = sample if isinstance(sample, pyarrow.Table) else pyarrow.Table.from_pandas(sample, preserve_index=False)
+            cache.put(key, table)
+        return table if as_arrow else table.to_pandas()
+
+    def fingerprint(self) -> str:
+        """
+Stable identifier of what this source reads, used to key its entries in
+a `MetadataCatalog`
+        """
+        raise NotImplementedError('`fingerprint` must be implemented to use a catalog')
+
+    def get_entity_states(self) -> dict:
+        """
+Cheap change tokens of every entity, identifier -> state str
+        """
+        raise NotImplementedError('`get_entity_states` must be implemented to use a catalog')
+
+    def load_entities(self, identifiers : typing.List[str]) -> list:
+        """
+Reads the full metadata of only the given entities
+        """
+        raise NotImplementedError('`load_entities` must be implemented to use a catalog')
+
+    def get_config(self) -> dict:
+        """
+Json serializable constructor arguments of this source, without secrets,
+used to reconnect to it from a saved graph
+        """
+        raise NotImplementedError('`get_config` must be implemented to save a graph')
+
+    def get_worker_config(self) -> dict:
+        """
+Constructor arguments to reopen this source in a worker process, unlike
+`get_config` it may carry credentials, so it's only ever sent to workers
+and never written out
+        """
+        return self.get_config()
+
+    @classmethod
+    def from_config(cls, config : dict, **kwargs):
+        """
+A source from `get_config` output, `kwargs` supply or override arguments
+such as credentials
+        """
+        return cls(**{**config, **kwargs})
+
+    def iter_batches(self,
+            entity,
+            columns : typing.Optional[typing.List[str]] = None,
+            batch_size : int = 65536
+            ) -> typing.Iterator[pyarrow.RecordBatch]:
+        """
+Streams every row of an entity as Arrow record batches, so a full scan
+holds at most one batch in memory
+        """
+        raise NotImplementedError('`iter_batches` must be implemented to scan entities')
+
+    def get_row_estimates(self) -> dict:
+        """
+Estimated number of rows of entities keyed by identifier, entities
+without an estimate are left out
+        """
+        return {}
+
+    def get_key_constraints(self) -> dict:
+        """
+Declared primary keys and unique constraints keyed by identifier, a list
+of (`p` or `u`, key) per entity with a key a column name or a tuple of
+column names, entities without any are left out
+        """
+        return {}
+
+    def get_statistics(self) -> dict:
+        """
+Planner statistics of entities keyed by identifier, a `stats.TableStats`
+per entity read from the source's catalog without scanning any data,
+entities without statistics are left out
+        """
+        return {}
+
+    def set_entities(self, entities : typing.List[Entity]):
+        self._entities = list(entities)
+        self._column_catalog = None
+        self._row_estimates = None
+        self._key_constraints = None
+        self._statistics = None
+
+    def get_column_catalog(self) -> ColumnCatalog:
+        """
+Columnar catalog of every column of this source's entities
+        """
+        if getattr(self, '_column_catalog', None) is None:
+            self._column_catalog = ColumnCatalog.from_entities(self.get_entities())
+        return self._column_catalog
+
+    def sync_catalog(self, catalog) -> typing.Tuple[list, list]:
+        """
+Populates this source's entities from a `MetadataCatalog`, re-reading only
+the entities whose state changed since they were cataloged, and writes
+the changes back
+
+Returns the (changed, removed) identifiers
+        """
+        fingerprint = self.fingerprint()
+        states = self.get_entity_states()
+        cached = catalog.load_entities(fingerprint)
+        changed = [
+            identifier for identifier, state in states.items()
+            if identifier not in cached or cached[identifier][0] != state
+        ]
+        removed = [identifier for identifier in cached if identifier not in states]
+        fresh = {ent.identifier: ent for ent in self.load_entities(changed)}
+        entities = []
+        for identifier in sorted(states):
+            ent = fresh.get(identifier)
+            if ent is None:
+                # changed but gone by the time it was read
+                if identifier not in cached:
+                    continue
+                state, columns, column_type_map, nullable, pk = cached[identifier]
+                ent = Entity(
+                        source=self,
+                        identifier=identifier,
+                        columns=columns,
+                        column_type_map=column_type_map,
+                        nullable=nullable)
+                ent.pk = pk
+            entities.append(ent)
+        self.set_entities(entities)
+        catalog.save_entities(
+                fingerprint,
+                ((ent.identifier, states[ent.identifier], ent.columns, ent.column_type_map, ent.nullable, ent.pk)
+                    for ent in fresh.values()),
+                removed)
+        return changed, removed
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""
+Caches shared by the entities of a source
+"""
+
+# python standard libraries
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+import typing
+import weakref
+
+# third party libraries
+import pyarrow
+import pyarrow.ipc
+
+
+def _remove_spilled(spilled : dict):
+    for path in list(spilled.values()):
+        if os.path.exists(path):
+            os.remove(path)
+    spilled.clear()
+
+
+class SampleCache:
+    def __init__(self,
+            max_bytes : int = 256 * 1024 * 1024,
+            spill_dir : typing.Optional[str] = None
+            ):
+        """
+LRU cache of entity samples as `pyarrow.Table`s bounded by a byte budget
+
+Samples evicted from memory are spilled to Arrow IPC files and memory
+mapped back on their next hit, so repeated passes over many entities hit
+memory or local disk rather than the source. Spill files are written
+outside the cache's lock and removed when the cache is cleared, garbage
+collected or the process exits
+
+max_bytes: int of in memory sample bytes before the least recently used
+    samples are spilled
+spill_dir: str of the directory to spill to, a temporary directory is
+    created on the first spill when not given
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        # evicted samples still being written out, served from memory
+        self._spilling = {}
+        self._spilled = {}
+        self._tmpdir = None
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _remove_spilled, self._spilled)
+
+    def __len__(self):
+        return len(self._entries) + len(self._spilling) + len(self._spilled)
+
+    def __contains__(self, key):
+        return key in self._entries or key in self._spilling or key in self._spilled
+
+    def get(self, key) -> typing.Optional[pyarrow.Table]:
+        with self._lock:
+            table = self._entries.get(key)
+            if table is not None:
+                self._entries.move_to_end(key)
+                return table
+            table = self._spilling.get(key)
+            if table is not None:
+                return table
+            path = self._spilled.get(key)
+        if path is None:
+            return None
+        # zero copy, the pages are read in lazily by the OS
+        with pyarrow.memory_map(path) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+
+    def put(self, key, table : pyarrow.Table):
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            # a spilled copy of the key is stale now
+            self._spilling.pop(key, None)
+            stale = self._spilled.pop(key, None)
+            self._entries[key] = table
+            self.nbytes += table.nbytes
+            while self.nbytes > self.max_bytes and self._entries:
+                evicted_key, evicted_table = self._entries.popitem(last=False)
+                self.nbytes -= evicted_table.nbytes
+                if evicted_key in self._spilled or evicted_key in self._spilling:
+                    continue
+                self._spilling[evicted_key] = evicted_table
+                evicted.append((evicted_key, evicted_table))
+            if evicted and not self.spill_dir:
+                self._tmpdir = tempfile.TemporaryDirectory(prefix='entitygraph-samples-')
+                self.spill_dir = self._tmpdir.name
+        if stale is not None and os.path.exists(stale):
+            os.remove(stale)
+        # disk writes don't hold up other samplers
+        for evicted_key, evicted_table in evicted:
+            self._spill(evicted_key, evicted_table)
+
+    def _spill(self, key, table : pyarrow.Table):
+        path = os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.arrow')
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        with self._lock:
+            if self._spilling.pop(key, None) is not None:
+                self._spilled[key] = path
+                return
+        # cleared while it was written
+        os.remove(path)
+
+    def clear(self):
+        """
+Drops every sample, in memory and spilled
+        """
+        with self._lock:
+            _remove_spilled(self._spilled)
+            self._entries.clear()
+            self._spilling.clear()
+            self.nbytes = 0
+
+
+class LRUCache:
+    def __init__(self, maxsize : int = 4096):
+        """
+Thread safe least recently used cache bounded by a number of entries
+
+maxsize: int of entries kept
+        """
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,8 +1,107 @@
 #!/usr/bin/env python
 import enum
+import typing
+
+import pyarrow
+import pyarrow.compute as pc
 
 class RelationalCardinality(enum.Enum):
     one_to_one = 'one_to_one'
     one_to_many = 'one_to_many'
     many_to_one = 'many_to_one'
     many_to_many = 'many_to_many'
+
+    def reverse(self) -> 'RelationalCardinality':
+        """
+The same relationship read from the other side
+        """
+        return _REVERSED[self]
+
+    @classmethod
+    def from_uniqueness(cls, unique1 : bool, unique2 : bool) -> 'RelationalCardinality':
+        if unique1 and unique2:
+            return cls.one_to_one
+        if unique1:
+            return cls.one_to_many
+        if unique2:
+            return cls.many_to_one
+        return cls.many_to_many
+
+
+_REVERSED = {
+    RelationalCardinality.one_to_one: RelationalCardinality.one_to_one,
+    RelationalCardinality.one_to_many: RelationalCardinality.many_to_one,
+    RelationalCardinality.many_to_one: RelationalCardinality.one_to_many,
+    RelationalCardinality.many_to_many: RelationalCardinality.many_to_many,
+}
+
+
+def key_columns(key : typing.Union[str, tuple]) -> list:
+    return [key] if isinstance(key, str) else list(key)
+
+
+def key_values(table : pyarrow.Table, key : typing.Union[str, tuple]) -> pyarrow.Array:
+    """
+Values of a join key in a sample, multi-column keys are joined into one
+string per row and a row with any null column is null
+    """
+    arrays = []
+    for column in key_columns(key):
+        array = table.column(column).combine_chunks()
+        if pyarrow.types.is_dictionary(array.type):
+            array = array.dictionary_decode()
+        arrays.append(array)
+    if len(arrays) == 1:
+        return arrays[0]
+    return pc.binary_join_element_wise(*[pc.cast(a, pyarrow.string()) for a in arrays], '\x1f')
+
+
+def _is_numeric(data_type : pyarrow.DataType) -> bool:
+    return (pyarrow.types.is_integer(data_type)
+        or pyarrow.types.is_floating(data_type)
+        or pyarrow.types.is_decimal(data_type))
+
+
+def comparable(values1 : pyarrow.Array, values2 : pyarrow.Array) -> typing.Tuple[pyarrow.Array, pyarrow.Array]:
+    """
+Casts two key value arrays to a common type, numbers to float64 and
+anything else to strings
+    """
+    if values1.type == values2.type:
+        return values1, values2
+    if _is_numeric(values1.type) and _is_numeric(values2.type):
+        common = pyarrow.float64()
+    else:
+        common = pyarrow.string()
+    return pc.cast(values1, common), pc.cast(values2, common)
+
+
+class KeyProfile:
+    __slots__ = ('count', 'distinct')
+
+    def __init__(self, values : pyarrow.Array):
+        """
+Hash based profile of a join key in a sample: its non null count and
+distinct values
+
+values: `pyarrow.Array` of the key's values, see `key_values`
+        """
+        values = values.drop_null()
+        self.count = len(values)
+        self.distinct = pc.unique(values)
+
+    @property
+    def uniqueness(self) -> float:
+        """
+Distinct values per non null value, 1.0 for a key without repeats
+        """
+        return len(self.distinct) / self.count if self.count else 0.0
+
+    def overlap(self, other : 'KeyProfile') -> int:
+        """
+Number of distinct values of this key also found in `other`
+        """
+        if not len(self.distinct) or not len(other.distinct):
+            return 0
+        values, value_set = comparable(self.distinct, other.distinct)
+        return pc.sum(pc.is_in(values, value_set=value_set)).as_py() or 0
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""
+On disk catalog of entity metadata and inferred edges, so graphs can be
+rebuilt across runs by re-reading only the entities that changed
+"""
+
+# python standard libraries
+import enum
+import json
+import sqlite3
+import typing
+
+
+# columns of the entities table added after its first release
+ENTITY_COLUMNS = ('nullable', 'pk')
+
+
+def _encode(obj):
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError(f'Cannot encode {obj!r} in the catalog')
+
+
+def _encode_key(key) -> typing.Optional[str]:
+    if key is None:
+        return None
+    return json.dumps(key if isinstance(key, str) else list(key))
+
+
+def _decode_key(value : typing.Optional[str]):
+    # json has no tuples, multi-column keys come back as lists
+    key = json.loads(value) if value is not None else None
+    return tuple(key) if isinstance(key, list) else key
+
+
+class MetadataCatalog:
+    def __init__(self, path : str):
+        """
+SQLite backed catalog of entities, their columns and types, a state
+token per entity (file mtime and size, relation OID and row version) and
+the edges inferred between them, all keyed by a source fingerprint
+
+path: str of the SQLite database file
+        """
+        self.path = path
+        self._conn = None
+
+    def get_connection(self) -> sqlite3.Connection:
+        if not self._conn:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                fingerprint TEXT NOT NULL,
+                identifier TEXT NOT NULL,
+                state TEXT NOT NULL,
+                columns TEXT NOT NULL,
+                column_types TEXT NOT NULL,
+                nullable TEXT,
+                pk TEXT,
+                PRIMARY KEY (fingerprint, identifier)
+            );
+            CREATE TABLE IF NOT EXISTS edges (
+                fingerprint TEXT NOT NULL,
+                n1 TEXT NOT NULL,
+                n2 TEXT NOT NULL,
+                attr TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS edges_fingerprint ON edges (fingerprint);
+            CREATE TABLE IF NOT EXISTS graphs (
+                fingerprint TEXT PRIMARY KEY
+            );
+            """)
+            # catalogs written before a column existed get it added
+            existing = {row[1] for row in self._conn.execute('PRAGMA table_info(entities)')}
+            for column in ENTITY_COLUMNS:
+                if column not in existing:
+                    self._conn.execute(f'ALTER TABLE entities ADD COLUMN {column} TEXT')
+        return self._conn
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def load_entities(self, fingerprint : str) -> dict:
+        """
+Cached entities of a source
+
+Returns a dict of identifier -> (state, columns, column type map,
+nullable, pk), nullable a list of bools aligned with the columns or None
+and pk the elected primary key or None
+        """
+        rows = self.get_connection().execute(
+                'SELECT identifier, state, columns, column_types, nullable, pk FROM entities WHERE fingerprint = ?',
+                (fingerprint,))
+        return {
+            identifier : (state, json.loads(columns), json.loads(column_types), json.loads(nullable or 'null'), _decode_key(pk))
+            for identifier, state, columns, column_types, nullable, pk in rows
+        }
+
+    def save_entities(self,
+            fingerprint : str,
+            entities : typing.Iterable[tuple],
+            removed : typing.Iterable[str] = ()
+            ):
+        """
+Upserts (identifier, state, columns, column type map, nullable, pk) rows
+and drops the `removed` identifiers
+        """
+        con = self.get_connection()
+        with con:
+            con.executemany(
+                    'INSERT OR REPLACE INTO entities '
+                    '(fingerprint, identifier, state, columns, column_types, nullable, pk) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    ((fingerprint, identifier, state, json.dumps(list(columns)), json.dumps(dict(types)),
+                        json.dumps(list(nullable) if nullable is not None else None), _encode_key(pk))
+                        for identifier, state, columns, types, nullable, pk in entities))
+            con.executemany(
+                    'DELETE FROM entities WHERE fingerprint = ? AND identifier = ?',
+                    ((fingerprint, identifier) for identifier in removed))
+
+    def save_pks(self, fingerprint : str, pks : dict):
+        """
+Updates the elected primary keys of cataloged entities, identifier -> pk,
+keys are elected once the graph is built, after the entities were saved
+        """
+        con = self.get_connection()
+        with con:
+            con.executemany(
+                    'UPDATE entities SET pk = ? WHERE fingerprint = ? AND identifier = ?',
+                    ((_encode_key(pk), fingerprint, identifier) for identifier, pk in pks.items()))
+
+    def has_edges(self, fingerprint : str) -> bool:
+        """
+Whether edges were saved for this source, which can legitimately be none
+        """
+        row = self.get_connection().execute(
+                'SELECT 1 FROM graphs WHERE fingerprint = ?', (fingerprint,)).fetchone()
+        return row is not None
+
+    def load_edges(self, fingerprint : str) -> list:
+        """
+Cached edges of a source as (identifier, identifier, attr) tuples
+        """
+        rows = self.get_connection().execute(
+                'SELECT n1, n2, attr FROM edges WHERE fingerprint = ? ORDER BY rowid', (fingerprint,))
+        edges = []
+        for n1, n2, attr in rows:
+            attr = json.loads(attr)
+            # json has no tuples, multi-column keys come back as lists
+            for k, v in attr.items():
+                if k.endswith('_key') and isinstance(v, list):
+                    attr[k] = tuple(v)
+            edges.append((n1, n2, attr))
+        return edges
+
+    def save_edges(self, fingerprint : str, edges : typing.Iterable[tuple]):
+        """
+Replaces the cached edges of a source with (identifier, identifier, attr) tuples
+        """
+        con = self.get_connection()
+        with con:
+            con.execute('DELETE FROM edges WHERE fingerprint = ?', (fingerprint,))
+            con.executemany(
+                    'INSERT INTO edges VALUES (?, ?, ?, ?)',
+                    ((fingerprint, n1, n2, json.dumps(attr, default=_encode)) for n1, n2, attr in edges))
+            con.execute('INSERT OR REPLACE INTO graphs VALUES (?)', (fingerprint,))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+"""
+Columnar catalog of every column of every entity in a source
+"""
+
+# python standard libraries
+import typing
+
+# third party libraries
+import pyarrow
+import pyarrow.compute as pc
+
+# internal libs
+from entitygraph.types import type_family
+
+
+class ColumnCatalog:
+    schema = pyarrow.schema([
+        ('entity', pyarrow.string()),
+        ('column', pyarrow.string()),
+        ('ordinal', pyarrow.int32()),
+        ('arrow_type', pyarrow.string()),
+        ('type_family', pyarrow.string()),
+        ('nullable', pyarrow.bool_()),
+    ])
+
+    def __init__(self, table : pyarrow.Table, entities : typing.Optional[dict] = None):
+        """
+One Arrow table of (entity, column, ordinal, arrow type, type family,
+nullable) so questions like "every entity with an integer `customer_id`"
+are vectorized `pyarrow.compute` filters instead of loops over entities
+
+table: `pyarrow.Table` with `ColumnCatalog.schema`
+entities: optional dict of identifier -> `Entity` to resolve results
+        """
+        self.table = table
+        self.entities = entities or {}
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @classmethod
+    def from_entities(cls, entities : typing.Iterable) -> 'ColumnCatalog':
+        entity_ids, columns, ordinals, types, nullables = [], [], [], [], []
+        index = {}
+        for ent in entities:
+            index[ent.identifier] = ent
+            type_map = ent.column_type_map
+            nullable = ent.nullable or (None,) * len(ent.columns)
+            entity_ids.extend([ent.identifier] * len(ent.columns))
+            columns.extend(ent.columns)
+            ordinals.extend(range(1, len(ent.columns) + 1))
+            types.extend(type_map.get(c) for c in ent.columns)
+            nullables.extend(nullable)
+        # families are computed once per distinct type name
+        families = {t: type_family(t) for t in set(types) if t is not None}
+        table = pyarrow.table([
+            pyarrow.array(entity_ids, pyarrow.string()),
+            pyarrow.array(columns, pyarrow.string()),
+            pyarrow.array(ordinals, pyarrow.int32()),
+            pyarrow.array(types, pyarrow.string()),
+            pyarrow.array([families.get(t) for t in types], pyarrow.string()),
+            pyarrow.array(nullables, pyarrow.bool_()),
+        ], schema=cls.schema)
+        return cls(table, index)
+
+    def mask(self,
+            name : typing.Optional[typing.Union[str, typing.List[str]]] = None,
+            pattern : typing.Optional[str] = None,
+            arrow_type : typing.Optional[str] = None,
+            family : typing.Optional[str] = None,
+            nullable : typing.Optional[bool] = None,
+            entity : typing.Optional[str] = None
+            ) -> pyarrow.ChunkedArray:
+        """
+Boolean mask of the rows matching every given criterion
+
+name: str or list of str of exact column names
+pattern: str regex column names must match
+arrow_type: str of an arrow type name, e.g. `int64`
+family: str of a type family, e.g. `integer`, see `entitygraph.types.type_family`
+nullable: bool of the column's nullability
+entity: str regex entity identifiers must match
+        """
+        table = self.table
+        # every row, entities are never null
+        mask = pc.is_valid(table['entity'])
+        conditions = []
+        if name is not None:
+            names = [name] if isinstance(name, str) else list(name)
+            conditions.append(pc.is_in(table['column'], value_set=pyarrow.array(names, pyarrow.string())))
+        if pattern is not None:
+            conditions.append(pc.match_substring_regex(table['column'], pattern))
+        if arrow_type is not None:
+            conditions.append(pc.equal(table['arrow_type'], arrow_type))
+        if family is not None:
+            conditions.append(pc.equal(table['type_family'], family))
+        if nullable is not None:
+            conditions.append(pc.equal(table['nullable'], nullable))
+        if entity is not None:
+            conditions.append(pc.match_substring_regex(table['entity'], entity))
+        for condition in conditions:
+            mask = pc.and_kleene(mask, condition)
+        # nulls, e.g. an unknown type, never match
+        return pc.fill_null(mask, False)
+
+    def find_columns(self, **criteria) -> pyarrow.Table:
+        """
+Rows of the catalog matching every criterion, see `mask`
+        """
+        return self.table.filter(self.mask(**criteria))
+
+    def find_entities(self, **criteria) -> list:
+        """
+Entities with at least one column matching every criterion, see `mask`
+        """
+        identifiers = pc.unique(self.find_columns(**criteria)['entity']).to_pylist()
+        return [self.entities.get(identifier, identifier) for identifier in identifiers]
+
+    def column_counts(self) -> pyarrow.Table:
+        """
+Number of entities having each column name, most common first
+        """
+        counts = self.table.group_by('column').aggregate([('entity', 'count_distinct')])
+        return counts.sort_by([('entity_count_distinct', 'descending')])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+Date key detection: columns typed as dates or timestamps in the catalog,
+and string columns whose sampled values parse as dates, probed for every
+entity at once
+"""
+
+# python standard libraries
+import functools
+import re
+import typing
+
+# third party libraries
+import numpy as np
+import pyarrow
+import pyarrow.compute as pc
+
+# internal libs
+from entitygraph.types import postgres_arrow_type_name, type_family
+
+
+# formats probed on the first 10 characters of string values, so times,
+# fractions and offsets after an ISO date don't matter
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y', '%d.%m.%Y')
+
+# warehouse type names such as Snowflake's `TIMESTAMP_NTZ` or `DATETIME`
+_WAREHOUSE_DATE = re.compile(r'^(date|datetime|timestamp)', re.IGNORECASE)
+# warehouse numeric type names such as `NUMBER(38,0)`, `INT64` or `FLOAT8`,
+# which Postgres doesn't know and would otherwise be probed as strings
+_WAREHOUSE_NUMERIC = re.compile(
+        r'^(number|numeric|decimal|dec|fixed|(big|small|tiny|byte)?int(eger)?\d*|float\d*|double|real)\b',
+        re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=None)
+def date_type_kind(type_name : typing.Optional[str]) -> typing.Optional[str]:
+    """
+How a column type relates to dates: `date` for date and timestamp types,
+`probe` for strings and untyped columns whose values may hold dates, None
+otherwise. Arrow, Postgres and common warehouse type names are understood
+    """
+    if type_name is None:
+        return 'probe'
+    arrow_type = type_name
+    family = type_family(arrow_type)
+    if family == 'other':
+        if _WAREHOUSE_NUMERIC.match(type_name.strip()):
+            return None
+        arrow_type = postgres_arrow_type_name(type_name)
+        family = type_family(arrow_type)
+        if family == 'string' and _WAREHOUSE_DATE.match(type_name):
+            return 'date'
+    if family == 'temporal':
+        # times of day and intervals don't place a row in time
+        return 'date' if arrow_type.startswith(('date', 'timestamp')) else None
+    if family == 'string':
+        return 'probe'
+    return None
+
+
+def _as_strings(column : typing.Union[pyarrow.Array, pyarrow.ChunkedArray]) -> pyarrow.Array:
+    if isinstance(column, pyarrow.ChunkedArray):
+        column = column.combine_chunks()
+    if pyarrow.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    if not pyarrow.types.is_string(column.type):
+        column = pc.cast(column, pyarrow.string())
+    return column
+
+
+def probe_dates(
+        columns : typing.List[pyarrow.Array],
+        min_share : float = 0.9,
+        probe_rows : int = 256
+        ) -> np.ndarray:
+    """
+Which string columns hold dates, every column is probed at once: the
+first `probe_rows` values of the columns are concatenated, each format is
+parsed over all of them in one vectorized call and the parsed values are
+summed per column
+
+A column holds dates when one format parses at least `min_share` of its
+non null values, columns without values don't
+
+Returns a bool array aligned with `columns`
+    """
+    if not columns:
+        return np.zeros(0, dtype=bool)
+    arrays = [_as_strings(column[:probe_rows]) for column in columns]
+    lengths = np.array([len(a) for a in arrays])
+    values = pc.utf8_slice_codeunits(pyarrow.concat_arrays(arrays), 0, 10)
+    present = np.array([len(a) - a.null_count for a in arrays])
+    holds_dates = np.zeros(len(arrays), dtype=bool)
+    owner = np.repeat(np.arange(len(arrays)), lengths)
+    # every format starts with a digit, a cheap check that rules out most
+    # columns that aren't dates before any parsing
+    digits = pc.fill_null(pc.utf8_is_digit(pc.utf8_slice_codeunits(values, 0, 1)), False)
+    digits = np.bincount(owner, weights=digits.to_numpy(zero_copy_only=False), minlength=len(arrays))
+    candidates = (present > 0) & (digits >= min_share * present)
+    for date_format in DATE_FORMATS:
+        # columns already holding dates are not parsed again
+        pending = ~holds_dates & candidates
+        if not pending.any():
+            break
+        rows = pending[owner]
+        parsed = pc.is_valid(pc.strptime(values.filter(rows), format=date_format, unit='s', error_is_null=True))
+        counts = np.bincount(owner[rows], weights=parsed.to_numpy(zero_copy_only=False), minlength=len(arrays))
+        holds_dates |= pending & (counts >= min_share * present)
+    return holds_dates
+
+
+def date_keys(
+        entities : typing.List,
+        samples : typing.Optional[dict] = None,
+        min_share : float = 0.9,
+        probe_rows : int = 256
+        ) -> dict:
+    """
+Date keys of many entities, columns typed as dates or timestamps and
+string columns whose sampled values parse as dates, see `probe_dates`
+
+Untyped columns are classified by their sampled Arrow type
+
+entities: list of `Entity`
+samples: optional dict of entity -> `pyarrow.Table` of its columns to probe
+min_share: float of the values of a string column that must parse
+probe_rows: int of the sampled values of a string column that are parsed
+
+Returns a dict of entity -> list of date key columns in column order
+    """
+    samples = samples or {}
+    found = {ent: set() for ent in entities}
+    probes, owners = [], []
+    for ent in entities:
+        types = ent.column_type_map
+        sample = samples.get(ent)
+        for column in ent.columns:
+            kind = date_type_kind(types.get(column))
+            if kind == 'probe' and column not in types and sample is not None and column in sample.column_names:
+                # an untyped column takes its sampled type
+                kind = date_type_kind(str(sample.column(column).type))
+            if kind == 'date':
+                found[ent].add(column)
+            elif kind == 'probe' and sample is not None and column in sample.column_names:
+                probes.append(sample.column(column))
+                owners.append((ent, column))
+    for (ent, column), holds_dates in zip(owners, probe_dates(probes, min_share=min_share, probe_rows=probe_rows).tolist()):
+        if holds_dates:
+            found[ent].add(column)
+    return {ent: [c for c in ent.columns if c in columns] for ent, columns in found.items()}
+
+
+def probe_columns(entity) -> list:
+    """
+Columns of an entity whose sampled values have to be probed for dates
+    """
+    types = entity.column_type_map
+    return [c for c in entity.columns if date_type_kind(types.get(c)) == 'probe']
@@ -3,70 +3,225 @@
 # python standard libraries
 import pathlib
 import json
+import sys
 import typing
 
+# internal libs
+from entitygraph import dates, keys
+
 
 class Entity:
+    # graphs hold 100k+ entities, slots keep each one to a few pointers
+    __slots__ = (
+        'source',
+        'identifier',
+        '_columns',
+        '_types',
+        '_type_map',
+        '_nullable',
+        '_deferred',
+        '_pk_candidates',
+        'pk',
+        'dks',
+        'stats',
+        '__weakref__'
+    )
+
     def __init__(self,
             source,
             identifier : str,
-            columns : typing.Optional[typing.List[str]] = [],
-            column_type_map : typing.Optional[dict] = {},
-            column_df = None
+            columns : typing.Optional[typing.Iterable[str]] = None,
+            column_type_map : typing.Optional[dict] = None,
+            column_df = None,
+            nullable : typing.Optional[typing.Iterable[bool]] = None
             ):
         """
 Constructor for an `Entity` object
+
+Columns are stored as an immutable tuple of interned names and types as a
+tuple of interned type names aligned with the columns, so entities of the
+same source share every repeated string. `column_df` is accepted for
+compatibility but not kept
+
+nullable: optional iterable of bools aligned with `columns`
         """
         self.source = source
         self.identifier = identifier
+        self._deferred = None
+        self._columns = ()
+        self._types = None
+        self._type_map = None
+        self._nullable = None
         self.columns = columns
         self.column_type_map = column_type_map
+        self.nullable = nullable
 
         # primary key candidates
-        self._pk_candidates = []
+        self._pk_candidates = ()
         # elected primary key
         self.pk = None
         # date keys
         self.dks = []
+        # `stats.TableStats` attached by `EntityGraph.attach_statistics`
+        self.stats = None
         #TODO: add the nx.Graph instance?
 
+    @classmethod
+    def deferred(cls, source, identifiers : typing.Iterable[str], loader) -> list:
+        """
+Entities whose columns, types and nullability are only read on first
+access, the i-th entity from `loader.row(i)` returning (columns, types,
+nullable)
+        """
+        entities = []
+        new = cls.__new__
+        for row, identifier in enumerate(identifiers):
+            ent = new(cls)
+            ent.source = source
+            ent.identifier = identifier
+            ent._deferred = (loader, row)
+            ent._columns = ()
+            ent._types = None
+            ent._type_map = None
+            ent._nullable = None
+            ent._pk_candidates = ()
+            ent.pk = None
+            ent.dks = []
+            ent.stats = None
+            entities.append(ent)
+        return entities
+
+    def _load_deferred(self):
+        (loader, row), self._deferred = self._deferred, None
+        columns, types, nullable = loader.row(row)
+        self._columns = tuple(sys.intern(c) for c in columns)
+        self._types = tuple(sys.intern(t) if t is not None else None for t in types) if types is not None else None
+        self._type_map = None
+        self._nullable = tuple(nullable) if nullable is not None else None
+
+    @property
+    def columns(self) -> tuple:
+        if self._deferred is not None:
+            self._load_deferred()
+        return self._columns
+
+    @columns.setter
+    def columns(self, columns : typing.Optional[typing.Iterable[str]]):
+        type_map = self.column_type_map
+        self._nullable = None
+        self._columns = tuple(sys.intern(str(c)) for c in columns) if columns is not None else ()
+        self.column_type_map = type_map
+
+    @property
+    def column_type_map(self) -> dict:
+        """
+Column name -> type name, built once and cached until the columns or types
+are assigned, so change it by assigning a new dict rather than in place
+        """
+        if self._deferred is not None:
+            self._load_deferred()
+        if self._type_map is None:
+            if self._types is None:
+                self._type_map = {}
+            else:
+                self._type_map = {c: t for c, t in zip(self._columns, self._types) if t is not None}
+        return self._type_map
+
+    @column_type_map.setter
+    def column_type_map(self, column_type_map : typing.Optional[dict]):
+        if self._deferred is not None:
+            self._load_deferred()
+        self._type_map = None
+        if not column_type_map:
+            self._types = None
+            return
+        self._types = tuple(
+            sys.intern(str(column_type_map[c])) if c in column_type_map else None
+            for c in self._columns
+        )
+
+    @property
+    def nullable(self) -> typing.Optional[tuple]:
+        if self._deferred is not None:
+            self._load_deferred()
+        return self._nullable
+
+    @nullable.setter
+    def nullable(self, nullable : typing.Optional[typing.Iterable[bool]]):
+        if self._deferred is not None:
+            self._load_deferred()
+        self._nullable = tuple(bool(x) for x in nullable) if nullable is not None else None
+
     def __repr__(self):
         return f'<Entity (identifier={self.identifier}, source={self.source.__repr__()})>'
 
 
-    def _extract_pk_candidates(self):
+    def _extract_pk_candidates(self,
+            declared : typing.Optional[list] = None,
+            sample = None,
+            scores : typing.Optional[tuple] = None,
+            n : int = 1000
+            ) -> tuple:
         """
-Extracts the candidates for this `Entity` instance
+Extracts the candidates for this `Entity` instance, best first, from its
+declared keys or a sample of its key like columns, see `keys.pk_candidates`
+
+declared: optional list of (`p` or `u`, key) constraints, the source's by default
+sample: optional `pyarrow.Table`, a cached sample of `n` rows by default,
+    or none at all when the attached `stats` cover the key like columns
+scores: optional `keys.column_scores` of the sample
         """
-        if not self.pk:
-            for col in self.columns:
-                self.check_if_pk(col)
-        
+        if declared is None:
+            declared = self.source.get_key_constraints().get(self.identifier)
+        if not declared and sample is None and scores is None:
+            columns = keys.key_like_columns(self.columns, self.column_type_map)
+            if self.stats is not None and columns in self.stats:
+                scores = self.stats.scores(columns)
+            elif columns:
+                sample = self.source.get_cached_sample(self, n=n, columns=columns, as_arrow=True)
+        self._pk_candidates = tuple(keys.pk_candidates(
+                self.identifier,
+                self.columns,
+                declared=declared,
+                sample=sample,
+                scores=scores,
+                nullable=self.nullable,
+                rows=self.stats.rows if sample is None and self.stats is not None else None))
+        return self._pk_candidates
 
     def _elect_pk(self):
         """
 Extracts the primary key 
         """
-        pass
+        if self.pk is None and self._pk_candidates:
+            self.pk = self._pk_candidates[0]
+        return self.pk
 
-    def get_columns(self) -> list:
+    def get_columns(self) -> tuple:
         return self.columns
 
     def get_type_map(self) -> dict:
-        return self.column_map
+        return self.column_type_map
 
-    def get_sample(self, n=100):
+    def get_sample(self, n=100, columns : typing.Optional[typing.List[str]] = None):
         """
 Gets a sample of `n` records of this entity instance's underlying data by
-leveraging the associated source
+leveraging the associated source, samples are memoized in the source's
+sample cache so every heuristic shares them
         """
-        if not self._sample:
-            sample = self.source.get_sample(identifier=self.identifier, n=n)
-            self._sample = sample
-        return self._sample
+        return self.source.get_cached_sample(self, n=n, columns=columns)
 
-    def extract_date_keys(self):
+    def extract_date_keys(self, sample = None, n : int = 1000) -> list:
         """
-Extracts the date keys for this instance
+Extracts the date keys for this instance into `dks`, see `dates.date_keys`,
+`EntityGraph.extract_date_keys` does the same for many entities at once
+
+sample: optional `pyarrow.Table` of the string columns to probe, a cached
+    sample of `n` rows by default
         """
-        raise NotImplementedError("`extract_date_keys` not yet implemented")
+        if sample is None:
+            columns = dates.probe_columns(self)
+            if columns:
+                sample = self.source.get_cached_sample(self, n=n, columns=columns, as_arrow=True)
+        self.dks = dates.date_keys([self], samples={self: sample})[self]
+        return self.dks
@@ -1,28 +1,90 @@
 #!/usr/bin/env python
 
 # python standard libraries
+import collections
+import concurrent.futures
+import functools
+import gc
+import itertools
 import json
+import logging
 import pathlib
 import traceback
+import typing
 
 # third party libraries
 import networkx as nx
 import pyvis
 
 # internal libs
-from entitygraph.cardinality import RelationalCardinality
+from entitygraph.cache import LRUCache
+from entitygraph.cardinality import KeyProfile, RelationalCardinality, key_columns, key_values
+from entitygraph.catalog import MetadataCatalog
+from entitygraph.dates import date_keys, probe_columns
 from entitygraph.entity import Entity
+from entitygraph.inference import FKNameIndex, PathTokenIndex, entity_name, fk_names
+from entitygraph.keys import column_scores, key_like_columns
+from entitygraph.names import NameIndex, entity_stems, name_similarity, normalize_words, reference_stem
+from entitygraph import parallel
+from entitygraph.paths import bfs_paths, dijkstra_nearest
+from entitygraph.sketches import SketchIndex, sketch_entity
 from entitygraph.sources import PostgresSource, FileSource
+from entitygraph import stats
+from entitygraph.store import GraphSnapshot, write_snapshot
+from entitygraph.types import type_family
+
+
+SOURCES = {cls.__name__: cls for cls in (PostgresSource, FileSource)}
+
+def _invalidates_paths(method):
+    """
+Wraps a `nx.Graph` mutator so cached join paths are dropped whenever the
+graph's structure changes
+    """
+    @functools.wraps(method)
+    def mutator(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._clear_path_cache()
+        return result
+    return mutator
 
 
 class EntityGraph(nx.Graph):
     def __init__(self,
-            source
+            source,
+            path_cache_size : int = 4096
             ):
+        """
+source: the source to build the graph from
+path_cache_size: int of (start, end, k) join path queries kept in an LRU
+    cache, cleared whenever nodes or edges are added or removed
+        """
         self.source = source
         self._graph_built = False
+        self._fk_index = None
+        self._path_index = None
+        self._path_cache = LRUCache(path_cache_size)
+        self._identifier_index = None
         super(EntityGraph, self).__init__()
 
+    add_node = _invalidates_paths(nx.Graph.add_node)
+    add_nodes_from = _invalidates_paths(nx.Graph.add_nodes_from)
+    remove_node = _invalidates_paths(nx.Graph.remove_node)
+    remove_nodes_from = _invalidates_paths(nx.Graph.remove_nodes_from)
+    add_edge = _invalidates_paths(nx.Graph.add_edge)
+    add_edges_from = _invalidates_paths(nx.Graph.add_edges_from)
+    remove_edge = _invalidates_paths(nx.Graph.remove_edge)
+    remove_edges_from = _invalidates_paths(nx.Graph.remove_edges_from)
+    clear = _invalidates_paths(nx.Graph.clear)
+    clear_edges = _invalidates_paths(nx.Graph.clear_edges)
+
+    def _clear_path_cache(self):
+        # mutators may run before `__init__` is done
+        cache = getattr(self, '_path_cache', None)
+        if cache is not None:
+            cache.clear()
+        self._identifier_index = None
+
 
     def get_defined_edges(self) -> list:
         """
@@ -33,6 +95,20 @@ In RDF this would be the predicate https://www.w3.org/TR/rdf-concepts/#dfn-predi
         return self.source.get_defined_edges()
 
 
+    def _merge_edge(self, n1, n2, attr : dict):
+        """
+Adds an edge or merges `attr` into an existing edge's attributes, the keys
+of an edge defined by the schema are never replaced by inferred ones
+        """
+        if not self.has_edge(n1, n2):
+            self.add_edge(n1, n2, attr=attr)
+            return
+        edge_attr = self[n1][n2].setdefault('attr', {})
+        if edge_attr.get('from_schema') and not attr.get('from_schema'):
+            return
+        edge_attr.update(attr)
+
+
     def build_graph_relational(self):
         """
 Build graph implementation for relational tables
@@ -51,42 +127,25 @@ additional edge inference heuristics to build the `EntityGraph`
                     self.add_node(ent)
 
             # start with already defined edges
-            for n1, n2, key1 in self.get_defined_edges():
+            for n1, n2, key1, key2 in self.get_defined_edges():
                 self.add_edge(n1, n2, attr={
                     f'{n1.identifier}_key' : key1,
-                    f'{n2.identifier}_key' : 'id',
+                    f'{n2.identifier}_key' : key2,
                     'from_schema' : True
                 })
 
-            for node in self.nodes():
-                db, schema, table = node.identifier.split('.')
-                if table.endswith('s'):
-                    # strip the s at the end of the table name (e.g. customers_id becomes customer_id)
-                    fkname1 = '{0}_id'.format(table[:-1])
-                else:
-                    fkname1 = f'{table}_id'
-                fkname2 = None
-                fkname2 = '_'.join(f'{table}_id'.split('_')[1:]) if len(f'{table}_id'.split('_'))>2 else None
-                for node2 in self.nodes():
-                    if node != node2:
-                        db2, schema2, table2 = node2.identifier.split('.')
-                        for column in node2.columns:
-                            if column == fkname1:
-                                if not self.has_edge(node, node2):
-                                    self.add_edge(node, node2, attr={
-                                        f'{node.identifier}_key' : 'id',
-                                        f'{node2.identifier}_key' : column,
-                                        'from_schema' : False
-                                    })
-                                # already has an edge
-                                elif self.has_edge(node, node2):
-                                    edge_data = self[node][node2]
-                                    edge_data.update({
-                                        f'{node.identifier}_key' : 'id',
-                                        f'{node2.identifier}_key' : column,
-                                        'from_schema' : False
-                                        })
-                                    self.add_edge(node, node2, attr=edge_data)
+            # declared keys come in one catalog query, so naming edges
+            # join on real primary keys
+            self.elect_pks(sample=False)
+
+            # naming convention edges, e.g. `customers` <- `orders.customer_id`
+            self._fk_index = FKNameIndex(self.nodes())
+            for node, node2, column in self._fk_index.edges():
+                self._merge_edge(node, node2, {
+                    f'{node.identifier}_key' : self._primary_key(node),
+                    f'{node2.identifier}_key' : column,
+                    'from_schema' : False
+                })
             self._graph_built = True
         pass
 
@@ -111,21 +170,13 @@ we apply this algorithm
             # the assumption that a table being referenced
             # in a foreign table will take the name:
             # `table_name` -> `table_name_id`
-            for n1 in self.nodes():
-                for n2 in self.nodes():
-                    if n1 == n2:
-                        continue
-                    else:
-                        for cname in n1.columns:
-                            try:
-                                if '_'.join(cname.split('_')[:-1]) in n2.identifier:
-                                    self.add_edge(n1, n2,attr={
-                                        f'{n1.identifier}_key' : 'id',
-                                        f'{n2.identifier}_key' : column,
-                                        'from_schema' : False 
-                                        })
-                            except Exception as e:
-                                pass
+            self._path_index = PathTokenIndex(self.nodes(), root=getattr(self.source, '_relpath', None))
+            for n1, n2, cname in self._path_index.edges():
+                self._merge_edge(n1, n2, {
+                    f'{n1.identifier}_key' : cname,
+                    f'{n2.identifier}_key' : self._primary_key(n2),
+                    'from_schema' : False
+                    })
             self._graph_built = True
         pass
 
@@ -136,10 +187,32 @@ we apply this algorithm
     def build_graph_custom(self):
         pass
   
-    def build_graph(self):
+    def build_graph(self, catalog : typing.Optional[MetadataCatalog] = None):
         """
 Build the entity graph from our underlying source
+
+catalog: optional `MetadataCatalog` persisting entities and edges across
+    runs, only entities that changed since the last run are re-read and
+    an unchanged source loads its edges straight from the catalog
         """
+        changed = []
+        if catalog is not None and not self._graph_built:
+            fingerprint = self.source.fingerprint()
+            changed, removed = self.source.sync_catalog(catalog)
+            if catalog.has_edges(fingerprint):
+                # cataloged edges of unchanged entities are still valid,
+                # only the edges touching changed entities are recomputed
+                stale = set(changed)
+                self.build_graph_catalog([
+                    edge for edge in catalog.load_edges(fingerprint)
+                    if edge[0] not in stale and edge[1] not in stale
+                ])
+                if changed:
+                    self.refresh(altered=[ent for ent in self.nodes() if ent.identifier in stale])
+                    catalog.save_edges(fingerprint, self.edge_records())
+                    self._save_pks(catalog, stale)
+                return
+
         if isinstance(self.source, FileSource):
             self.build_graph_filesystem()
         elif isinstance(self.source, PostgresSource):
@@ -147,6 +220,214 @@ Build the entity graph from our underlying source
         else:
             self.build_graph_custom()
 
+        if catalog is not None:
+            catalog.save_edges(self.source.fingerprint(), self.edge_records())
+            self._save_pks(catalog, set(changed))
+
+    def _save_pks(self, catalog : MetadataCatalog, identifiers : set):
+        """
+Saves the primary keys elected for the entities the catalog re-read, the
+others kept the keys it had for them
+        """
+        catalog.save_pks(self.source.fingerprint(), {
+            ent.identifier: ent.pk for ent in self.nodes() if ent.identifier in identifiers})
+
+    def refresh(self,
+            added : typing.Iterable[Entity] = (),
+            removed : typing.Iterable[typing.Union[Entity, str]] = (),
+            altered : typing.Iterable[Entity] = ()
+            ):
+        """
+Incrementally applies entity changes to a built graph instead of rebuilding it
+
+Nodes are updated and only the edges touching the changed entities are
+recomputed, in both directions, e.g. a new `customers` entity gets the
+edges of existing tables with a `customer_id` column. The source's entity
+list is updated so the result is identical to a full rebuild from it
+
+added: new `Entity` objects
+removed: `Entity` objects or identifiers to drop
+altered: `Entity` objects replacing the entities with the same identifier
+
+A graph that wasn't built yet is built from the source's entities with the
+changes applied
+        """
+        if not self._graph_built:
+            self._apply_entity_changes(added, removed, altered)
+            self.build_graph()
+            return
+        index = self._get_inference_index()
+        entities, dropped, changed = self._apply_entity_changes(added, removed, altered)
+
+        for node in [node for node in self.nodes() if node.identifier in dropped]:
+            index.remove(node)
+            self.remove_node(node)
+
+        for ent in changed:
+            self.add_node(ent)
+            index.add(ent)
+        if changed:
+            # as in a full build, naming edges join on declared primary keys
+            self.elect_pks(changed, sample=False)
+            self._refresh_edges(changed, {ent: i for i, ent in enumerate(entities)})
+
+    def _apply_entity_changes(self,
+            added : typing.Iterable[Entity] = (),
+            removed : typing.Iterable[typing.Union[Entity, str]] = (),
+            altered : typing.Iterable[Entity] = ()
+            ) -> typing.Tuple[list, set, list]:
+        """
+Updates the source's entity list with entity changes, see `refresh`
+
+Returns the (entities, dropped identifiers, changed entities), dropped
+identifiers include the altered ones
+        """
+        added = list(added)
+        altered = {ent.identifier: ent for ent in altered}
+        dropped = {ent if isinstance(ent, str) else ent.identifier for ent in removed}
+        dropped.update(altered)
+
+        # altered entities keep their position, which decides merge order
+        entities = []
+        for ent in self.source.get_entities():
+            if ent.identifier in altered:
+                entities.append(altered[ent.identifier])
+            elif ent.identifier not in dropped:
+                entities.append(ent)
+        known = {ent.identifier for ent in entities}
+        entities.extend(ent for ent in added if ent.identifier not in known)
+        self.source.set_entities(entities)
+
+        changed = list(altered.values()) + [ent for ent in added if ent.identifier not in known]
+        return entities, dropped, changed
+
+    def _get_inference_index(self):
+        """
+The naming index of the built graph, rebuilt from the nodes when the graph
+was loaded rather than inferred
+        """
+        if isinstance(self.source, FileSource):
+            if self._path_index is None:
+                self._path_index = PathTokenIndex(self.nodes(), root=self.source.get_filesystem()[1])
+            return self._path_index
+        if self._fk_index is None:
+            self._fk_index = FKNameIndex(self.nodes())
+        return self._fk_index
+
+    def _refresh_edges(self, changed : typing.List[Entity], position : dict):
+        """
+Recomputes the edges touching `changed`, merged in the same order as
+a full build so edges with several contributions end up identical
+        """
+        if isinstance(self.source, FileSource):
+            index = self._path_index
+            contributions = set()
+            for ent in changed:
+                contributions.update((ent, other, column) for other, column in index.referenced_by(ent))
+                contributions.update((other, ent, column) for other, column in index.referencing(ent))
+            for n1, n2, cname in sorted(contributions, key=lambda c: (position[c[0]], c[0].columns.index(c[2]))):
+                self._merge_edge(n1, n2, {
+                    f'{n1.identifier}_key' : cname,
+                    f'{n2.identifier}_key' : self._primary_key(n2),
+                    'from_schema' : False
+                    })
+            return
+
+        if isinstance(self.source, PostgresSource):
+            for n1, n2, key1, key2 in self.source.get_defined_edges(touching=changed):
+                self.add_edge(n1, n2, attr={
+                    f'{n1.identifier}_key' : key1,
+                    f'{n2.identifier}_key' : key2,
+                    'from_schema' : True
+                })
+        index = self._fk_index
+        contributions = set()
+        for ent in changed:
+            contributions.update((ent, other, column) for other, column in index.referencing(ent))
+            contributions.update((other, ent, column) for other, column in index.referenced_by(ent))
+        key = lambda c: (position[c[0]], index.candidate_names(c[0]).index(c[2]), position[c[1]])
+        for node, node2, column in sorted(contributions, key=key):
+            self._merge_edge(node, node2, {
+                f'{node.identifier}_key' : self._primary_key(node),
+                f'{node2.identifier}_key' : column,
+                'from_schema' : False
+            })
+
+    def build_graph_catalog(self, edges : typing.List[tuple]):
+        """
+Build the graph from the source's current entities and cataloged
+(identifier, identifier, attr) edges without any inference
+        """
+        entities = {ent.identifier: ent for ent in self.source.get_entities()}
+        for ent in entities.values():
+            if not self.has_node(ent):
+                self.add_node(ent)
+        for n1, n2, attr in edges:
+            if n1 in entities and n2 in entities:
+                self.add_edge(entities[n1], entities[n2], attr=attr)
+        self._graph_built = True
+
+    def edge_records(self) -> typing.List[tuple]:
+        """
+Edges as (identifier, identifier, attr) tuples
+        """
+        return [
+            (n1.identifier, n2.identifier, data.get('attr', {}))
+            for n1, n2, data in self.edges(data=True)
+        ]
+
+    def save(self, path : str):
+        """
+Saves the built graph, its entities, their columns and types and every
+edge attribute, as a memory mappable Arrow IPC snapshot directory
+
+path: str of the snapshot directory
+        """
+        nodes = list(self.nodes())
+        position = {node: i for i, node in enumerate(nodes)}
+        try:
+            source = {'type': type(self.source).__name__, 'config': self.source.get_config()}
+        except NotImplementedError:
+            source = None
+        write_snapshot(
+                path,
+                nodes,
+                ((position[n1], position[n2], data.get('attr', {})) for n1, n2, data in self.edges(data=True)),
+                source)
+
+    @classmethod
+    def load(cls, path : str, source = None, **source_kwargs) -> 'EntityGraph':
+        """
+Opens a graph saved with `save` without reading its source, entity columns
+are decoded on first access and the source, rebuilt from its saved config
+unless given, only connects once something is sampled
+
+path: str of the snapshot directory
+source: optional source instance to attach the graph to
+source_kwargs: arguments overriding the saved source config, e.g. `pw`
+        """
+        snapshot = GraphSnapshot(path)
+        if source is None:
+            if not snapshot.source:
+                raise Exception(f'Graph snapshot {path} has no source config, pass a `source`')
+            source = SOURCES[snapshot.source['type']].from_config(snapshot.source['config'], **source_kwargs)
+        # the cyclic collector would repeatedly scan the objects allocated
+        # in bulk here, none of which is garbage
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            entities = snapshot.entities(source)
+            graph = cls(source)
+            graph.add_nodes_from(entities)
+            graph.add_edges_from((n1, n2, {'attr': attr}) for n1, n2, attr in snapshot.edges(entities))
+            graph._clear_path_cache()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        source.set_entities(entities)
+        graph._graph_built = True
+        return graph
+
     def string_nodes(self):
         """
 Turns the nodes into strings for visualization packages like `pyvis`
@@ -190,17 +471,313 @@ This method should wrap other more specific heuristics used to infer edges betwe
         self.infer_edge_dtypes(n1, n2)
         self.infer_edge_composite(n1, n2)
 
-    def infer_edge_nlp(self, n1, n2):
+    def infer_edge_nlp(self, n1, n2, min_score : float = 0.7) -> typing.Optional[dict]:
         """
 Use NLP approaches to inferring an edge between two entities
+
+A column of either entity whose normalized name refers to the other, see
+`entitygraph.names`, joins them when its similarity reaches `min_score`
+
+Returns the edge's attributes or None
         """
-        pass
+        best = None
+        for ent, other in ((n1, n2), (n2, n1)):
+            names = entity_stems(other.identifier)
+            for column in ent.columns:
+                stem = reference_stem(column)
+                if stem is None:
+                    continue
+                score = max(name_similarity(stem, name) for name in names) if names else 0.0
+                if score >= min_score and (best is None or score > best[3]):
+                    best = (other, ent, column, score)
+        if best is None or not self._add_name_edge(*best):
+            return None
+        return self[n1][n2]['attr']
+
+    def _referenced_key(self, entity : Entity, column : str) -> typing.Optional[str]:
+        """
+The column of `entity` a reference named `column` joins to: a column of
+the same (normalized) name as in warehouse style keys, its primary key or
+`id`
+        """
+        if column in entity.columns:
+            return column
+        words = normalize_words(column)
+        for other in entity.columns:
+            if normalize_words(other) == words:
+                return other
+        if entity.pk is not None:
+            return entity.pk
+        if 'id' in entity.columns:
+            return 'id'
+        return None
+
+    def _add_name_edge(self, referenced : Entity, referencing : Entity, column : str, score : float) -> bool:
+        key = self._referenced_key(referenced, column)
+        if key is None:
+            return False
+        key_name, fk_name = f'{referenced.identifier}_key', f'{referencing.identifier}_key'
+        if not self.has_edge(referenced, referencing):
+            self.add_edge(referenced, referencing, attr={
+                key_name: key,
+                fk_name: column,
+                'name_score': score,
+                'from_schema': False
+            })
+            return True
+        attr = self[referenced][referencing].setdefault('attr', {})
+        if 'name_score' not in attr and attr.get(key_name) == key and attr.get(fk_name) == column:
+            attr['name_score'] = score
+            return True
+        return False
 
-    def infer_edge_dtypes(self, n1, n2):
+    def infer_edges_nlp(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            min_score : float = 0.7,
+            limit : int = 1,
+            processes : typing.Optional[int] = None
+            ) -> typing.List[tuple]:
+        """
+Infers edges from column names referring to entities in any common
+naming style: `cust_id`, `CustomerKey` or `customer_sk` of `customers`
+or `dim_customer`
+
+Entity names go into an n-gram `NameIndex`, so every distinct column
+stem is only scored against the entities sharing its n-grams. New edges
+join the column to the referenced entity's same named column, primary key
+or `id`, an existing edge only gets the `name_score` when its keys agree
+
+entities: optional list of `Entity` whose columns are matched, every node
+    by default, against every node
+min_score: float of the least name similarity, see `name_similarity`
+limit: int of the best matching entity names kept per column
+processes: optional int of worker processes to score column stems in, 0
+    for one per cpu, in this process by default
+
+Returns a list of (entity, entity) edges that were added or updated
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        index = NameIndex(self.nodes())
+        matches = None
+        if processes is not None and processes != 1:
+            stems = (reference_stem(column) for ent in entities for column in ent.columns)
+            matches = parallel.lookup_stems(
+                    index,
+                    [stem for stem in stems if stem is not None],
+                    min_score=min_score,
+                    limit=limit,
+                    processes=processes or None)
+        inferred = []
+        # the best named column wins per pair of entities
+        references = sorted(
+                index.references(entities, min_score=min_score, limit=limit, matches=matches),
+                key=lambda ref: -ref[3])
+        for referenced, referencing, column, score in references:
+            if self._add_name_edge(referenced, referencing, column, score):
+                inferred.append((referenced, referencing))
+        return inferred
+
+    def infer_edge_dtypes(self, n1, n2, **kwargs) -> typing.Optional[dict]:
         """
 User datatypes and distributions to infer an edge between two entities
+
+The columns of both entities are sketched and an edge is added when the
+values of a column of one are contained in a type compatible unique
+column of the other, takes the keyword arguments of `infer_edges_dtypes`
+
+Returns the edge's attributes or None
         """
-        pass
+        self.infer_edges_dtypes(entities=[n1, n2], **kwargs)
+        if self.has_edge(n1, n2) and 'inclusion' in self[n1][n2].get('attr', {}):
+            return self[n1][n2]['attr']
+        return None
+
+    def build_sketch_index(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            n : int = 10000,
+            full_scan : bool = False,
+            num_perm : int = 128,
+            batch_size : int = 65536,
+            max_workers : typing.Optional[int] = None,
+            processes : typing.Optional[int] = None
+            ) -> SketchIndex:
+        """
+Sketches the possible key columns of entities, see `keys.key_like_columns`,
+into a `SketchIndex`
+
+Entities are sketched concurrently from a sample of `n` rows, or from a
+streaming scan of every row with `full_scan`, which a key column needs
+when its entity has many more rows than the sample: the foreign keys
+referencing it may point anywhere. Only the compact signatures of
+finished columns are kept, so memory grows with the number of columns and
+not their values
+
+entities: optional list of `Entity`, every node by default
+n: int of rows sampled per entity
+full_scan: bool whether to scan every row instead of sampling
+num_perm: int of MinHash permutations
+batch_size: int of rows per scanned batch
+max_workers: optional int of concurrent entities, defaults to the source's
+processes: optional int of worker processes to sketch in, hashing is CPU
+    bound so a large scan scales with cores rather than threads, 0 for one
+    per cpu, threads by default
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        index = SketchIndex(num_perm=num_perm)
+
+        if processes is not None and processes != 1:
+            sketched = parallel.sketch_index(
+                    self.source,
+                    [
+                        (ent.identifier, ent.columns, ent.column_type_map, key_like_columns(ent.columns, ent.column_type_map))
+                        for ent in entities
+                    ],
+                    index,
+                    n=n,
+                    full_scan=full_scan,
+                    batch_size=batch_size,
+                    processes=processes or None)
+            for ent, sketches in zip(entities, sketched):
+                types = ent.column_type_map or {}
+                for column, signature, distinct, rows in sketches:
+                    index.add_signature((ent, column), signature, distinct, rows, types.get(column))
+            return index
+
+        def sketch(ent):
+            columns = key_like_columns(ent.columns, ent.column_type_map)
+            return ent, sketch_entity(ent, columns, index, n=n, full_scan=full_scan, batch_size=batch_size)
+
+        max_workers = max_workers or getattr(self.source, 'max_workers', 4)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for ent, sketches in executor.map(sketch, entities):
+                types = ent.column_type_map or {}
+                for column, column_sketch in sketches.items():
+                    index.add((ent, column), column_sketch, types.get(column))
+        return index
+
+    def infer_edges_dtypes(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            index : typing.Optional[SketchIndex] = None,
+            min_containment : float = 0.8,
+            min_uniqueness : float = 0.9,
+            **kwargs
+            ) -> typing.List[tuple]:
+        """
+Infers edges from inclusion dependencies between columns: a column whose
+distinct values are contained in a type compatible, (nearly) unique column
+of another entity is taken as a foreign key to it
+
+Candidate columns are paired with LSH over MinHash signatures, so the
+work grows with the number of columns rather than its square. New edges
+join the two columns, an existing edge only gets the `inclusion` when its
+keys are the same columns. Inclusions between two columns measured
+(nearly) unique, like two `id` sequences, are skipped
+
+entities: optional list of `Entity`, every node by default
+index: optional prebuilt `SketchIndex`, see `build_sketch_index`
+min_containment: float of the share of values that must be contained
+min_uniqueness: float of the distinct ratio of the containing column
+kwargs: passed to `build_sketch_index`
+
+Returns a list of (entity, entity) edges that were added or updated
+        """
+        if index is None:
+            index = self.build_sketch_index(entities=entities, **kwargs)
+        found = index.inclusion_dependencies(min_containment=min_containment, min_uniqueness=min_uniqueness)
+        return self._add_inclusion_edges((index.keys[i], index.keys[j], containment) for i, j, containment in found)
+
+    def _add_inclusion_edges(self, found : typing.Iterable[tuple], **attrs) -> typing.List[tuple]:
+        """
+Adds the edges of inclusion dependencies, ((entity, column) contained,
+(entity, column) containing, containment), `attrs` are set on new edges
+
+Returns a list of (entity, entity) edges that were added or updated
+        """
+        inferred = []
+        # the best contained column wins per pair of entities
+        for (fk_ent, fk_column), (key_ent, key_column), containment in sorted(found, key=lambda dep: -dep[2]):
+            if self._is_unique_key(fk_ent, fk_column) and self._is_unique_key(key_ent, key_column):
+                continue
+            fk_name, key_name = f'{fk_ent.identifier}_key', f'{key_ent.identifier}_key'
+            if not self.has_edge(key_ent, fk_ent):
+                self.add_edge(key_ent, fk_ent, attr={
+                    key_name: key_column,
+                    fk_name: fk_column,
+                    'inclusion': containment,
+                    'from_schema': False,
+                    **attrs
+                })
+                inferred.append((key_ent, fk_ent))
+                continue
+            attr = self[key_ent][fk_ent].setdefault('attr', {})
+            if 'inclusion' not in attr and attr.get(key_name) == key_column and attr.get(fk_name) == fk_column:
+                attr['inclusion'] = containment
+                inferred.append((key_ent, fk_ent))
+        return inferred
+
+    def attach_statistics(self, entities : typing.Optional[typing.List[Entity]] = None) -> int:
+        """
+Attaches the source's planner statistics to entities as their `stats`,
+see `BaseSource.get_statistics`, e.g. `pg_stats` read in one query per
+database. From then on `elect_pks`, `infer_cardinalities` and
+`infer_edges_stats` take uniqueness, null rates and value ranges from the
+statistics without scanning any table, only entities or keys without
+statistics are still sampled
+
+entities: optional list of `Entity`, every node by default
+
+Returns the number of entities that got statistics
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        statistics = self.source.get_statistics()
+        for ent in entities:
+            ent.stats = statistics.get(ent.identifier)
+        return sum(1 for ent in entities if ent.stats is not None)
+
+    def infer_edges_stats(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            min_containment : float = 0.8,
+            min_uniqueness : float = 0.9,
+            fallback : bool = True,
+            **kwargs
+            ) -> typing.List[tuple]:
+        """
+Infers edges from inclusion dependencies like `infer_edges_dtypes`, but
+estimated from the attached statistics of integer columns, their value
+ranges and distinct counts, without scanning any table, see
+`stats.inclusion_dependencies` and `attach_statistics`. New edges are
+marked `from_stats`
+
+entities: optional list of `Entity`, every node by default
+min_containment: float of the share of values that must be contained
+min_uniqueness: float of the distinct ratio of the containing column
+fallback: bool whether entities without statistics are sketched from
+    samples by `infer_edges_dtypes` instead
+kwargs: passed to `infer_edges_dtypes`
+
+Returns a list of (entity, entity) edges that were added or updated
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        columns = []
+        for ent in entities:
+            if ent.stats is None:
+                continue
+            types = ent.column_type_map
+            for column in ent.columns:
+                if column in ent.stats and type_family(types.get(column, '')) == 'integer':
+                    columns.append(((ent, column), ent.stats.columns[column], ent.stats.rows))
+        found = stats.inclusion_dependencies(columns, min_containment=min_containment, min_uniqueness=min_uniqueness)
+        inferred = self._add_inclusion_edges(
+                ((columns[i][0], columns[j][0], containment) for i, j, containment in found),
+                from_stats=True)
+        missing = [ent for ent in entities if ent.stats is None]
+        if fallback and missing:
+            inferred += self.infer_edges_dtypes(
+                    entities=missing,
+                    min_containment=min_containment,
+                    min_uniqueness=min_uniqueness,
+                    **kwargs)
+        return inferred
 
     def infer_edge_composite(self, n1, n2):
         """
@@ -208,58 +785,486 @@ To start we may brute force the problem of inferring edges between entities thro
         """
         pass
 
+    def extract_date_keys(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            n : int = 1000,
+            sample : bool = True,
+            min_share : float = 0.9,
+            max_workers : typing.Optional[int] = None
+            ) -> dict:
+        """
+Fills the date keys, `dks`, of many entities in one batch
+
+Columns typed as dates or timestamps in the catalog are date keys without
+reading any data. Entities with string or untyped columns are sampled
+concurrently, projected to those columns, and the samples of all entities
+are probed with vectorized date parsing together, see `entitygraph.dates`
+
+entities: optional list of `Entity`, every node by default
+n: int of rows sampled per entity
+sample: bool whether to probe string columns, types only otherwise
+min_share: float of the values of a string column that must parse
+max_workers: optional int of concurrent samples, defaults to the source's
+
+Returns a dict of entity -> list of date key columns
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        samples = {}
+        if sample:
+            probed = {ent: probe_columns(ent) for ent in entities}
+            probed = {ent: columns for ent, columns in probed.items() if columns}
+
+            def get_sample(ent):
+                try:
+                    return ent.source.get_cached_sample(ent, n=n, columns=probed[ent], as_arrow=True)
+                except Exception:
+                    logging.warning(f'Could not sample {ent.identifier}: {traceback.format_exc()}')
+                    return None
+
+            max_workers = max_workers or getattr(self.source, 'max_workers', 4)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                samples = dict(zip(probed, executor.map(get_sample, probed)))
+        found = date_keys(entities, samples=samples, min_share=min_share)
+        for ent, dks in found.items():
+            ent.dks = dks
+        return found
+
+    @staticmethod
+    def _primary_key(entity : Entity) -> str:
+        """
+The column a naming convention edge joins `entity` on, its elected
+single column primary key or `id`
+        """
+        return entity.pk if isinstance(entity.pk, str) else 'id'
+
+    def elect_pks(self,
+            entities : typing.Optional[typing.List[Entity]] = None,
+            n : int = 1000,
+            sample : bool = True,
+            max_workers : typing.Optional[int] = None
+            ) -> dict:
+        """
+Elects the primary key of entities without one
+
+Declared primary keys and unique constraints come from the source in bulk,
+e.g. one `pg_constraint` query per Postgres database. Entities without
+any are scored from their attached statistics, see `attach_statistics`,
+or else sampled concurrently, projected to their key like columns, and
+every column's uniqueness and null rate is scored in one pass over the
+sample's Arrow buffers, see `entitygraph.keys`
+
+Inferred edges that guessed `id` for an entity are rekeyed on its elected
+primary key
+
+entities: optional list of `Entity`, every node by default
+n: int of rows sampled per entity
+sample: bool whether to sample entities without declared keys
+max_workers: optional int of concurrent samples, defaults to the source's
+
+Returns a dict of entity -> elected primary key, None when none was found
+        """
+        entities = list(entities) if entities is not None else list(self.nodes())
+        pending = [ent for ent in entities if ent.pk is None]
+        declared = self.source.get_key_constraints() if pending else {}
+        samples = {}
+        undeclared = [ent for ent in pending if not declared.get(ent.identifier)]
+        # statistics covering every key like column stand in for a sample
+        scores = {}
+        for ent in undeclared:
+            columns = key_like_columns(ent.columns, ent.column_type_map)
+            if ent.stats is not None and columns in ent.stats:
+                scores[ent] = ent.stats.scores(columns)
+        unsampled = [ent for ent in undeclared if ent not in scores]
+        if sample and unsampled:
+            def get_sample(ent):
+                columns = key_like_columns(ent.columns, ent.column_type_map)
+                if not columns:
+                    return None
+                try:
+                    return ent.source.get_cached_sample(ent, n=n, columns=columns, as_arrow=True)
+                except Exception:
+                    logging.warning(f'Could not sample {ent.identifier}: {traceback.format_exc()}')
+                    return None
+
+            max_workers = max_workers or getattr(self.source, 'max_workers', 4)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                samples = dict(zip(unsampled, executor.map(get_sample, unsampled)))
+
+        sampled = [ent for ent in unsampled if samples.get(ent) is not None]
+        scores.update(zip(sampled, column_scores([samples[ent] for ent in sampled])))
+        elected = {}
+        for ent in pending:
+            if ent.identifier in declared or ent in scores:
+                ent._extract_pk_candidates(
+                        declared=declared.get(ent.identifier, []),
+                        sample=samples.get(ent),
+                        scores=scores.get(ent))
+                ent._elect_pk()
+            elected[ent] = ent.pk
+        self._rekey_edges(ent for ent, pk in elected.items() if pk is not None)
+        return elected
+
+    def _rekey_edges(self, entities : typing.Iterable[Entity]):
+        """
+Rekeys the naming edges that guessed `id` for entities without an `id`
+column onto their elected primary keys, declared and measured edges, e.g.
+inclusions, join on columns that exist and are left alone
+        """
+        for ent in entities:
+            pk = self._primary_key(ent)
+            if pk == 'id' or 'id' in ent.columns or not self.has_node(ent):
+                continue
+            name = f'{ent.identifier}_key'
+            for other in self._adj[ent]:
+                attr = self._adj[ent][other].get('attr', {})
+                if attr.get('from_schema') or 'inclusion' in attr:
+                    continue
+                if attr.get(name) == 'id':
+                    attr[name] = pk
+
+    def _is_unique_key(self, entity : Entity, key) -> bool:
+        """
+Whether a join key identifies rows of `entity`: its primary key, `id` or
+the foreign key name of the entity itself, e.g. `customer_id` of `customers`
+        """
+        if key is None:
+            return False
+        if entity.pk is not None and key == entity.pk:
+            return True
+        if not isinstance(key, str):
+            return False
+        return key == 'id' or key in fk_names(entity_name(entity.identifier), strip_prefix=True)
+
     def infer_cardinality(
             self, 
             n1: Entity, 
             n2: Entity) -> RelationalCardinality:
         """
-Attempt to infer the cardinality between two nodes
+Attempt to infer the cardinality between two nodes, read as `n1` to `n2`
+
+The cardinality stored on the edge by `infer_cardinalities` is used when
+there is one, otherwise it is guessed from the keys of the edge
         """
-        # which keys are in the edge to use here?
-        #n1_samp = n1.get_sample()
-        #n2_samp = n2.get_sample()
-        pass
+        attr = self[n1][n2].get('attr', {})
+        if attr.get('cardinality') is not None:
+            # stored as read from the `cardinality_from` side
+            cardinality = RelationalCardinality(attr['cardinality'])
+            return cardinality if attr.get('cardinality_from') == n1.identifier else cardinality.reverse()
+        return RelationalCardinality.from_uniqueness(
+                self._is_unique_key(n1, attr.get(f'{n1.identifier}_key')),
+                self._is_unique_key(n2, attr.get(f'{n2.identifier}_key')))
+
+    def infer_cardinalities(self,
+            edges : typing.Optional[typing.Iterable[tuple]] = None,
+            n : int = 1000,
+            threshold : float = 1.0,
+            max_workers : typing.Optional[int] = None
+            ) -> dict:
+        """
+Infers the cardinality of many edges in one pass from samples
+
+Keys covered by an entity's attached statistics take their uniqueness
+from them, see `attach_statistics`. Every other entity is sampled once,
+projected to the key columns of all of its remaining edges, and each key
+is profiled once with hash based distinct counts.
+Per edge only the distinct values of both keys are intersected. A key is
+unique when its distinct ratio reaches `threshold`, keys without
+statistics or a sample fall back to whether they are a primary or naming
+convention key.
+
+Each edge's attributes get its `cardinality`, read from the
+`cardinality_from` entity, and the `key_overlap`, the number of
+distinct sampled values of that entity's key found in the other's
 
+edges: optional iterable of (entity, entity) edges, all edges by default
+n: int of rows sampled per entity
+threshold: float of the distinct ratio from which a key is unique
+max_workers: optional int of concurrent samples, defaults to the source's
 
-    def optimize_paths_distance_hops(start, end):
+Returns a dict of (entity, entity) -> `RelationalCardinality`
         """
-Something like a Dijkstra's implementation for shortest path
+        edges = list(edges) if edges is not None else list(self.edges())
+        keys = collections.defaultdict(dict)
+        # (entity, key) -> uniqueness from attached statistics
+        from_stats = {}
+        for n1, n2 in edges:
+            attr = self[n1][n2].get('attr', {})
+            for ent in (n1, n2):
+                key = attr.get(f'{ent.identifier}_key')
+                if key is None:
+                    continue
+                uniqueness = ent.stats.key_uniqueness(key) if ent.stats is not None else None
+                if uniqueness is not None:
+                    from_stats[ent, key] = uniqueness
+                else:
+                    keys[ent][key] = None
+
+        def sample(ent):
+            columns = sorted({column for key in keys[ent] for column in key_columns(key)})
+            try:
+                return ent.source.get_cached_sample(ent, n=n, columns=columns, as_arrow=True)
+            except Exception:
+                logging.warning(f'Could not sample {ent.identifier}: {traceback.format_exc()}')
+                return None
+
+        max_workers = max_workers or getattr(self.source, 'max_workers', 4)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            samples = dict(zip(keys, executor.map(sample, keys)))
+
+        profiles = {}
+        for ent, ent_keys in keys.items():
+            table = samples[ent]
+            if table is None:
+                continue
+            for key in ent_keys:
+                if all(column in table.column_names for column in key_columns(key)):
+                    profiles[ent, key] = KeyProfile(key_values(table, key))
+
+        cardinalities = {}
+        for n1, n2 in edges:
+            attr = self[n1][n2].setdefault('attr', {})
+            key1 = attr.get(f'{n1.identifier}_key')
+            key2 = attr.get(f'{n2.identifier}_key')
+            profile1 = profiles.get((n1, key1))
+            profile2 = profiles.get((n2, key2))
+            uniqueness1 = from_stats.get((n1, key1), profile1.uniqueness if profile1 is not None and profile1.count else None)
+            uniqueness2 = from_stats.get((n2, key2), profile2.uniqueness if profile2 is not None and profile2.count else None)
+            # keys without statistics or a sample fall back to their names
+            unique1 = uniqueness1 >= threshold if uniqueness1 is not None else self._is_unique_key(n1, key1)
+            unique2 = uniqueness2 >= threshold if uniqueness2 is not None else self._is_unique_key(n2, key2)
+            cardinality = RelationalCardinality.from_uniqueness(unique1, unique2)
+            attr['cardinality'] = cardinality
+            attr['cardinality_from'] = n1.identifier
+            attr['key_overlap'] = profile1.overlap(profile2) if profile1 is not None and profile2 is not None else None
+            cardinalities[n1, n2] = cardinality
+        return cardinalities
+
+    def join_cost(self,
+            n1 : Entity,
+            n2 : Entity,
+            rows : typing.Optional[dict] = None,
+            default_rows : int = 1000,
+            many_to_many_fanout : float = 10.0
+            ) -> dict:
+        """
+Cost breakdown of joining `n1` to `n2` along their edge, the rows read
+from both sides plus the estimated output rows of the join
+
+rows: optional dict of identifier -> row estimate, defaults to the
+    source's `get_row_estimates`
+default_rows: int of rows assumed for entities without an estimate
+many_to_many_fanout: float of output rows per row of the larger side of a
+    many to many join
+
+Returns a dict of the `left` and `right` entities, their keys and rows,
+the `cardinality`, the `output_rows` and the total `cost`
+        """
+        if rows is None:
+            rows = self.source.get_row_estimates()
+        left_rows = rows.get(n1.identifier, default_rows)
+        right_rows = rows.get(n2.identifier, default_rows)
+        cardinality = self.infer_cardinality(n1, n2)
+        if cardinality == RelationalCardinality.one_to_one:
+            output_rows = min(left_rows, right_rows)
+        elif cardinality == RelationalCardinality.many_to_one:
+            output_rows = left_rows
+        elif cardinality == RelationalCardinality.one_to_many:
+            output_rows = right_rows
+        else:
+            output_rows = max(left_rows, right_rows) * many_to_many_fanout
+        attr = self[n1][n2].get('attr', {})
+        return {
+            'left' : n1,
+            'right' : n2,
+            'left_key' : attr.get(f'{n1.identifier}_key'),
+            'right_key' : attr.get(f'{n2.identifier}_key'),
+            'cardinality' : cardinality,
+            'left_rows' : left_rows,
+            'right_rows' : right_rows,
+            'output_rows' : output_rows,
+            'cost' : left_rows + right_rows + output_rows
+        }
 
-Usage: `optimize_paths_distance_hops(G, 'table1', 'table2')
--> ['table1', 'tableX', 'table2']
+    def plan_join(self,
+            entities : typing.List[typing.Union[Entity, str]],
+            default_rows : int = 1000,
+            many_to_many_fanout : float = 10.0
+            ) -> dict:
+        """
+Cheapest plan joining two or more entities, weighting every hop with
+`join_cost` rather than counting hops, so a detour through small
+dimensions beats a path through a huge fact table
+
+Starting from the first entity the plan repeatedly joins in the nearest
+remaining entity by Dijkstra's algorithm over join costs, entities on the
+way are joined in too. Hops are costed from table row estimates, which
+keeps path costs additive
+
+entities: list of `Entity` objects or identifiers, the first is the base
+default_rows, many_to_many_fanout: see `join_cost`
+
+Returns a dict of the joined `entities` in join order, the `hops` in
+execution order with their `join_cost` breakdown and the total `cost`
+        """
+        nodes = [self._resolve_node(ent) for ent in entities]
+        if not nodes:
+            raise Exception('`plan_join` needs at least one entity')
+        rows = self.source.get_row_estimates()
+        costs = {}
+
+        def weight(n1, n2, data):
+            if (n1, n2) not in costs:
+                costs[n1, n2] = self.join_cost(n1, n2, rows, default_rows, many_to_many_fanout)
+            return costs[n1, n2]['cost']
+
+        joined = {nodes[0]: None}
+        remaining = {node: None for node in nodes[1:] if node is not nodes[0]}
+        hops = []
+        while remaining:
+            found = dijkstra_nearest(self._adj, joined, remaining, weight)
+            if found is None:
+                raise Exception(f'{", ".join(n.identifier for n in remaining)} cannot be joined to {nodes[0].identifier}')
+            _, path = found
+            for n1, n2 in zip(path, path[1:]):
+                weight(n1, n2, None)
+                hops.append(costs[n1, n2])
+                joined[n2] = None
+                remaining.pop(n2, None)
+        return {
+            'entities' : list(joined),
+            'hops' : hops,
+            'cost' : sum(hop['cost'] for hop in hops)
+        }
+
+
+    def _resolve_node(self, node : typing.Union[Entity, str]) -> Entity:
+        if isinstance(node, str):
+            if self._identifier_index is None:
+                self._identifier_index = {ent.identifier: ent for ent in self.nodes()}
+            ent = self._identifier_index.get(node)
+        else:
+            ent = node if self.has_node(node) else None
+        if ent is None:
+            raise Exception(f'{node} is not a node of this graph')
+        return ent
+
+    def _join_hops(self, path : tuple) -> typing.List[tuple]:
+        """
+The (entity, entity, entity key, entity key) hops along a path of nodes
+        """
+        hops = []
+        for n1, n2 in zip(path, path[1:]):
+            attr = self[n1][n2].get('attr', {})
+            hops.append((n1, n2, attr.get(f'{n1.identifier}_key'), attr.get(f'{n2.identifier}_key')))
+        return hops
+
+    def _node_paths(self, start : Entity, end : Entity, k : int) -> list:
+        key = (start, end, k)
+        paths = self._path_cache.get(key)
+        if paths is None:
+            if start is end:
+                paths = [(start,)]
+            else:
+                try:
+                    if k == 1:
+                        paths = [tuple(nx.bidirectional_shortest_path(self, start, end))]
+                    else:
+                        paths = [tuple(path) for path in itertools.islice(nx.shortest_simple_paths(self, start, end), k)]
+                except nx.NetworkXNoPath:
+                    paths = []
+            self._path_cache.put(key, paths)
+        return paths
+
+    def join_paths(self,
+            start : typing.Union[Entity, str],
+            end : typing.Union[Entity, str],
+            k : int = 1
+            ) -> typing.List[typing.List[tuple]]:
+        """
+The `k` shortest ways to join `start` to `end`, fewest hops first, with a
+bidirectional breadth first search for the shortest one and Yen's
+algorithm for the others
+
+Each path is a list of (entity, entity, entity key, entity key) hops,
+keys as in the edge attributes. Results are memoized until the graph
+changes
+
+start: `Entity` or identifier to join from
+end: `Entity` or identifier to join to
+k: int of paths to return
+
+Returns an empty list when `start` and `end` are not connected
+        """
+        start, end = self._resolve_node(start), self._resolve_node(end)
+        return [self._join_hops(path) for path in self._node_paths(start, end, k)]
+
+    def shortest_join_path(self,
+            start : typing.Union[Entity, str],
+            end : typing.Union[Entity, str]
+            ) -> typing.Optional[typing.List[tuple]]:
+        """
+The shortest way to join `start` to `end` as (entity, entity, entity key,
+entity key) hops, None when they are not connected
+        """
+        paths = self.join_paths(start, end)
+        return paths[0] if paths else None
+
+    def join_paths_batch(self,
+            pairs : typing.Iterable[tuple],
+            k : int = 1
+            ) -> typing.List[typing.List[typing.List[tuple]]]:
+        """
+`join_paths` of many (start, end) pairs, for single shortest paths the
+uncached pairs sharing a start with many ends are answered by one breadth
+first search
+
+Among equally short paths the one returned may differ from `join_paths`
+
+Returns a list of `join_paths` results aligned with `pairs`
+        """
+        pairs = [(self._resolve_node(start), self._resolve_node(end)) for start, end in pairs]
+        found = {}
+        if k == 1:
+            pending = collections.defaultdict(set)
+            for start, end in pairs:
+                if start is not end and (start, end, k) not in self._path_cache:
+                    pending[start].add(end)
+            # a shared search may visit the whole graph while a bidirectional
+            # one visits about the square root of it on sparse graphs
+            shared = max(2, int(len(self) ** 0.5))
+            for start, ends in pending.items():
+                if len(ends) < shared:
+                    continue
+                paths = bfs_paths(self._adj, start, ends)
+                for end in ends:
+                    found[start, end] = [paths[end]] if end in paths else []
+                    self._path_cache.put((start, end, k), found[start, end])
+        return [
+            [self._join_hops(path) for path in (found[start, end] if (start, end) in found else self._node_paths(start, end, k))]
+            for start, end in pairs
+        ]
+
+    def optimize_paths_distance_hops(self, start, end, k : int = 5) -> dict:
+        """
+Shortest paths of nodes between two nodes
+
+Usage: `G.optimize_paths_distance_hops('db.schema.table1', 'db.schema.table2')`
+-> {'path' : [table1, tableX, table2], 'paths' : [[table1, tableX, table2], ...]}
 
 Parameters
 ----------
-start : str node to start with
-end : str node to end with
+start : `Entity` or identifier of the node to start with
+end : `Entity` or identifier of the node to end with
+k : int of paths to return in `paths`
 Returns
 ---------
-paths : list of paths to take
+paths : dict of the shortest `path` and the `k` shortest `paths`, see
+    `join_paths` for the join keys of each hop
         """
-        nodes_to_traverse = []
-        paths = {}
-        for n in G.neighbors(start):
-            nodes_to_traverse.append( n )
-            try:
-                paths[n] = {
-                        'path' : [start, n],
-                        'paths' : []
-                        }
-            except Exception as e:
-                print("Failed on node: {0}".format(n))
-        while len(nodes_to_traverse) > 0:
-            n = nodes_to_traverse[0]
-            del nodes_to_traverse[0]
-            for n1 in G.neighbors(n):
-                if not paths.get(n1):
-                    paths[n1] = {
-                        'path' : paths[n]['path'] + [n1],
-                        'paths' : [ paths[n]['path'] + [n1] ]
-                        }
-                    nodes_to_traverse.append(n1)
-                else:
-                    paths[n1]['paths'].append(paths[n]['path'] + [n1])
-                    if len(paths[n1]['path']) >= len(paths[n]['path'] + [n1]):
-                        paths[n1]['path'] = paths[n]['path'] + [n1]
-        return paths[end]
-
+        paths = self._node_paths(self._resolve_node(start), self._resolve_node(end), k)
+        if not paths:
+            raise Exception(f'No path between {start} and {end}')
+        return {
+            'path' : list(paths[0]),
+            'paths' : [list(path) for path in paths]
+        }
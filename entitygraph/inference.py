@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+
+"""
+Edge inference engines shared by the graph builders and the sources
+"""
+
+# python standard libraries
+import bisect
+import posixpath
+import typing
+
+
+def table_name(identifier: str) -> str:
+    """
+Gets the table portion of a `database.schema.table` identifier
+    """
+    return identifier.rsplit('.', 1)[-1]
+
+
+def entity_name(identifier: str) -> str:
+    """
+The bare name of an entity, the table of a `database.schema.table`
+identifier or the file name without extension of a path
+    """
+    if '/' in identifier:
+        return posixpath.splitext(posixpath.basename(identifier.rstrip('/')))[0]
+    return table_name(identifier)
+
+
+def fk_names(table: str, strip_prefix: bool = False) -> tuple:
+    """
+Candidate foreign key column names for a table being referenced
+
+table: str of the table name (e.g. `customers`)
+strip_prefix: bool whether to also return the prefix stripped
+    variant (e.g. `dim_customer` -> `customer_id`)
+    """
+    if table.endswith('s'):
+        # strip the s at the end of the table name (e.g. customers_id becomes customer_id)
+        fkname1 = '{0}_id'.format(table[:-1])
+    else:
+        fkname1 = f'{table}_id'
+    if not strip_prefix:
+        return (fkname1,)
+    parts = fkname1.split('_')
+    fkname2 = '_'.join(parts[1:]) if len(parts) > 2 else None
+    if fkname2 and fkname2 != fkname1:
+        return (fkname1, fkname2)
+    return (fkname1,)
+
+
+class FKNameIndex:
+    def __init__(self,
+            entities: typing.Optional[typing.Iterable] = None,
+            strip_prefix: bool = False
+            ):
+        """
+Index of column names and candidate foreign key names so that naming
+convention edges (`customers` <- `customer_id`) resolve with hash lookups
+instead of comparing every entity against every other entity.
+
+Build time and memory grow with the total number of columns.
+
+entities: iterable of `Entity` objects to index
+strip_prefix: bool whether to also match prefix stripped foreign key names
+        """
+        self.strip_prefix = strip_prefix
+        # column name -> entities having that column, dicts are used
+        # as insertion ordered sets so the edge order is deterministic
+        self._columns = {}
+        # candidate fk name -> entities referenced by that name
+        self._fk_names = {}
+        self._entities = {}
+        for ent in entities or []:
+            self.add(ent)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, entity):
+        return entity in self._entities
+
+    def candidate_names(self, entity) -> tuple:
+        return fk_names(table_name(entity.identifier), strip_prefix=self.strip_prefix)
+
+    def add(self, entity):
+        """
+Index an entity's columns and candidate foreign key names
+        """
+        if entity in self._entities:
+            return
+        self._entities[entity] = None
+        for column in entity.columns:
+            self._columns.setdefault(column, {})[entity] = None
+        for name in self.candidate_names(entity):
+            self._fk_names.setdefault(name, {})[entity] = None
+
+    def remove(self, entity):
+        """
+Drop an entity from the index
+        """
+        if entity not in self._entities:
+            return
+        del self._entities[entity]
+        for column in entity.columns:
+            self._discard(self._columns, column, entity)
+        for name in self.candidate_names(entity):
+            self._discard(self._fk_names, name, entity)
+
+    @staticmethod
+    def _discard(index: dict, key, entity):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(entity, None)
+            if not bucket:
+                del index[key]
+
+    def referencing(self, entity) -> typing.Iterator[tuple]:
+        """
+Entities with a column named after `entity`
+
+Yields (referencing entity, column)
+        """
+        for name in self.candidate_names(entity):
+            for other in self._columns.get(name, ()):
+                if other is not entity:
+                    yield other, name
+
+    def referenced_by(self, entity) -> typing.Iterator[tuple]:
+        """
+Entities that `entity`'s columns are named after
+
+Yields (referenced entity, column)
+        """
+        for column in entity.columns:
+            for other in self._fk_names.get(column, ()):
+                if other is not entity:
+                    yield other, column
+
+    def edges(self) -> typing.Iterator[tuple]:
+        """
+All naming convention edges in the index
+
+Yields (referenced entity, referencing entity, column)
+        """
+        for entity in self._entities:
+            for other, column in self.referencing(entity):
+                yield entity, other, column
+
+
+def path_units(identifier: str, root: typing.Optional[str] = None) -> list:
+    """
+Name units of a file identifier used for matching, every contiguous run
+of `_` separated tokens in every path segment below `root`, e.g.
+`lake/dim_customers.parquet` -> `lake`, `dim`, `customers`, `dim_customers`
+    """
+    path = identifier
+    if root and path.startswith(root):
+        path = path[len(root):]
+    segments = [seg for seg in path.split('/') if seg]
+    if segments:
+        segments[-1] = posixpath.splitext(segments[-1])[0]
+    units = []
+    for seg in segments:
+        tokens = [tok for tok in seg.split('_') if tok]
+        for i in range(len(tokens)):
+            for j in range(i + 1, len(tokens) + 1):
+                units.append('_'.join(tokens[i:j]))
+    return units
+
+
+def column_prefix(column: str) -> str:
+    """
+The entity name a column refers to by convention (`customer_id` -> `customer`),
+empty for columns that aren't `_id` suffixed like `customer_name`
+    """
+    parts = column.split('_')
+    if len(parts) < 2 or parts[-1].lower() != 'id':
+        return ''
+    return '_'.join(parts[:-1])
+
+
+def prefix_range(keys: list, prefix: str) -> list:
+    """
+The keys of a sorted list of strings starting with `prefix`, found by
+bisection
+    """
+    lo = bisect.bisect_left(keys, prefix)
+    hi = bisect.bisect_left(keys, prefix + '\uffff', lo)
+    return keys[lo:hi]
+
+
+class PathTokenIndex:
+    def __init__(self,
+            entities: typing.Optional[typing.Iterable] = None,
+            root: typing.Optional[str] = None
+            ):
+        """
+Inverted index from path name units to file entities with a prefix/suffix
+matcher, so a column like `customer_id` resolves the entities whose paths
+mention `customer` (`customers.parquet`, `dim_customer/`) without scanning
+every identifier.
+
+entities: iterable of `Entity` objects to index
+root: str of the source root, path segments above it are shared by every
+    entity so they are not indexed
+        """
+        self.root = root
+        self._units = {}
+        # column prefix -> entities with a column of that prefix
+        self._prefixes = {}
+        self._entities = {}
+        # sorted unit and reversed unit lists for prefix/suffix matching,
+        # rebuilt lazily after the index changes
+        self._sorted = None
+        self._sorted_reversed = None
+        for ent in entities or []:
+            self.add(ent)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def __contains__(self, entity):
+        return entity in self._entities
+
+    def add(self, entity):
+        if entity in self._entities:
+            return
+        self._entities[entity] = None
+        for unit in path_units(entity.identifier, self.root):
+            self._units.setdefault(unit, {})[entity] = None
+        for column in entity.columns:
+            prefix = column_prefix(column)
+            if prefix:
+                self._prefixes.setdefault(prefix, {})[entity] = None
+        self._sorted = self._sorted_reversed = None
+
+    def remove(self, entity):
+        if entity not in self._entities:
+            return
+        del self._entities[entity]
+        for unit in path_units(entity.identifier, self.root):
+            FKNameIndex._discard(self._units, unit, entity)
+        for column in entity.columns:
+            FKNameIndex._discard(self._prefixes, column_prefix(column), entity)
+        self._sorted = self._sorted_reversed = None
+
+    def match(self, name: str) -> list:
+        """
+Entities with a path unit starting or ending with `name`
+        """
+        if not name:
+            return []
+        if self._sorted is None:
+            self._sorted = sorted(self._units)
+            self._sorted_reversed = sorted(unit[::-1] for unit in self._units)
+        matched = {}
+        for unit in prefix_range(self._sorted, name):
+            matched.update(self._units[unit])
+        for unit in prefix_range(self._sorted_reversed, name[::-1]):
+            matched.update(self._units[unit[::-1]])
+        return list(matched)
+
+    def referenced_by(self, entity) -> typing.Iterator[tuple]:
+        """
+Entities that `entity`'s columns refer to by name
+
+Yields (referenced entity, column)
+        """
+        for column in entity.columns:
+            for other in self.match(column_prefix(column)):
+                if other is not entity:
+                    yield other, column
+
+    def referencing(self, entity) -> typing.Iterator[tuple]:
+        """
+Entities with a column referring to `entity` by name, the inverse of
+`referenced_by`: every prefix or suffix of `entity`'s path units is a
+column prefix that would match it
+
+Yields (referencing entity, column)
+        """
+        names = {}
+        for unit in path_units(entity.identifier, self.root):
+            for i in range(1, len(unit) + 1):
+                names[unit[:i]] = None
+                names[unit[-i:]] = None
+        for name in names:
+            for other in self._prefixes.get(name, ()):
+                if other is entity:
+                    continue
+                for column in other.columns:
+                    if column_prefix(column) == name:
+                        yield other, column
+
+    def edges(self) -> typing.Iterator[tuple]:
+        """
+All column prefix to path edges in the index
+
+Yields (referencing entity, referenced entity, column)
+        """
+        for entity in self._entities:
+            for other, column in self.referenced_by(entity):
+                yield entity, other, column
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+Primary key election: declared primary keys and unique constraints first,
+otherwise the sampled columns that are unique and never null, ranked by
+how key like their names and types are
+"""
+
+# python standard libraries
+import collections
+import typing
+
+# third party libraries
+import numpy as np
+import pyarrow
+import pyarrow.compute as pc
+
+# internal libs
+from entitygraph.inference import entity_name, fk_names
+from entitygraph.names import reference_stem
+from entitygraph.types import type_family
+
+
+# type families a key column can have, floats, booleans and timestamps
+# look unique in small samples without identifying rows
+KEY_FAMILIES = ('integer', 'decimal', 'string', 'binary')
+
+
+def key_like_columns(columns : typing.Sequence[str], types : dict) -> list:
+    """
+Columns that can be a primary key by their type
+    """
+    return [c for c in columns if types.get(c) is None or type_family(types[c]) in KEY_FAMILIES]
+
+
+def column_scores(tables : typing.List[pyarrow.Table], chunk_rows : int = 1 << 22) -> typing.List[tuple]:
+    """
+The distinct and null ratios of every column of many samples in one pass
+
+Columns with nulls can't be keys, only their null rate is computed. Integer
+columns of all samples are stacked into a matrix per sample length and
+their repeats counted with one row wise sort per `chunk_rows` values,
+other columns are counted on their Arrow buffers without converting them
+to Python
+
+Returns a (column names, uniqueness, null rate) tuple per table, the
+ratios as arrays aligned with the names, uniqueness is NaN for columns
+with nulls
+    """
+    scores = []
+    # sample length -> integer columns of that length and where their
+    # uniqueness goes, mostly one length since samples share `n`
+    stacked, pending_rows = collections.defaultdict(list), 0
+
+    def count_stacked():
+        for length, columns in stacked.items():
+            # repeats are equal neighbors in each sorted row
+            matrix = np.sort(np.stack([values for values, _ in columns]), axis=1)
+            repeats = np.count_nonzero(matrix[:, 1:] == matrix[:, :-1], axis=1)
+            for (_, (uniqueness, i)), r in zip(columns, repeats.tolist()):
+                uniqueness[i] = (length - r) / max(length, 1)
+        stacked.clear()
+
+    for table in tables:
+        rows = max(table.num_rows, 1)
+        nulls = np.array([table.column(i).null_count for i in range(table.num_columns)], dtype=float)
+        uniqueness = np.full(table.num_columns, np.nan)
+        for i in np.flatnonzero(nulls == 0).tolist():
+            column = table.column(i)
+            if pyarrow.types.is_integer(column.type):
+                stacked[len(column)].append((column.to_numpy().astype(np.int64, copy=False), (uniqueness, i)))
+                pending_rows += len(column)
+            else:
+                uniqueness[i] = pc.count_distinct(column).as_py() / rows
+        scores.append((table.column_names, uniqueness, nulls / rows))
+        if pending_rows >= chunk_rows:
+            count_stacked()
+            pending_rows = 0
+    if stacked:
+        count_stacked()
+    return scores
+
+
+def _name_rank(identifier : str, column : str) -> int:
+    # `id` or the entity's own foreign key name, then other key names
+    if column == 'id' or column in fk_names(entity_name(identifier), strip_prefix=True):
+        return 0
+    if reference_stem(column) is not None:
+        return 1
+    return 2
+
+
+def pk_candidates(
+        identifier : str,
+        columns : typing.Sequence[str],
+        declared : typing.Optional[list] = None,
+        sample : typing.Optional[pyarrow.Table] = None,
+        scores : typing.Optional[tuple] = None,
+        nullable : typing.Optional[tuple] = None,
+        min_rows : int = 2,
+        rows : typing.Optional[float] = None
+        ) -> list:
+    """
+Primary key candidates of an entity, best first
+
+Declared keys come first: the primary key, then unique constraints with
+fewer columns first. Without any, the columns of the sample that are
+unique and never null in at least `min_rows` rows are ranked by their
+name, `id` or the entity's own foreign key name before other key names,
+then declared `NOT NULL` columns first, then by position
+
+identifier: str of the entity identifier
+columns: sequence of the entity's columns
+declared: optional list of (`p` or `u`, key) constraints
+sample: optional `pyarrow.Table` of key like columns, see `key_like_columns`
+scores: optional `column_scores` of the sample computed beforehand, or
+    the `stats.TableStats.scores` of the entity instead of a sample
+nullable: optional tuple of bools aligned with `columns`
+min_rows: int of sampled rows below which the sample proves nothing
+rows: optional float of the rows `scores` were taken over without a
+    sample, e.g. `stats.TableStats.rows`, held to `min_rows` as well
+    """
+    if declared:
+        # `p` sorts before `u`
+        return [key for _, key in sorted(declared, key=lambda c: (c[0], 0 if isinstance(c[1], str) else len(c[1])))]
+    if sample is None and scores is None:
+        return []
+    if sample is not None and sample.num_rows < min_rows:
+        return []
+    if sample is None and rows is not None and rows < min_rows:
+        return []
+    names, uniqueness, null_rate = scores or column_scores([sample])[0]
+    unique = np.flatnonzero((uniqueness >= 1.0) & (null_rate == 0))
+    position = {c: i for i, c in enumerate(columns)}
+    nullable = dict(zip(columns, nullable)) if nullable is not None else {}
+    found = [names[i] for i in unique.tolist()]
+    return sorted(found, key=lambda c: (
+        _name_rank(identifier, c),
+        bool(nullable.get(c, False)),
+        position.get(c, len(position))))
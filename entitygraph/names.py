@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+
+"""
+Fuzzy matching of column names to the entities they refer to, for naming
+styles the exact conventions of `entitygraph.inference` miss: `cust_id`,
+`CustomerKey` or `dim_customer.customer_sk` all refer to `customers`
+"""
+
+# python standard libraries
+import copy
+import functools
+import re
+import typing
+
+# third party libraries
+import numpy as np
+
+# internal libs
+from entitygraph.inference import entity_name, prefix_range
+
+
+# last tokens marking a column as a reference to another entity
+KEY_SUFFIXES = ('id', 'key', 'fk', 'sk', 'code', 'ref', 'no', 'num', 'nbr')
+
+# warehouse naming prefixes that are not part of an entity's name
+ENTITY_PREFIXES = ('dim', 'fact', 'fct', 'stg', 'tbl', 'raw', 'src', 'ref', 'lkp')
+
+ABBREVIATIONS = {
+    'acct': 'account',
+    'addr': 'address',
+    'amt': 'amount',
+    'cat': 'category',
+    'cust': 'customer',
+    'dept': 'department',
+    'emp': 'employee',
+    'inv': 'invoice',
+    'loc': 'location',
+    'mgr': 'manager',
+    'org': 'organization',
+    'pmt': 'payment',
+    'prod': 'product',
+    'qty': 'quantity',
+    'sku': 'product',
+    'txn': 'transaction',
+    'usr': 'user',
+    'vend': 'vendor',
+    'whse': 'warehouse',
+}
+
+IRREGULAR_PLURALS = {
+    'people': 'person',
+    'children': 'child',
+    'men': 'man',
+    'women': 'woman',
+    'data': 'data',
+    'status': 'status',
+    'address': 'address',
+}
+
+_SEPARATORS = re.compile(r'[^0-9A-Za-z]+')
+# `HTTPServer` -> `HTTP`, `Server` and `customerID` -> `customer`, `ID`
+_WORDS = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+
+def split_name(name : str) -> typing.List[str]:
+    """
+Lower case words of a snake, kebab, dotted or camel case name
+    """
+    return [word.lower() for part in _SEPARATORS.split(name) for word in _WORDS.findall(part)]
+
+
+def singular(word : str) -> str:
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes', 'zes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_words(name : str) -> typing.Tuple[str, ...]:
+    """
+Words of a name with abbreviations expanded and plurals made singular,
+`CustAddresses` -> (`customer`, `address`)
+    """
+    return tuple(singular(ABBREVIATIONS.get(word, word)) for word in split_name(name))
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def reference_stem(column : str) -> typing.Optional[str]:
+    """
+The normalized name of the entity a column refers to, the words before a
+key suffix (`cust_id`, `CustomerKey` -> `customer`), or None for a column
+that does not look like a reference
+    """
+    words = normalize_words(column)
+    if len(words) < 2 or words[-1] not in KEY_SUFFIXES:
+        return None
+    return '_'.join(words[:-1])
+
+
+def entity_stems(identifier : str) -> typing.Tuple[str, ...]:
+    """
+Normalized names an entity is referred to by, its full name and the name
+without a warehouse prefix, `dim_customers` -> (`dim_customer`, `customer`)
+    """
+    words = normalize_words(entity_name(identifier))
+    if not words:
+        return ()
+    stems = ['_'.join(words)]
+    if len(words) > 1 and words[0] in ENTITY_PREFIXES:
+        stems.append('_'.join(words[1:]))
+    return tuple(stems)
+
+
+def ngrams(name : str, n : int = 3) -> typing.List[str]:
+    # padded so short names have grams and prefixes weigh in
+    padded = f'#{name}#'
+    return list(dict.fromkeys(padded[i:i + n] for i in range(max(1, len(padded) - n + 1))))
+
+
+def name_similarity(stem : str, name : str, n : int = 3) -> float:
+    """
+Similarity of a reference stem to an entity name between 0 and 1, the
+dice coefficient of their character n-grams, raised for a stem that
+abbreviates the name (`cus` of `customer`, `ordr` of `order`)
+    """
+    if stem == name:
+        return 1.0
+    grams1, grams2 = set(ngrams(stem, n)), set(ngrams(name, n))
+    dice = 2 * len(grams1 & grams2) / (len(grams1) + len(grams2))
+    return max(dice, _abbreviation_score(stem, name))
+
+
+def _abbreviation_score(stem : str, name : str) -> float:
+    # `cus` or `ordr` abbreviate `customer` and `order`: same first letter
+    # and the stem's letters in order
+    if len(stem) < 3 or len(stem) >= len(name) or stem[0] != name[0]:
+        return 0.0
+    letters = iter(name)
+    if all(letter in letters for letter in stem):
+        return 0.5 + 0.5 * len(stem) / len(name)
+    return 0.0
+
+
+class NameIndex:
+    def __init__(self,
+            entities : typing.Optional[typing.Iterable] = None,
+            n : int = 3,
+            max_postings : typing.Optional[int] = None
+            ):
+        """
+Character n-gram inverted index of entity names, so a reference stem is
+only scored against the entities sharing one of its n-grams instead of
+every entity
+
+The postings are built once into numpy arrays and a lookup counts the
+shared n-grams of all its candidates in one pass, grams shared by more
+than `max_postings` names (e.g. `#id`) are too common to block on and
+skipped, and names a stem abbreviates by its start are found by bisecting
+the sorted names. Entities with the same normalized name share one posting
+
+entities: iterable of `Entity` objects to index
+n: int of characters per gram
+max_postings: optional int, defaults to 1% of the names and at least 1000
+        """
+        self.n = n
+        self._entities = {}
+        for ent in entities or []:
+            for stem in entity_stems(ent.identifier):
+                self._entities.setdefault(stem, []).append(ent)
+        self.names = list(self._entities)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self._sorted = sorted(self.names)
+        self.max_postings = max_postings or max(1000, len(self.names) // 100)
+
+        grams = {}
+        gram_ids, name_ids = [], []
+        self._gram_counts = np.zeros(len(self.names), dtype=np.int32)
+        for i, name in enumerate(self.names):
+            name_grams = ngrams(name, n)
+            self._gram_counts[i] = len(name_grams)
+            for gram in name_grams:
+                gram_ids.append(grams.setdefault(gram, len(grams)))
+                name_ids.append(i)
+        self._grams = grams
+        # csr layout, the postings of gram g are _postings[_offsets[g]:_offsets[g + 1]]
+        gram_ids = np.asarray(gram_ids, dtype=np.int64)
+        order = np.argsort(gram_ids, kind='stable')
+        self._postings = np.asarray(name_ids, dtype=np.int32)[order]
+        self._offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(grams)), out=self._offsets[1:])
+
+    def __len__(self):
+        return len(self.names)
+
+    def entities(self, name : str) -> list:
+        return self._entities.get(name, [])
+
+    def lookup(self, stem : str, min_score : float = 0.7, limit : int = 3) -> typing.List[tuple]:
+        """
+The entity names best matching a reference stem, see `name_similarity`
+
+Returns a list of at most `limit` (name, score) tuples, best first
+        """
+        exact = self._ids.get(stem)
+        query = ngrams(stem, self.n)
+        postings = []
+        for gram in query:
+            g = self._grams.get(gram)
+            if g is None:
+                continue
+            start, end = self._offsets[g], self._offsets[g + 1]
+            if end - start <= self.max_postings:
+                postings.append(self._postings[start:end])
+        matches = {}
+        if postings:
+            ids, shared = np.unique(np.concatenate(postings), return_counts=True)
+            scores = 2 * shared / (len(query) + self._gram_counts[ids])
+            keep = scores >= min_score
+            matches = dict(zip([self.names[i] for i in ids[keep].tolist()], scores[keep].tolist()))
+            # only names sharing a few grams can be abbreviated by the stem
+            for i in ids[~keep & (shared >= 2)].tolist():
+                score = _abbreviation_score(stem, self.names[i])
+                if score >= min_score:
+                    matches[self.names[i]] = score
+        if len(stem) >= 3:
+            # names the stem abbreviates by its start may only share common
+            # grams, they are found by bisecting the sorted names
+            for name in prefix_range(self._sorted, stem):
+                score = _abbreviation_score(stem, name)
+                if score >= min_score and score > matches.get(name, 0.0):
+                    matches[name] = score
+        if exact is not None:
+            matches[stem] = 1.0
+        return sorted(matches.items(), key=lambda match: (-match[1], match[0]))[:limit]
+
+    def names_only(self) -> 'NameIndex':
+        """
+A copy of the index without its entities, cheap to send to a worker
+process that only runs `lookup`
+        """
+        index = copy.copy(self)
+        index._entities = dict.fromkeys(self._entities, ())
+        return index
+
+    def references(self,
+            entities : typing.Iterable,
+            min_score : float = 0.7,
+            limit : int = 1,
+            matches : typing.Optional[dict] = None
+            ) -> typing.Iterator[tuple]:
+        """
+Columns of `entities` referring to indexed entities by name, each
+distinct stem is looked up once however many columns share it
+
+matches: optional dict of stem -> `lookup` results computed beforehand,
+    e.g. by worker processes, missing stems are looked up
+
+Yields (referenced entity, referencing entity, column, score)
+        """
+        stems = dict(matches or {})
+        for ent in entities:
+            for column in ent.columns:
+                stem = reference_stem(column)
+                if stem is None:
+                    continue
+                if stem not in stems:
+                    stems[stem] = self.lookup(stem, min_score=min_score, limit=limit)
+                for name, score in stems[stem]:
+                    for other in self._entities[name]:
+                        if other is not ent:
+                            yield other, ent, column, score
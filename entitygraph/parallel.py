@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Process pool execution of the CPU bound edge inference engines: column
+sketching and name matching are sharded over worker processes, which get
+compact payloads, the source's config and plain column lists or entity
+names, instead of `Entity` and source objects, and hand back plain
+results that are merged in shard order so the outcome does not depend on
+the number of processes
+"""
+
+# python standard libraries
+import concurrent.futures
+import os
+import typing
+
+# internal libs
+from entitygraph.entity import Entity
+from entitygraph.names import NameIndex
+from entitygraph.sketches import SketchIndex, compact, sketch_entity
+
+
+# per worker process state set by the pool initializers
+_worker = {}
+
+
+def default_processes() -> int:
+    return os.cpu_count() or 1
+
+
+def shard(items : list, shards : int) -> typing.List[list]:
+    """
+Splits items into at most `shards` contiguous, evenly sized lists
+    """
+    shards = max(1, min(shards, len(items)))
+    size, extra = divmod(len(items), shards)
+    out, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        out.append(items[start:end])
+        start = end
+    return out
+
+
+def _run(
+        fn : typing.Callable,
+        shards : typing.List[list],
+        processes : int,
+        initializer : typing.Callable,
+        initargs : tuple
+        ) -> typing.Iterator:
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=initializer,
+            initargs=initargs) as executor:
+        # `map` yields in submission order, whichever shard finishes first
+        for results in executor.map(fn, shards):
+            yield from results
+
+
+def _init_sketch_worker(source_cls : type, config : dict, num_perm : int, precision : int, seed : int):
+    _worker['source'] = source_cls.from_config(config)
+    _worker['index'] = SketchIndex(num_perm=num_perm, precision=precision, seed=seed)
+
+
+def _sketch_shard(payload : tuple) -> list:
+    units, n, full_scan, batch_size = payload
+    source, index = _worker['source'], _worker['index']
+    results = []
+    for identifier, entity_columns, column_type_map, columns in units:
+        # the catalog types decide how samples are parsed, as in this process
+        ent = Entity(source, identifier, columns=entity_columns, column_type_map=column_type_map)
+        sketches = sketch_entity(ent, columns, index, n=n, full_scan=full_scan, batch_size=batch_size)
+        results.append([(column, *compact(sketch)) for column, sketch in sketches.items()])
+    return results
+
+
+def sketch_index(
+        source,
+        units : typing.List[tuple],
+        index : SketchIndex,
+        n : int = 10000,
+        full_scan : bool = False,
+        batch_size : int = 65536,
+        processes : typing.Optional[int] = None,
+        shards_per_process : int = 4
+        ) -> typing.Iterator[typing.List[tuple]]:
+    """
+Sketches entities in worker processes that reopen `source` from its
+`get_worker_config`
+
+units: list of (identifier, entity columns, column type map, columns to
+    sketch), entities are rebuilt from them in the workers
+index: `SketchIndex` whose permutations the workers use
+processes: optional int of worker processes, one per cpu by default
+shards_per_process: int of shards per process so a slow shard does not
+    leave the other processes idle
+
+Yields a list of `compact` (column, signature, distinct, rows) per unit,
+in order
+    """
+    processes = processes or default_processes()
+    shards = [
+        (part, n, full_scan, batch_size)
+        for part in shard(list(units), processes * shards_per_process)
+    ]
+    initargs = (type(source), source.get_worker_config(), len(index.a), index.precision, index.seed)
+    yield from _run(_sketch_shard, shards, processes, _init_sketch_worker, initargs)
+
+
+def _init_name_worker(index : NameIndex):
+    _worker['names'] = index
+
+
+def _lookup_shard(payload : tuple) -> list:
+    stems, min_score, limit = payload
+    index = _worker['names']
+    return [index.lookup(stem, min_score=min_score, limit=limit) for stem in stems]
+
+
+def lookup_stems(
+        index : NameIndex,
+        stems : typing.List[str],
+        min_score : float = 0.7,
+        limit : int = 1,
+        processes : typing.Optional[int] = None,
+        shards_per_process : int = 4
+        ) -> dict:
+    """
+`NameIndex.lookup` of many stems in worker processes, each gets a copy of
+the index without its entities
+
+Returns a dict of stem -> lookup results, in the order of `stems`
+    """
+    processes = processes or default_processes()
+    stems = list(dict.fromkeys(stems))
+    shards = [(part, min_score, limit) for part in shard(stems, processes * shards_per_process)]
+    results = _run(_lookup_shard, shards, processes, _init_name_worker, (index.names_only(),))
+    return dict(zip(stems, results))
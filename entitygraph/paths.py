@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+"""
+Path searches over an `EntityGraph`
+"""
+
+# python standard libraries
+import collections
+import heapq
+import itertools
+import typing
+
+
+def bfs_paths(adj : typing.Mapping, start, targets : typing.Iterable) -> dict:
+    """
+Shortest paths from `start` to every reachable node of `targets` with a
+single breadth first search that stops once every target was reached
+
+adj: mapping of node -> iterable of neighbors, e.g. `nx.Graph.adj`
+start: node to search from
+targets: iterable of nodes to find paths to
+
+Returns a dict of target -> tuple of nodes from `start` to the target,
+unreachable targets are left out
+    """
+    remaining = set(targets)
+    predecessors = {start: None}
+    found = []
+    if start in remaining:
+        remaining.discard(start)
+        found.append(start)
+    queue = collections.deque([start])
+    while queue and remaining:
+        node = queue.popleft()
+        for neighbor in adj[node]:
+            if neighbor in predecessors:
+                continue
+            predecessors[neighbor] = node
+            if neighbor in remaining:
+                remaining.discard(neighbor)
+                found.append(neighbor)
+            queue.append(neighbor)
+
+    paths = {}
+    for target in found:
+        path = []
+        node = target
+        while node is not None:
+            path.append(node)
+            node = predecessors[node]
+        paths[target] = tuple(reversed(path))
+    return paths
+
+
+def dijkstra_nearest(
+        adj : typing.Mapping,
+        sources : typing.Iterable,
+        targets : typing.Iterable,
+        weight : typing.Callable
+        ) -> typing.Optional[tuple]:
+    """
+Cheapest path from any of `sources` to the nearest of `targets`, the
+search stops as soon as a target is settled
+
+adj: mapping of node -> mapping of neighbor -> edge data, e.g. `nx.Graph.adj`
+sources: iterable of nodes to search from, at no cost
+targets: iterable of nodes to search for
+weight: callable of (node, neighbor, edge data) returning a non negative cost
+
+Returns a (cost, tuple of nodes) or None when no target is reachable
+    """
+    targets = set(targets)
+    # the counter breaks cost ties in insertion order, nodes aren't comparable
+    counter = itertools.count()
+    heap = []
+    best = {}
+    predecessors = {}
+    for source in sources:
+        best[source] = 0
+        predecessors[source] = None
+        heapq.heappush(heap, (0, next(counter), source))
+    settled = set()
+    while heap:
+        cost, _, node = heapq.heappop(heap)
+        if node in settled:
+            continue
+        settled.add(node)
+        if node in targets:
+            path = []
+            while node is not None:
+                path.append(node)
+                node = predecessors[node]
+            return cost, tuple(reversed(path))
+        for neighbor, data in adj[node].items():
+            if neighbor in settled:
+                continue
+            candidate = cost + weight(node, neighbor, data)
+            if neighbor not in best or candidate < best[neighbor]:
+                best[neighbor] = candidate
+                predecessors[neighbor] = node
+                heapq.heappush(heap, (candidate, next(counter), neighbor))
+    return None
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""
+Connection pooling for sources that talk to a database server
+"""
+
+# python standard libraries
+import contextlib
+import threading
+import typing
+
+
+class ConnectionPool:
+    def __init__(self,
+            connect : typing.Callable[[str], typing.Any],
+            maxconn : int = 4
+            ):
+        """
+A thread safe pool of DB-API connections keyed by database name
+
+connect: callable taking a database name and returning a new connection
+maxconn: int of connections open at once per database, callers block
+    until one is free
+        """
+        self._connect = connect
+        self.maxconn = maxconn
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+
+    def _slot(self, database : str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if database not in self._slots:
+                self._slots[database] = threading.BoundedSemaphore(self.maxconn)
+                self._idle[database] = []
+            return self._slots[database]
+
+    @contextlib.contextmanager
+    def connection(self, database : str):
+        """
+Borrows a connection to `database` for the duration of the `with` block
+        """
+        slot = self._slot(database)
+        slot.acquire()
+        conn = None
+        try:
+            with self._lock:
+                idle = self._idle[database]
+                conn = idle.pop() if idle else None
+            if conn is None:
+                conn = self._connect(database)
+            yield conn
+        except Exception:
+            if conn is not None and not getattr(conn, 'closed', False):
+                conn.rollback()
+            raise
+        finally:
+            if conn is not None and not getattr(conn, 'closed', False):
+                with self._lock:
+                    self._idle[database].append(conn)
+            slot.release()
+
+    def closeall(self):
+        """
+Closes every idle connection in the pool
+        """
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+                conns.clear()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+
+"""
+Column sketches for value based edge inference: MinHash signatures to
+estimate how much two columns' values overlap, HyperLogLog to count their
+distinct values, and locality sensitive hashing to only compare columns
+that likely share values
+"""
+
+# python standard libraries
+import logging
+import traceback
+import typing
+
+# third party libraries
+import numpy as np
+import pandas as pd
+import pyarrow
+import pyarrow.compute as pc
+
+# internal libs
+from entitygraph.types import type_family
+
+
+_MAX_HASH = np.uint64(0xFFFFFFFFFFFFFFFF)
+# odd 64 bit constant mixing the rows of a band into one bucket code
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+# numeric families are hashed as int64 so `int32`, `int64` and whole
+# `numeric` keys match, other floats and decimals as float64
+_NUMERIC = ('integer', 'floating', 'decimal')
+_COMPATIBLE = {
+    'integer': ('integer', 'decimal'),
+    'decimal': ('integer', 'decimal'),
+}
+
+
+def hash_values(values : pyarrow.Array) -> np.ndarray:
+    """
+64 bit hashes of the distinct non null values of an array
+    """
+    if pyarrow.types.is_dictionary(values.type):
+        values = values.dictionary_decode()
+    values = pc.unique(values.drop_null())
+    family = type_family(str(values.type))
+    if family in _NUMERIC:
+        return _hash_numeric(values, family)
+    if family in ('string', 'binary'):
+        array = values.to_numpy(zero_copy_only=False)
+    else:
+        array = pc.cast(values, pyarrow.string()).to_numpy(zero_copy_only=False)
+    return pd.util.hash_array(array, categorize=False).astype(np.uint64, copy=False)
+
+
+def _hash_numeric(values : pyarrow.Array, family : str) -> np.ndarray:
+    if family == 'integer':
+        # ids above 2**53 aren't exact as float64, unsigned ones wrap around
+        return pd.util.hash_array(pc.cast(values, pyarrow.int64(), safe=False).to_numpy(), categorize=False)
+    if family == 'decimal':
+        try:
+            return pd.util.hash_array(pc.cast(values, pyarrow.int64()).to_numpy(), categorize=False)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+            pass
+    floats = pc.cast(values, pyarrow.float64()).to_numpy()
+    hashes = pd.util.hash_array(floats, categorize=False)
+    whole = np.isfinite(floats) & (np.floor(floats) == floats) & (np.abs(floats) < 2.0 ** 63)
+    if whole.any():
+        hashes[whole] = pd.util.hash_array(floats[whole].astype(np.int64), categorize=False)
+    return hashes
+
+
+def _bit_length(x : np.ndarray) -> np.ndarray:
+    x = x.copy()
+    length = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        length[high] += shift
+        x[high] >>= np.uint64(shift)
+    length += (x > 0).astype(np.uint8)
+    return length
+
+
+def _bucket_pairs(members : np.ndarray, code : np.ndarray, n : int, max_bucket : int) -> np.ndarray:
+    """
+Every pair of `members` sharing a bucket `code`, as `i * n + j` codes with
+i < j, buckets of a single member or more than `max_bucket` are skipped
+    """
+    order = np.argsort(code, kind='stable')
+    sorted_code = code[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_code[1:] != sorted_code[:-1]]))
+    sizes = np.diff(np.append(starts, len(order)))
+    found = []
+    # buckets of the same size are expanded together
+    for size in np.unique(sizes[(sizes > 1) & (sizes <= max_bucket)]).tolist():
+        group = members[order[starts[sizes == size][:, None] + np.arange(size)]]
+        group.sort(axis=1)
+        i, j = np.triu_indices(size, 1)
+        found.append((group[:, i].astype(np.int64) * n + group[:, j]).ravel())
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+class ColumnSketch:
+    __slots__ = ('a', 'b', 'precision', 'rows', 'signature', 'registers')
+
+    def __init__(self, a : np.ndarray, b : np.ndarray, precision : int = 12):
+        """
+MinHash signature and HyperLogLog registers of one column, updated batch
+by batch so a column can be sketched from a sample or a full scan
+
+a, b: uint64 arrays of the MinHash permutations `a * h + b`, shared by
+    every sketch that is compared
+precision: int of HyperLogLog register index bits, 2 ** precision
+    registers of one byte with a ~1.04 / sqrt(2 ** precision) error
+        """
+        self.a = a
+        self.b = b
+        self.precision = precision
+        self.rows = 0
+        self.signature = np.full(len(a), _MAX_HASH, dtype=np.uint64)
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values : pyarrow.Array):
+        """
+Adds a batch of values
+        """
+        self.rows += len(values) - values.null_count
+        hashes = hash_values(values)
+        if not len(hashes):
+            return
+        # chunks bound the len(hashes) x num_perm matrix to ~8MB
+        chunk = max(1, (1 << 20) // len(self.a))
+        for start in range(0, len(hashes), chunk):
+            part = hashes[start:start + chunk, None]
+            # uint64 arithmetic wraps, which is the permutation we want
+            np.minimum(self.signature, (part * self.a + self.b).min(axis=0), out=self.signature)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        rank = (bits + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    @property
+    def distinct(self) -> float:
+        """
+HyperLogLog estimate of the number of distinct values
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small sets
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+def compact(sketch : ColumnSketch) -> tuple:
+    """
+The (signature, distinct, rows) of a finished sketch that an index keeps,
+the low 32 bits of the minima are plenty to compare them
+    """
+    return sketch.signature.astype(np.uint32), sketch.distinct, sketch.rows
+
+
+def sketch_entity(
+        entity,
+        columns : typing.List[str],
+        index : 'SketchIndex',
+        n : int = 10000,
+        full_scan : bool = False,
+        batch_size : int = 65536
+        ) -> typing.Dict[str, ColumnSketch]:
+    """
+Sketches columns of an entity from a sample of `n` rows, or a streaming
+scan of every row with `full_scan`
+
+Returns a dict of column -> `ColumnSketch`, empty when the entity could
+not be read
+    """
+    if not columns:
+        return {}
+    sketches = {column: index.sketch() for column in columns}
+    try:
+        if full_scan:
+            batches = entity.source.iter_batches(entity, columns=columns, batch_size=batch_size)
+        else:
+            batches = entity.source.get_cached_sample(entity, n=n, columns=columns, as_arrow=True).to_batches()
+        for batch in batches:
+            for column in columns:
+                if column in batch.schema.names:
+                    sketches[column].update(batch.column(column))
+    except Exception:
+        logging.warning(f'Could not sketch {entity.identifier}: {traceback.format_exc()}')
+        return {}
+    return sketches
+
+
+class SketchIndex:
+    def __init__(self, num_perm : int = 128, precision : int = 12, seed : int = 1):
+        """
+Compact index of column sketches, only the MinHash signature, the
+distinct and non null row counts and the type of a column are kept, so
+memory grows by about `4 * num_perm` bytes per column
+
+num_perm: int of MinHash permutations
+precision: int of HyperLogLog index bits used while sketching a column
+seed: int seeding the MinHash permutations, indexes are only comparable
+    with the same seed and `num_perm`
+        """
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.precision = precision
+        # (entity, column) of every indexed column
+        self.keys = []
+        self.families = []
+        self._signatures = []
+        self._distinct = []
+        self._rows = []
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sketch(self) -> ColumnSketch:
+        return ColumnSketch(self.a, self.b, self.precision)
+
+    def add(self, key : tuple, sketch : ColumnSketch, arrow_type : typing.Optional[str] = None):
+        """
+Indexes a finished sketch, its HyperLogLog registers are dropped
+        """
+        self.add_signature(key, *compact(sketch), arrow_type=arrow_type)
+
+    def add_signature(self,
+            key : tuple,
+            signature : np.ndarray,
+            distinct : float,
+            rows : int,
+            arrow_type : typing.Optional[str] = None
+            ):
+        """
+Indexes a sketch's `compact` form, e.g. as returned by a worker process
+        """
+        self.keys.append(key)
+        self.families.append(type_family(arrow_type) if arrow_type else None)
+        self._signatures.append(signature)
+        self._distinct.append(distinct)
+        self._rows.append(rows)
+        self._matrix = None
+
+    @property
+    def signatures(self) -> np.ndarray:
+        if self._matrix is None:
+            if self._signatures:
+                self._matrix = np.vstack(self._signatures)
+            else:
+                self._matrix = np.empty((0, len(self.a)), dtype=np.uint32)
+            # one matrix instead of a list of arrays
+            self._signatures = [self._matrix]
+        return self._matrix
+
+    def candidates(self,
+            rows_per_band : int = 1,
+            max_bucket : int = 256,
+            min_matches : int = 2
+            ) -> np.ndarray:
+        """
+Column pairs sharing at least `min_matches` LSH buckets, found by sorting
+every band's bucket codes instead of comparing every pair of columns
+
+A single row per band suits containment: a column contained in a larger
+one matches its minimum in about |small| / |large| of the permutations,
+too rarely for wide bands. Buckets larger than `max_bucket`, values
+shared by many columns like small integers, are skipped
+
+Returns an (n, 2) int64 array of index pairs, lower index first
+        """
+        signatures = self.signatures
+        n = len(signatures)
+        live = np.flatnonzero(np.asarray(self._distinct) > 0)
+        pairs = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        for band in range(signatures.shape[1] // rows_per_band):
+            rows = signatures[live, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+            code = rows[:, 0]
+            for i in range(1, rows_per_band):
+                code = code * _BAND_MIX ^ rows[:, i]
+            band_pairs = _bucket_pairs(live, code, n, max_bucket)
+            if not len(band_pairs):
+                continue
+            # merged every band so memory is bounded by the distinct pairs
+            pairs, inverse = np.unique(np.concatenate([pairs, band_pairs]), return_inverse=True)
+            counts = np.bincount(
+                    inverse.ravel(),
+                    weights=np.concatenate([counts, np.ones(len(band_pairs), dtype=np.int64)]),
+                    minlength=len(pairs)).astype(np.int64)
+        pairs = pairs[counts >= min_matches]
+        return np.stack([pairs // n, pairs % n], axis=1)
+
+    def containment(self, i : np.ndarray, j : np.ndarray) -> np.ndarray:
+        """
+Estimated share of the distinct values of columns `i` found in columns
+`j`, from the MinHash resemblance and the distinct counts
+        """
+        signatures = self.signatures
+        jaccard = np.mean(signatures[i] == signatures[j], axis=1)
+        distinct = np.asarray(self._distinct)
+        intersection = jaccard / (1 + jaccard) * (distinct[i] + distinct[j])
+        return np.minimum(1.0, intersection / np.maximum(distinct[i], 1.0))
+
+    def uniqueness(self) -> np.ndarray:
+        """
+Estimated distinct values per non null value of every column
+        """
+        return np.asarray(self._distinct) / np.maximum(np.asarray(self._rows, dtype=float), 1.0)
+
+    def compatible(self, i : int, j : int) -> bool:
+        family1, family2 = self.families[i], self.families[j]
+        if family1 is None or family2 is None or family1 == family2:
+            return True
+        return family2 in _COMPATIBLE.get(family1, ())
+
+    def inclusion_dependencies(self,
+            min_containment : float = 0.8,
+            min_uniqueness : float = 0.9,
+            rows_per_band : int = 1,
+            max_bucket : int = 256,
+            min_matches : int = 2
+            ) -> typing.List[tuple]:
+        """
+Column pairs whose values are contained in the other's, a foreign key in
+a type compatible key: the containing column is (nearly) unique and
+holds at least `min_containment` of the contained column's values. A
+(nearly) unique column is a key itself and never taken as contained, two
+sequences like `customers.id` and `orders.oid` contain each other's values
+without referring to each other
+
+Returns a list of (contained index, containing index, containment)
+        """
+        pairs = self.candidates(rows_per_band=rows_per_band, max_bucket=max_bucket, min_matches=min_matches)
+        if not len(pairs):
+            return []
+        # both directions of every candidate pair
+        i = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        j = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        distinct = np.asarray(self._distinct)
+        containment = self.containment(i, j)
+        uniqueness = self.uniqueness()
+        keep = (
+            (containment >= min_containment)
+            & (uniqueness[j] >= min_uniqueness)
+            & (uniqueness[i] < min_uniqueness)
+            # a key holds at least about as many values as what it contains
+            & (distinct[i] <= distinct[j] * 1.05)
+        )
+        found = []
+        for a, b, c in zip(i[keep].tolist(), j[keep].tolist(), containment[keep].tolist()):
+            if self.keys[a][0] != self.keys[b][0] and self.compatible(a, b):
+                found.append((a, b, c))
+        found.sort()
+        return found
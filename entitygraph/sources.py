@@ -4,24 +4,37 @@
 Data sources for an entitygraph to infer from
 """
 
+import io
 import os
 import re
 import sys
 import typing
 import logging
+import itertools
+import operator
+import collections
+import concurrent.futures
 
 import psycopg2
+import psycopg2.sql
 import pandas as pd
 import networkx as nx
 import boto3
 import pyarrow
+import pyarrow.compute as pc
+import pyarrow.csv
 from pyarrow import dataset as ds
+from pyarrow import parquet as pq
 from pyarrow import fs
 
 
 from entitygraph.base_source import BaseSource
 from entitygraph.entity import Entity
 from entitygraph.enums import FileProvider, StorageFormat
+from entitygraph.inference import FKNameIndex
+from entitygraph.pool import ConnectionPool
+from entitygraph.stats import ColumnStats, TableStats
+from entitygraph.types import arrow_type, postgres_arrow_type_name, type_family
 
 
 root = logging.getLogger()
@@ -39,8 +52,32 @@ class PostgresSource(BaseSource):
             databases = [],
             schemas = [],
             tables = [],
-            columns = { }
+            columns = { },
+            use_pg_catalog : bool = False,
+            stream : bool = False,
+            fetch_size : int = 10000,
+            concurrent : bool = False,
+            max_workers : int = 4,
+            connection_factory : typing.Optional[typing.Callable] = None
             ):
+        """
+databases, schemas, tables: lists of names to scope the catalog queries to,
+    an empty list means no filter
+use_pg_catalog: bool whether to read columns straight from `pg_attribute` and
+    `pg_class` rather than the slower `information_schema` views, note that
+    `information_schema` only lists relations the user has privileges on
+stream: bool whether to stream the catalog and foreign keys through a server
+    side cursor and build entities chunk by chunk instead of loading the
+    catalog into a DataFrame, peak memory is then bounded by `fetch_size`
+fetch_size: int of rows fetched per round trip when streaming
+concurrent: bool whether to extract the catalog and foreign keys of every
+    schema in every database of `databases` in parallel over pooled
+    connections, results are merged in (database, schema) order
+max_workers: int of concurrent queries and pooled connections per database
+connection_factory: optional callable taking a database name and returning
+    a DB-API connection, defaults to `psycopg2.connect` with this source's
+    credentials
+        """
         self.host = host
         self.user = user
         self.pw = pw
@@ -48,6 +85,13 @@ class PostgresSource(BaseSource):
         self.database = database
 
         self._conn = None
+        self._pool = None
+        self.connection_factory = connection_factory
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+        self.stream = stream
+        self.fetch_size = fetch_size
+        self._cursor_ids = itertools.count()
 
         # if not empty, only select from these databases
         self.databases = databases
@@ -65,15 +109,160 @@ class PostgresSource(BaseSource):
             SELECT * FROM information_schema.tables;
         """
         self._tables_df = None
-        #TODO: make this able to be filtered on
+        self.use_pg_catalog = use_pg_catalog
+        # `{filters}` is filled in by `get_columns_query`
+        # `data_type` is spelled the way `format_type` spells it, the
+        # information schema leaves out the precision of numerics and
+        # reports `ARRAY` and `USER-DEFINED` in place of the element types
         self.columns_sql = """
-        SELECT	* FROM
-        information_schema.columns
+        SELECT table_catalog, table_schema, table_name, column_name,
+            ordinal_position,
+            CASE
+                WHEN data_type = 'ARRAY' THEN ltrim(udt_name, '_') || '[]'
+                WHEN data_type = 'USER-DEFINED' THEN udt_name
+                WHEN data_type = 'numeric' AND numeric_precision IS NOT NULL
+                    THEN 'numeric(' || numeric_precision || ',' || coalesce(numeric_scale, 0) || ')'
+                ELSE data_type
+            END AS data_type,
+            is_nullable
+        FROM information_schema.columns
+        WHERE table_schema NOT IN ('information_schema', 'pg_catalog')
+        {filters}
+        """
+        self.pg_columns_sql = """
+        SELECT current_database()                AS table_catalog,
+            n.nspname                            AS table_schema,
+            c.relname                            AS table_name,
+            a.attname                            AS column_name,
+            a.attnum                             AS ordinal_position,
+            format_type(a.atttypid, a.atttypmod) AS data_type,
+            CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE a.attnum > 0
+        AND NOT a.attisdropped
+        AND c.relkind IN ('r', 'v', 'm', 'f', 'p')
+        AND n.nspname NOT IN ('information_schema', 'pg_catalog')
+        AND n.nspname !~ '^pg_toast'
+        {filters}
         """
         self._tables_and_columns_df = None
+        self.row_estimates_sql = """
+        SELECT current_database() AS table_catalog,
+            n.nspname             AS table_schema,
+            c.relname             AS table_name,
+            c.reltuples::bigint   AS row_estimate
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'm', 'f', 'p')
+        AND n.nspname NOT IN ('information_schema', 'pg_catalog')
+        AND n.nspname !~ '^pg_toast'
+        {filters}
+        """
+        self._row_estimates = None
+        # planner statistics of every analyzed column, the array columns are
+        # cast to text so values of any type arrive as strings, a column of
+        # a table with inheritance children keeps the stats over all of them
+        self.stats_sql = """
+        SELECT DISTINCT ON (s.schemaname, s.tablename, s.attname)
+            current_database()               AS table_catalog,
+            s.schemaname                     AS table_schema,
+            s.tablename                      AS table_name,
+            s.attname                        AS column_name,
+            c.reltuples::float8              AS row_estimate,
+            s.null_frac                      AS null_frac,
+            s.n_distinct                     AS n_distinct,
+            s.most_common_vals::text::text[] AS most_common_vals,
+            s.most_common_freqs              AS most_common_freqs,
+            s.histogram_bounds::text::text[] AS histogram_bounds
+        FROM pg_stats s
+        JOIN pg_namespace n ON n.nspname = s.schemaname
+        JOIN pg_class c ON (c.relnamespace = n.oid AND c.relname = s.tablename)
+        WHERE s.schemaname NOT IN ('information_schema', 'pg_catalog')
+        AND c.reltuples >= 0
+        {filters}
+        ORDER BY s.schemaname, s.tablename, s.attname, s.inherited DESC
+        """
+        self._statistics = None
+        self.states_sql = """
+        SELECT current_database() AS table_catalog,
+            n.nspname             AS table_schema,
+            c.relname             AS table_name,
+            c.oid::text || ':' || coalesce(att.signature, '') || ':' || coalesce(con.signature, '') AS state
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN LATERAL (
+            SELECT md5(string_agg(a.attname || ' ' || a.atttypid::text || ' ' || a.atttypmod::text, ',' ORDER BY a.attnum)) AS signature
+            FROM pg_attribute a
+            WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        ) att ON true
+        LEFT JOIN LATERAL (
+            SELECT string_agg(k.oid::text, ',' ORDER BY k.oid) AS signature
+            FROM pg_constraint k
+            WHERE k.conrelid = c.oid AND k.contype IN ('f', 'p', 'u')
+        ) con ON true
+        WHERE c.relkind IN ('r', 'v', 'm', 'f', 'p')
+        AND n.nspname NOT IN ('information_schema', 'pg_catalog')
+        AND n.nspname !~ '^pg_toast'
+        {filters}
+        """
+        # foreign key rows gathered by `extract_catalog`
+        self._fk_rows = None
+        # one row per primary key or unique constraint, columns in key order
+        self.keys_sql = """
+        SELECT current_database()                 AS table_catalog,
+            n.nspname                             AS table_schema,
+            tbl.relname                           AS table_name,
+            c.contype                             AS constraint_type,
+            array_agg(a.attname ORDER BY k.ord)   AS key_columns
+        FROM pg_constraint c
+        JOIN pg_class tbl ON tbl.oid = c.conrelid
+        JOIN pg_namespace n ON n.oid = tbl.relnamespace
+        CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_attribute a ON (a.attrelid = c.conrelid AND a.attnum = k.attnum)
+        WHERE c.contype IN ('p', 'u')
+        {filters}
+        GROUP BY c.oid, c.conname, n.nspname, tbl.relname, c.contype
+        ORDER BY n.nspname, tbl.relname, c.contype, c.conname
+        """
+        self._key_constraints = None
+        self.namespaces_sql = """
+        SELECT nspname FROM pg_namespace
+        WHERE nspname NOT IN ('information_schema', 'pg_catalog')
+        AND nspname !~ '^pg_'
+        ORDER BY nspname
+        """
+        # one row per foreign key, multi-column keys are aggregated in
+        # constraint order, `{filters}` applies to the constraint table
+        self.fks_sql = """
+        SELECT
+            c.conname                                  AS constraint_name,
+            current_database()                         AS constraint_catalog,
+            tn.nspname                                 AS constraint_schema,
+            tbl.relname                                AS constraint_table,
+            array_agg(col.attname ORDER BY k.ord)      AS constraint_columns,
+            rn.nspname                                 AS referenced_schema,
+            referenced_tbl.relname                     AS referenced_table,
+            array_agg(ref_col.attname ORDER BY k.ord)  AS referenced_columns
+        FROM pg_constraint c
+        JOIN pg_class tbl ON tbl.oid = c.conrelid
+        JOIN pg_namespace tn ON tn.oid = tbl.relnamespace
+        JOIN pg_class referenced_tbl ON referenced_tbl.oid = c.confrelid
+        JOIN pg_namespace rn ON rn.oid = referenced_tbl.relnamespace
+        CROSS JOIN LATERAL unnest(c.conkey, c.confkey) WITH ORDINALITY AS k(conkey, confkey, ord)
+        JOIN pg_attribute col ON (col.attrelid = c.conrelid AND col.attnum = k.conkey)
+        JOIN pg_attribute ref_col ON (ref_col.attrelid = c.confrelid AND ref_col.attnum = k.confkey)
+        WHERE c.contype = 'f'
+        {filters}
+        GROUP BY c.oid, c.conname, tn.nspname, tbl.relname, rn.nspname, referenced_tbl.relname
+        ORDER BY tn.nspname, tbl.relname, c.conname
+        """
         
         # store the entities in this list
         self._entities = []
+        # identifier -> entity
+        self._entity_index = {}
 
         self._graph_built = False 
         self.graph = nx.Graph()
@@ -82,18 +271,31 @@ class PostgresSource(BaseSource):
     def __repr__(self):
         return f'<PostgresSource(host={self.host})>'
 
-    def get_connection(self):
-        if self._conn:
-            return self._conn
-        self._conn = psycopg2.connect(
+    def _connect(self, database : str):
+        if self.connection_factory:
+            return self.connection_factory(database)
+        return psycopg2.connect(
                     host=self.host,
                     user=self.user,
                     password=self.pw,
                     port=self.port,
-                    database=self.database
+                    database=database
                     )
+
+    def get_connection(self):
+        if self._conn:
+            return self._conn
+        self._conn = self._connect(self.database)
         return self._conn
 
+    def get_pool(self) -> ConnectionPool:
+        """
+Pool of connections to every database of this source
+        """
+        if not self._pool:
+            self._pool = ConnectionPool(self._connect, maxconn=self.max_workers)
+        return self._pool
+
     def get_databases(self) -> pd.DataFrame:
         con = self.get_connection()
         if not self._dbs_df:
@@ -108,6 +310,137 @@ class PostgresSource(BaseSource):
             self._schemas_df = schemas_df
         return self._schemas_df
 
+    def _scope_filters(self,
+            catalog_expr : str,
+            schema_expr : str,
+            table_expr : str,
+            scope : typing.Optional[dict] = None
+            ) -> typing.Tuple[str, dict]:
+        """
+Compiles the `databases`, `schemas` and `tables` filters into
+parameterized `AND` clauses over the given SQL expressions
+
+scope: optional dict overriding any of the filters, `relations` also
+    scopes to `schema.table` names
+        """
+        scope = scope or {}
+        clauses = []
+        params = {}
+        for name, expr in [
+                ('databases', catalog_expr),
+                ('schemas', schema_expr),
+                ('tables', table_expr),
+                ('relations', f"{schema_expr} || '.' || {table_expr}")]:
+            values = scope.get(name, getattr(self, name, None))
+            if values:
+                clauses.append(f'AND {expr} = ANY(%({name})s)')
+                params[name] = list(values)
+        return '\n        '.join(clauses), params
+
+    def _iter_query(self,
+            sql : str,
+            params : typing.Optional[dict] = None,
+            con = None
+            ) -> typing.Iterator[tuple]:
+        """
+Streams the rows of a query through a server side (named) cursor,
+at most `fetch_size` rows are held client side at a time
+
+Rows are named tuples of the query's columns
+        """
+        con = con or self.get_connection()
+        try:
+            with con.cursor(name=f'entitygraph_{next(self._cursor_ids)}') as cur:
+                cur.itersize = self.fetch_size
+                cur.execute(sql, params or None)
+                row_type = None
+                while True:
+                    rows = cur.fetchmany(self.fetch_size)
+                    if not rows:
+                        break
+                    if row_type is None:
+                        row_type = collections.namedtuple('Row', [d[0] for d in cur.description])
+                    for row in rows:
+                        yield row_type(*row)
+        finally:
+            # named cursors live inside a transaction, don't leave it idle
+            con.rollback()
+
+    def get_columns_query(self, scope : typing.Optional[dict] = None) -> typing.Tuple[str, dict]:
+        """
+The column catalog query scoped to this source's filters and its parameters
+        """
+        if self.use_pg_catalog:
+            filters, params = self._scope_filters('current_database()', 'n.nspname', 'c.relname', scope)
+            return self.pg_columns_sql.format(filters=filters), params
+        filters, params = self._scope_filters('table_catalog', 'table_schema', 'table_name', scope)
+        return self.columns_sql.format(filters=filters), params
+
+    def get_fks_query(self,
+            scope : typing.Optional[dict] = None,
+            touching : typing.Optional[typing.List[str]] = None
+            ) -> typing.Tuple[str, dict]:
+        """
+The foreign key query scoped to this source's filters and its parameters
+
+touching: optional list of `schema.table` names, only foreign keys from or
+    to them are selected
+        """
+        filters, params = self._scope_filters('current_database()', 'tn.nspname', 'tbl.relname', scope)
+        if touching is not None:
+            filters += """
+        AND (tn.nspname || '.' || tbl.relname = ANY(%(touching)s)
+            OR rn.nspname || '.' || referenced_tbl.relname = ANY(%(touching)s))"""
+            params['touching'] = list(touching)
+        return self.fks_sql.format(filters=filters), params
+
+    def _iter_touching_fks(self, entities : typing.List[Entity]) -> typing.Iterator[tuple]:
+        relations = collections.defaultdict(list)
+        for ent in entities:
+            catalog, relation = ent.identifier.split('.', 1)
+            relations[catalog].append(relation)
+        # same database order as a full extraction
+        order = {db: i for i, db in enumerate(list(self.databases) or [self.database])}
+        for database in sorted(relations, key=lambda db: order.get(db, len(order))):
+            sql, params = self.get_fks_query({'databases': []}, touching=relations[database])
+            with self.get_pool().connection(database) as con:
+                yield from list(self._iter_query(sql, params, con=con))
+
+    def _list_schemas(self, database : str) -> list:
+        if self.schemas:
+            return sorted(self.schemas)
+        with self.get_pool().connection(database) as con:
+            return [row.nspname for row in self._iter_query(self.namespaces_sql, con=con)]
+
+    def _extract_schema(self, unit : tuple) -> tuple:
+        """
+Catalog and foreign key rows of one (database, schema)
+        """
+        database, schema = unit
+        # the pooled connection is already scoped to the database
+        scope = {'databases': [], 'schemas': [schema]}
+        with self.get_pool().connection(database) as con:
+            sql, params = self.get_columns_query(scope)
+            columns = list(self._iter_query(sql + 'ORDER BY 1, 2, 3, 5', params, con=con))
+            sql, params = self.get_fks_query(scope)
+            fks = list(self._iter_query(sql, params, con=con))
+        return columns, fks
+
+    def extract_catalog(self):
+        """
+Extracts the catalog and foreign keys of every schema in every database
+of this source concurrently, bounded by `max_workers`, and merges them
+into this source's entities in (database, schema) order
+        """
+        databases = list(self.databases) or [self.database]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            schemas = list(executor.map(self._list_schemas, databases))
+            units = [(db, schema) for db, db_schemas in zip(databases, schemas) for schema in db_schemas]
+            # `map` yields in submission order whatever order the queries finish in
+            results = list(executor.map(self._extract_schema, units))
+        self._add_entities(itertools.chain.from_iterable(columns for columns, _ in results))
+        self._fk_rows = [fk for _, fks in results for fk in fks]
+
     def get_entities(self) -> list:
         """
 List the entities in this source
@@ -115,115 +448,431 @@ Since this is an RDBMS source we know we could have
 multiple databases in this connection, so we'll only
 source the ones in the database provided for now 
         """
+        if len(self._entities):
+            return self._entities
+
+        if self.concurrent:
+            if not len(self._entities):
+                self.extract_catalog()
+            return self._entities
+
+        if self.stream:
+            if not len(self._entities):
+                # rows arrive ordered by table so each entity is built as
+                # soon as its last column streams in, no catalog frame is kept
+                sql, params = self.get_columns_query()
+                self._add_entities(self._iter_query(sql + 'ORDER BY 1, 2, 3, 5', params))
+            return self._entities
+
         con = self.get_connection()
         if not isinstance(self._tables_and_columns_df, pd.DataFrame):
-            tables_and_columns_df = pd.read_sql_query(self.columns_sql, con)
+            sql, params = self.get_columns_query()
+            tables_and_columns_df = pd.read_sql_query(sql, con, params=params or None)
             self._tables_and_columns_df = tables_and_columns_df
 
         if not len(self._entities):
             # postgres specific
-            for ix, row in self._tables_and_columns_df.groupby(
-                    ['table_catalog', 'table_schema', 'table_name']).agg({'column_name':'count'}).reset_index().iterrows():
-                # filter out rows that aren't relevant and belong to `pg_catalog` and `information_schema`
-                if row['table_schema'] in ['information_schema', 'pg_catalog']:
-                    continue
-                these_cols = self._tables_and_columns_df[
-                        (self._tables_and_columns_df['table_catalog']==row['table_catalog'])
-                        &
-                        (self._tables_and_columns_df['table_schema']==row['table_schema'])
-                        &
-                        (self._tables_and_columns_df['table_name']==row['table_name'])
-                        ]
-                identifier = '{0}.{1}.{2}'.format(row['table_catalog'],row['table_schema'],row['table_name'])
-                entity_instance = Entity(
-                        source=self,
-                        identifier=identifier,
-                        columns=list(these_cols.column_name.unique()),
-                        column_type_map={},
-                        column_df=these_cols)
-                if entity_instance not in self._entities:
-                    self._entities.append(entity_instance)
+            # filter out rows that aren't relevant and belong to `pg_catalog` and `information_schema`
+            df = self._tables_and_columns_df
+            df = df[~df['table_schema'].isin(['information_schema', 'pg_catalog'])]
+            keys = ['table_catalog', 'table_schema', 'table_name']
+            order = keys + ['ordinal_position'] if 'ordinal_position' in df.columns else keys
+            df = df.sort_values(order, kind='stable')
+            rows = zip(*(
+                df[c].tolist() if c in df.columns else [None] * len(df)
+                for c in keys + ['column_name', 'ordinal_position', 'data_type', 'is_nullable']))
+            self._add_entities(rows)
 
         return self._entities
 
+    def _build_entities(self, rows : typing.Iterable[tuple]) -> typing.Iterator[Entity]:
+        """
+Builds entities in one grouped pass over catalog rows of
+(catalog, schema, table, column, ordinal, data type, is nullable) ordered
+by table, Postgres types are consolidated onto arrow type names
+        """
+        for key, group in itertools.groupby(rows, key=operator.itemgetter(0, 1, 2)):
+            columns = {}
+            types = {}
+            for row in group:
+                if row[3] in columns:
+                    continue
+                columns[row[3]] = row[6] != 'NO'
+                if row[5]:
+                    types[row[3]] = postgres_arrow_type_name(row[5])
+            yield Entity(
+                    source=self,
+                    identifier='{0}.{1}.{2}'.format(*key),
+                    columns=list(columns),
+                    column_type_map=types,
+                    nullable=columns.values())
+
+    def _add_entities(self, rows : typing.Iterable[tuple]):
+        for entity_instance in self._build_entities(rows):
+            if entity_instance.identifier in self._entity_index:
+                continue
+            self._entity_index[entity_instance.identifier] = entity_instance
+            self._entities.append(entity_instance)
+
+    def set_entities(self, entities : typing.List[Entity]):
+        super().set_entities(entities)
+        self._entity_index = {ent.identifier: ent for ent in self._entities}
+
+    def fingerprint(self) -> str:
+        return '|'.join([
+            type(self).__name__,
+            str(self.host),
+            str(self.port),
+            str(self.database),
+            ','.join(sorted(self.databases)),
+            ','.join(sorted(self.schemas)),
+            ','.join(sorted(self.tables)),
+            str(self.use_pg_catalog)
+            ])
+
+    def get_config(self) -> dict:
+        # the password is never written out, pass `pw` to `from_config`
+        return {
+            'host': self.host,
+            'user': self.user,
+            'port': self.port,
+            'database': self.database,
+            'databases': list(self.databases),
+            'schemas': list(self.schemas),
+            'tables': list(self.tables),
+            'use_pg_catalog': self.use_pg_catalog,
+            'stream': self.stream,
+            'fetch_size': self.fetch_size,
+            'concurrent': self.concurrent,
+            'max_workers': self.max_workers
+        }
+
+    def get_worker_config(self) -> dict:
+        if self.connection_factory:
+            raise Exception('A source with a `connection_factory` cannot be reopened in a worker process')
+        return {**self.get_config(), 'pw': self.pw}
+
+    @classmethod
+    def from_config(cls, config : dict, **kwargs):
+        return super().from_config({'pw': None, **config}, **kwargs)
+
+    def get_entity_states(self) -> dict:
+        """
+Change tokens of every in-scope relation from one catalog query per
+database: its OID, a hash of its live attributes and the OIDs of its
+foreign key, primary key and unique constraints
+        """
+        states = {}
+        for database in list(self.databases) or [self.database]:
+            filters, params = self._scope_filters('current_database()', 'n.nspname', 'c.relname', {'databases': []})
+            with self.get_pool().connection(database) as con:
+                for row in self._iter_query(self.states_sql.format(filters=filters), params, con=con):
+                    states['{0}.{1}.{2}'.format(row.table_catalog, row.table_schema, row.table_name)] = row.state
+        return states
+
+    def load_entities(self, identifiers : typing.List[str]) -> list:
+        """
+Reads the columns of only the given relations, one query per database
+        """
+        relations = collections.defaultdict(list)
+        for identifier in identifiers:
+            catalog, relation = identifier.split('.', 1)
+            relations[catalog].append(relation)
+        entities = []
+        for database, database_relations in relations.items():
+            sql, params = self.get_columns_query({'databases': [], 'relations': database_relations})
+            with self.get_pool().connection(database) as con:
+                entities.extend(self._build_entities(self._iter_query(sql + 'ORDER BY 1, 2, 3, 5', params, con=con)))
+        return entities
+
+    def get_entity(self, identifier : str) -> typing.Optional[Entity]:
+        """
+Gets an entity by its `database.schema.table` identifier
+        """
+        if not self._entities:
+            self.get_entities()
+        return self._entity_index.get(identifier)
+
     def list_entities(self):
         entities = self.get_entities()
         for ix, row in entities.iterrows():
             logging.debug(row)
 
 
-    def get_defined_edges(self) -> list:
+    def get_defined_edges(self, touching : typing.Optional[typing.List[Entity]] = None) -> list:
         """
 Defined edges in RDBMS world are FOREIGN KEYS
-        """
-        q1 = """
-        WITH unnested_confkey AS (
-        SELECT oid, unnest(confkey) as confkey
-            FROM pg_constraint
-        ),
-        unnested_conkey AS (
-            SELECT oid, unnest(conkey) as conkey
-            FROM pg_constraint
-            )
-        select
-        c.conname                   AS constraint_name,
-        c.contype                   AS constraint_type,
-        tbl.relname                 AS constraint_table,
-        col.attname                 AS constraint_column,
-        referenced_tbl.relname      AS referenced_table,
-        referenced_field.attname    AS referenced_column,
-        pg_get_constraintdef(c.oid) AS definition
-        FROM pg_constraint c
-        LEFT JOIN unnested_conkey con ON c.oid = con.oid
-        LEFT JOIN pg_class tbl ON tbl.oid = c.conrelid
-        LEFT JOIN pg_attribute col ON (col.attrelid = tbl.oid AND col.attnum = con.conkey)
-        LEFT JOIN pg_class referenced_tbl ON c.confrelid = referenced_tbl.oid
-        LEFT JOIN unnested_confkey conf ON c.oid = conf.oid
-        LEFT JOIN pg_attribute referenced_field ON (referenced_field.attrelid = c.confrelid AND referenced_field.attnum = conf.confkey)
-        WHERE c.contype = 'f';
+
+Returns a list of (constraint entity, referenced entity, constraint key,
+referenced key) where a key is a column name, or a tuple of column names
+for multi-column constraints
+
+touching: optional list of entities, only foreign keys from or to them
+    are queried
         """
         if not self._entities:
             self.get_entities()
 
-        conn = self.get_connection()
-        fks = pd.read_sql_query(q1, conn)
+        sql, params = self.get_fks_query()
+        if touching is not None:
+            fks = self._iter_touching_fks(touching)
+        elif self._fk_rows is not None:
+            fks = self._fk_rows
+        elif self.stream:
+            fks = self._iter_query(sql, params)
+        else:
+            conn = self.get_connection()
+            fks = pd.read_sql_query(sql, conn, params=params or None).itertuples(index=False)
         edges_to_add = []
-        for ix, row in fks.iterrows():
-            try:
-                constraint_table = row['constraint_table']
-                constraint_column = row['constraint_column']
-                referenced_table = row['referenced_table']
-                referenced_column = row['referenced_column']
-                # get the constraint table and column pertinent entities
-                constraint_entity = list(filter(lambda x:
-                    x.identifier.split('.')[-1] == constraint_table
-                    and 
-                    constraint_column in x.columns,
-                    self._entities))[0]
-                referenced_entity = list(filter(lambda x:
-                    x.identifier.split('.')[-1] == referenced_table,
-                    self._entities))[0]
-
-                edges_to_add.append( (constraint_entity, referenced_entity, constraint_column) )
-            except Exception as e:
+        for row in fks:
+            constraint_entity = self._entity_index.get('{0}.{1}.{2}'.format(
+                row.constraint_catalog, row.constraint_schema, row.constraint_table))
+            referenced_entity = self._entity_index.get('{0}.{1}.{2}'.format(
+                row.constraint_catalog, row.referenced_schema, row.referenced_table))
+            # either side can be out of this source's scope
+            if constraint_entity is None or referenced_entity is None:
                 continue
+            edges_to_add.append((
+                constraint_entity,
+                referenced_entity,
+                self._key(row.constraint_columns),
+                self._key(row.referenced_columns)
+                ))
         return edges_to_add
 
-    
+    @staticmethod
+    def _key(columns : typing.Sequence[str]) -> typing.Union[str, tuple]:
+        return columns[0] if len(columns) == 1 else tuple(columns)
+
+    def get_row_estimates(self) -> dict:
+        """
+Planner row estimates (`pg_class.reltuples`) of every in-scope table,
+keyed by identifier, tables that were never analyzed are left out
+        """
+        if self._row_estimates is None:
+            estimates = {}
+            for database in list(self.databases) or [self.database]:
+                filters, params = self._scope_filters('current_database()', 'n.nspname', 'c.relname', {'databases': []})
+                with self.get_pool().connection(database) as con:
+                    for row in self._iter_query(self.row_estimates_sql.format(filters=filters), params, con=con):
+                        if row.row_estimate >= 0:
+                            estimates['{0}.{1}.{2}'.format(
+                                row.table_catalog, row.table_schema, row.table_name)] = row.row_estimate
+            self._row_estimates = estimates
+        return self._row_estimates
+
+    def get_key_constraints(self) -> dict:
+        """
+Primary keys and unique constraints of every in-scope table from one
+`pg_constraint` query per database, see `BaseSource.get_key_constraints`
+        """
+        if self._key_constraints is None:
+            constraints = collections.defaultdict(list)
+            for database in list(self.databases) or [self.database]:
+                filters, params = self._scope_filters('current_database()', 'n.nspname', 'tbl.relname', {'databases': []})
+                with self.get_pool().connection(database) as con:
+                    for row in self._iter_query(self.keys_sql.format(filters=filters), params, con=con):
+                        constraints['{0}.{1}.{2}'.format(row.table_catalog, row.table_schema, row.table_name)].append(
+                                (row.constraint_type, self._key(row.key_columns)))
+            self._key_constraints = dict(constraints)
+        return self._key_constraints
+
+    def get_statistics(self) -> dict:
+        """
+`pg_stats` and `pg_class.reltuples` of every in-scope table that was
+analyzed, from one query per database, see `BaseSource.get_statistics`
+
+Only the tables the user may read show in `pg_stats`, the rest are left
+out like tables that were never analyzed
+        """
+        if self._statistics is None:
+            statistics = {}
+            for database in list(self.databases) or [self.database]:
+                filters, params = self._scope_filters('current_database()', 's.schemaname', 's.tablename', {'databases': []})
+                with self.get_pool().connection(database) as con:
+                    for row in self._iter_query(self.stats_sql.format(filters=filters), params, con=con):
+                        identifier = '{0}.{1}.{2}'.format(row.table_catalog, row.table_schema, row.table_name)
+                        if identifier not in statistics:
+                            statistics[identifier] = TableStats(row.row_estimate)
+                        statistics[identifier].columns[row.column_name] = ColumnStats(
+                                null_frac=row.null_frac,
+                                n_distinct=row.n_distinct,
+                                most_common_vals=row.most_common_vals,
+                                most_common_freqs=row.most_common_freqs,
+                                histogram_bounds=row.histogram_bounds)
+            self._statistics = statistics
+        return self._statistics
+
+    def get_sample_query(self,
+            entity : Entity,
+            n : int = 100,
+            columns : typing.Optional[typing.List[str]] = None,
+            method : typing.Optional[str] = None,
+            percent : typing.Optional[float] = None,
+            seed : typing.Optional[int] = None
+            ) -> psycopg2.sql.Composed:
+        """
+Builds a quoted, projected sample query for an entity, see `get_sample`
+        """
+        catalog, schema, table = entity.identifier.split('.', 2)
+        projection = psycopg2.sql.SQL(', ').join(map(psycopg2.sql.Identifier, columns)) if columns else psycopg2.sql.SQL('*')
+        tablesample = psycopg2.sql.SQL('')
+        if method:
+            if method.lower() not in ('system', 'bernoulli'):
+                raise Exception(f'Sample method must be one of `system` or `bernoulli`, got {method}')
+            if percent is None:
+                # oversample since SYSTEM picks whole pages and a LIMIT caps the result
+                rows = self.get_row_estimates().get(entity.identifier, 0)
+                percent = min(100.0, 200.0 * n / rows) if rows > 0 else 100.0
+            tablesample = psycopg2.sql.SQL(' TABLESAMPLE {method} ({percent})').format(
+                    method=psycopg2.sql.SQL(method.upper()),
+                    percent=psycopg2.sql.Literal(float(percent)))
+            if seed is not None:
+                tablesample += psycopg2.sql.SQL(' REPEATABLE ({seed})').format(seed=psycopg2.sql.Literal(seed))
+        return psycopg2.sql.SQL('SELECT {projection} FROM {table}{tablesample} LIMIT {n}').format(
+                projection=projection,
+                table=psycopg2.sql.Identifier(schema, table),
+                tablesample=tablesample,
+                n=psycopg2.sql.Literal(int(n)))
+
     def get_sample(self,
             entity : Entity,
-            n : int = 100
-            ) -> pd.DataFrame:
+            n : int = 100,
+            columns : typing.Optional[typing.List[str]] = None,
+            method : typing.Optional[str] = None,
+            percent : typing.Optional[float] = None,
+            seed : typing.Optional[int] = None,
+            as_arrow : bool = False
+            ) -> typing.Union[pd.DataFrame, pyarrow.Table]:
         """
 Get a sample of the parameterized identifier
+
+The sample is pulled in bulk with `COPY ... TO STDOUT` and parsed straight
+into Arrow, on a pooled connection to the entity's database
+
+columns: optional list of columns to project
+method: optional `system` or `bernoulli` to use `TABLESAMPLE` rather than
+    the head of the heap
+percent: float of the table to sample, derived from the row estimate when not given
+seed: optional int so `TABLESAMPLE` is repeatable
+as_arrow: bool whether to return a `pyarrow.Table` instead of a DataFrame
         """
-        con = self.get_connection()
-        identifier = entity.identifier
-        df = pd.read_sql_query(f"""
-            SELECT * FROM {identifier}
-            LIMIT {n}
-        """, con)
-        return df
+        catalog = entity.identifier.split('.', 1)[0]
+        # built before borrowing a connection, the row estimates `TABLESAMPLE`
+        # may need borrow one of the same database's
+        query = self.get_sample_query(entity, n=n, columns=columns, method=method, percent=percent, seed=seed)
+        copy_sql = psycopg2.sql.SQL('COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)').format(query=query)
+        with self.get_pool().connection(catalog) as con:
+            buf = io.BytesIO()
+            with con.cursor() as cur:
+                cur.copy_expert(copy_sql.as_string(con), buf)
+            con.rollback()
+        buf.seek(0)
+        table = self._read_copy_csv(buf, entity, columns)
+        return table if as_arrow else table.to_pandas()
+
+    def _read_copy_csv(self,
+            buf : io.BytesIO,
+            entity : Entity,
+            columns : typing.Optional[typing.List[str]] = None
+            ) -> pyarrow.Table:
+        """
+Parses the `COPY ... csv` output of an entity's sample into Arrow with
+the entity's catalog types, see `_csv_column_types`
+        """
+        column_types = self._csv_column_types(entity, columns)
+        # unquoted empty fields are NULL in COPY csv, quoted ones are empty strings
+        convert = dict(strings_can_be_null=True, quoted_strings_can_be_null=False)
+        try:
+            return pyarrow.csv.read_csv(buf, convert_options=pyarrow.csv.ConvertOptions(
+                    column_types=column_types, true_values=['t'], false_values=['f'], **convert))
+        except pyarrow.ArrowInvalid:
+            # text the csv reader can't parse into its column's type, e.g. a
+            # `time with time zone`, stays a string for that column only
+            buf.seek(0)
+            table = pyarrow.csv.read_csv(buf, convert_options=pyarrow.csv.ConvertOptions(
+                    column_types={c: pyarrow.string() for c in column_types}, **convert))
+            return self._cast_columns(table, column_types)
+
+    @staticmethod
+    def _csv_column_types(entity : Entity, columns : typing.Optional[typing.List[str]] = None) -> dict:
+        """
+Arrow types to parse the `COPY` csv of an entity's columns with, from
+its catalog types rather than guessed from the text, so zero padded text
+keys stay strings and `numeric(p, s)` stays decimal. Types csv can't hold,
+arrays and intervals, are read as strings, untyped columns are guessed
+        """
+        types = entity.column_type_map
+        column_types = {}
+        for column in columns or entity.columns:
+            if column not in types:
+                continue
+            data_type = arrow_type(types[column])
+            if data_type is None or type_family(types[column]) == 'nested' or pyarrow.types.is_interval(data_type):
+                data_type = pyarrow.string()
+            column_types[column] = data_type
+        return column_types
+
+    @staticmethod
+    def _cast_columns(table : pyarrow.Table, column_types : dict) -> pyarrow.Table:
+        for column, data_type in column_types.items():
+            if column not in table.column_names or data_type == pyarrow.string():
+                continue
+            values = table.column(column)
+            try:
+                if pyarrow.types.is_boolean(data_type):
+                    values = pc.equal(values, 't')
+                else:
+                    values = pc.cast(values, data_type)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+                continue
+            table = table.set_column(table.column_names.index(column), column, values)
+        return table
+
+    def get_samples(self,
+            entities : typing.List[Entity],
+            n : int = 100,
+            **kwargs
+            ) -> dict:
+        """
+Samples many entities concurrently, at most `max_workers` queries at a
+time, takes the same keyword arguments as `get_sample`
+
+Returns a dict of entity -> sample
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            samples = executor.map(lambda ent: self.get_sample(ent, n=n, **kwargs), entities)
+            return dict(zip(entities, samples))
+
+    def iter_batches(self,
+            entity : Entity,
+            columns : typing.Optional[typing.List[str]] = None,
+            batch_size : int = 65536
+            ) -> typing.Iterator[pyarrow.RecordBatch]:
+        """
+Streams every row of an entity through a server side cursor on a pooled
+connection, `batch_size` rows at a time
+        """
+        catalog, schema, table = entity.identifier.split('.', 2)
+        projection = psycopg2.sql.SQL(', ').join(map(psycopg2.sql.Identifier, columns)) if columns else psycopg2.sql.SQL('*')
+        query = psycopg2.sql.SQL('SELECT {projection} FROM {table}').format(
+                projection=projection,
+                table=psycopg2.sql.Identifier(schema, table))
+        with self.get_pool().connection(catalog) as con:
+            try:
+                with con.cursor(name=f'entitygraph_{next(self._cursor_ids)}') as cur:
+                    cur.itersize = batch_size
+                    cur.execute(query)
+                    while True:
+                        rows = cur.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        names = [d[0] for d in cur.description]
+                        yield pyarrow.RecordBatch.from_arrays(
+                                [pyarrow.array(values) for values in zip(*rows)],
+                                names=names)
+            finally:
+                con.rollback()
 
     def build_entity_graph(self) -> nx.Graph:
         entities = self.get_entities()
@@ -232,25 +881,12 @@ Get a sample of the parameterized identifier
             for ent in entities:
                 if not self.graph.has_node(ent):
                     self.graph.add_node(ent)
-            for node in self.graph.nodes():
-                db, schema, table = node.identifier.split('.')
-                if table.endswith('s'):
-                    # strip the s at the end of the table name (e.g. customers_id becomes customer_id)
-                    fkname1 = '{0}_id'.format(table[:-1])
-                else:
-                    fkname1 = f'{table}_id'
-                fkname2 = None
-                fkname2 = '_'.join(f'{table}_id'.split('_')[1:]) if len(f'{table}_id'.split('_'))>2 else None
-                for node2 in self.graph.nodes():
-                    if node != node2:
-                        db2, schema2, table2 = node2.identifier.split('.')
-                        for column in node2.columns:
-                            if column == fkname1:
-                                if not self.graph.has_edge(node, node2):
-                                    self.graph.add_edge(node, node2, attr={
-                                        f'{node.identifier}_key' : 'id',
-                                        f'{node2.identifier}_key' : column
-                                    })
+            for node, node2, column in FKNameIndex(self.graph.nodes()).edges():
+                if not self.graph.has_edge(node, node2):
+                    self.graph.add_edge(node, node2, attr={
+                        f'{node.identifier}_key' : node.pk if isinstance(node.pk, str) else 'id',
+                        f'{node2.identifier}_key' : column
+                    })
             self._graph_built = True
         return self.graph 
 
@@ -263,11 +899,16 @@ class FileSource(BaseSource):
             storage_format: StorageFormat = StorageFormat.parquet,
             prefix : typing.Optional[str] = None,
             regex_filter : typing.Optional[str] = None,
-            entities_are_partitioned : bool = False
+            entities_are_partitioned : bool = False,
+            max_workers : int = 16,
+            header_block_size : int = 1 << 16
         ):
         """
 We are using the pyarrow.fs.FileSystem so for more information
 please refer to the pyarrow docs: https://arrow.apache.org/docs/python/generated/pyarrow.fs.FileSystem.html
+
+max_workers: int of threads used to read file schemas concurrently
+header_block_size: int of bytes read from delimited files to infer their schema
         """
         self.provider = provider
         # in the case of an object store this would be a bucket
@@ -292,7 +933,11 @@ please refer to the pyarrow docs: https://arrow.apache.org/docs/python/generated
         # pyarrow's relative path from a call to `pyarrow.fs.FileSystem.from_uri`
         self._relpath = None
 
+        self.max_workers = max_workers
+        self.header_block_size = header_block_size
+
         self._entities = []
+        self._row_estimates = None
 
 
     def get_source_path(self) -> str:
@@ -319,58 +964,222 @@ the FileSystem where the data files exist
         return
 
 
+    def get_filesystem(self) -> typing.Tuple[fs.FileSystem, str]:
+        """
+The `pyarrow.fs.FileSystem` of this source and the path of its root within it
+        """
+        if not self._fs or not self._relpath:
+            this_fs, path = fs.FileSystem.from_uri(self.get_source_path())
+            self._fs = this_fs
+            self._relpath = path
+        return self._fs, self._relpath
+
+
+    def _list_all(self) -> list:
+        """
+Lists the `pyarrow.fs.FileInfo` of everything within this source
+        """
+        self.get_filesystem()
+        return self._fs.get_file_info(fs.FileSelector(self._relpath, recursive=True))
+
+
+    def _list_files(self, raw_entities : typing.Optional[list] = None) -> list:
+        """
+Lists the `pyarrow.fs.FileInfo` of every entity within this source, from
+the listing of `_list_all` when given
+        """
+        if raw_entities is None:
+            raw_entities = self._list_all()
+        # filter if we have a regex pattern
+        if self.regex_filter and isinstance(self.regex_filter, re.Pattern):
+            raw_entities = [
+                e for e in raw_entities
+                if not len(re.findall(self.regex_filter, e.path))
+            ]
+        # filter entities of the pertinent storage format
+        filtered_entities = [
+            e for e in raw_entities
+            if e.path.endswith(self.storage_format.value)
+        ]
+
+        # check if the entities are stored in directories
+        # an example of this is how Spark and Dask partition
+        # files:
+        # table entity_a would be stored as:
+        # entity_a/part1.parquet, entity_a/part2.parquet, etc.
+        if self.entities_are_partitioned:
+            filtered_entities = [
+                e for e in filtered_entities
+                if not e.is_file
+            ]
+        return filtered_entities
+
+
+    def _identifier(self, info : fs.FileInfo) -> str:
+        # local paths are already absolute for `self._fs`
+        if self.provider != FileProvider.local and info.path.startswith(self.provider.value):
+            return info.path.split(self.provider.value)[1]
+        return info.path
+
+
+    def _read_schemas(self, entities : typing.List[Entity]):
+        """
+Fills the columns and types of entities from file metadata only, concurrently
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            schemas = executor.map(self.get_schema, entities)
+            for ent, schema in zip(entities, schemas):
+                ent.columns = list(schema.names)
+                ent.column_type_map = {field.name: str(field.type) for field in schema}
+                ent.nullable = tuple(field.nullable for field in schema)
+
+
     def get_entities(self):
         """
 List entities within this source
         """
         if not self._entities:
-            if not self._fs or not self._relpath:
-                this_fs, path = fs.FileSystem.from_uri(self.get_source_path())
-                self._fs = this_fs
-                self._relpath = path
-            raw_entities = self._fs.get_file_info(fs.FileSelector(self._relpath, recursive=True))
-            # filter if we have a regex pattern
-            if self.regex_filter and isinstance(self.regex_filter, re.Pattern):
-                raw_entities = [
-                    e for e in raw_entities
-                    if not len(re.findall(self.regex_filter, e.path))
-                ]
-            # filter entities of the pertinent storage format
-            filtered_entities = [
-                e for e in raw_entities
-                if e.path.endswith(self.storage_format.value)
+            entity_objects = [
+                Entity(
+                    source=self,
+                    identifier=self._identifier(obj)
+                    )
+                for obj in self._list_files()
             ]
-
-            # check if the entities are stored in directories
-            # an example of this is how Spark and Dask partition
-            # files:
-            # table entity_a would be stored as:
-            # entity_a/part1.parquet, entity_a/part2.parquet, etc.
-            if self.entities_are_partitioned:
-                filtered_entities = [
-                    e for e in filtered_entities
-                    if not e.is_file
-                ]
-
-            entity_objects = []
-            for obj in filtered_entities:
-                if obj.path.startswith(self.provider.value):
-                    identifier = obj.path.split(self.provider.value)[1]
-                else:
-                    identifier = obj.path
-                ent = Entity(
-                        source=self,
-                        identifier=identifier
-                        )
-                # in order to get columns
-                # we need a sample of data
-                ent_samp = self.get_sample(ent, n=100)
-                ent.columns = ent_samp.columns
-                entity_objects.append(ent)
+            self._read_schemas(entity_objects)
             self._entities = entity_objects
         return self._entities
 
 
+    def fingerprint(self) -> str:
+        return '|'.join([
+            type(self).__name__,
+            self.get_source_path(),
+            self.storage_format.value,
+            self.regex_filter.pattern if self.regex_filter else '',
+            str(self.entities_are_partitioned)
+            ])
+
+
+    def get_config(self) -> dict:
+        return {
+            'path_root': self.path_root,
+            'provider': self.provider,
+            'storage_format': self.storage_format,
+            'prefix': self.prefix,
+            'regex_filter': self.regex_filter.pattern if self.regex_filter else None,
+            'entities_are_partitioned': self.entities_are_partitioned,
+            'max_workers': self.max_workers,
+            'header_block_size': self.header_block_size
+        }
+
+
+    @classmethod
+    def from_config(cls, config : dict, **kwargs):
+        config = {**config, **kwargs}
+        # enums are serialized by value
+        config['provider'] = FileProvider(getattr(config['provider'], 'value', config['provider']))
+        config['storage_format'] = StorageFormat(getattr(config['storage_format'], 'value', config['storage_format']))
+        return cls(**config)
+
+
+    def get_entity_states(self) -> dict:
+        """
+Modification time and size of every entity from a single listing,
+object stores don't expose ETags through `pyarrow.fs`
+
+A partitioned entity's state is the latest modification time, total size
+and number of its files, rewriting a part file doesn't touch the mtime
+of the directory
+        """
+        infos = self._list_all()
+        entities = self._list_files(infos)
+        if not self.entities_are_partitioned:
+            return {self._identifier(info) : f'{info.mtime_ns}:{info.size}' for info in entities}
+        # directory path -> [latest mtime, total size, files]
+        totals = {info.path: [0, 0, 0] for info in entities}
+        for info in infos:
+            if not info.is_file:
+                continue
+            parent = info.path
+            while '/' in parent:
+                parent = parent.rsplit('/', 1)[0]
+                if parent in totals:
+                    total = totals[parent]
+                    total[0] = max(total[0], info.mtime_ns or 0)
+                    total[1] += info.size or 0
+                    total[2] += 1
+                    break
+        return {
+            self._identifier(info) : '{0}:{1}:{2}'.format(*totals[info.path])
+            for info in entities
+        }
+
+
+    def load_entities(self, identifiers : typing.List[str]) -> list:
+        entity_objects = [Entity(source=self, identifier=identifier) for identifier in identifiers]
+        self._read_schemas(entity_objects)
+        return entity_objects
+
+
+    def get_schema(self, entity : Entity) -> pyarrow.Schema:
+        """
+Reads the schema of an entity without decoding any data pages: the footer
+of a parquet file or the header block of a delimited file
+        """
+        delimiters = {
+            StorageFormat.csv: ',',
+            StorageFormat.tsv: '\t',
+            StorageFormat.txt: ','
+        }
+        if self.storage_format == StorageFormat.parquet and not self.entities_are_partitioned:
+            with self._fs.open_input_file(entity.identifier) as f:
+                return pq.ParquetFile(f).schema_arrow
+        if self.storage_format in delimiters:
+            with self._fs.open_input_stream(entity.identifier) as f:
+                reader = pyarrow.csv.open_csv(
+                        f,
+                        read_options=pyarrow.csv.ReadOptions(block_size=self.header_block_size),
+                        parse_options=pyarrow.csv.ParseOptions(delimiter=delimiters[self.storage_format]))
+                return reader.schema
+        if self.storage_format == StorageFormat.parquet:
+            # partitioned entities, only the first fragment's footer is inspected
+            return ds.dataset(source=entity.identifier, filesystem=self._fs, format='parquet').schema
+        # no metadata to read, e.g. pickles
+        return pyarrow.Schema.from_pandas(self.get_sample(entity, n=100))
+
+
+    def get_row_count(self, entity : Entity) -> typing.Optional[int]:
+        """
+Row count of an entity from parquet footers, None for formats without
+row count metadata
+        """
+        if self.storage_format != StorageFormat.parquet:
+            return None
+        if not self.entities_are_partitioned:
+            with self._fs.open_input_file(entity.identifier) as f:
+                return pq.ParquetFile(f).metadata.num_rows
+        # every fragment's footer, no data pages are read
+        return ds.dataset(source=entity.identifier, filesystem=self._fs, format='parquet').count_rows()
+
+
+    def get_row_estimates(self) -> dict:
+        """
+Row counts of every entity from file metadata only, concurrently, keyed
+by identifier, entities without row count metadata are left out
+        """
+        if self._row_estimates is None:
+            self.get_filesystem()
+            entities = self.get_entities()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                counts = executor.map(self.get_row_count, entities)
+                self._row_estimates = {
+                    ent.identifier: count for ent, count in zip(entities, counts)
+                    if count is not None
+                }
+        return self._row_estimates
+
+
     def build_entity_graph(self):
         """
 Interface for building the entity graph for this source
@@ -386,18 +1195,106 @@ or encoded from user input
         pass
 
 
+    def _dataset_format(self) -> typing.Union[str, ds.FileFormat]:
+        if self.storage_format == StorageFormat.tsv:
+            return ds.CsvFileFormat(parse_options=pyarrow.csv.ParseOptions(delimiter='\t'))
+        if self.storage_format in (StorageFormat.csv, StorageFormat.txt):
+            return 'csv'
+        return self.storage_format.value
+
+
+    def iter_batches(self,
+            entity : Entity,
+            columns : typing.Optional[typing.List[str]] = None,
+            batch_size : int = 65536
+            ) -> typing.Iterator[pyarrow.RecordBatch]:
+        """
+Streams every row of an entity as record batches of at most `batch_size`
+rows, reading only the projected columns
+        """
+        this_fs, _ = self.get_filesystem()
+        entity_dataset = ds.dataset(source=entity.identifier, filesystem=this_fs, format=self._dataset_format())
+        yield from entity_dataset.to_batches(columns=columns, batch_size=batch_size)
+
     def get_sample(self,
             entity : Entity,
-            n : int = 100
-            ) -> pd.DataFrame:
+            n : int = 100,
+            columns : typing.Optional[typing.List[str]] = None,
+            filter : typing.Optional[ds.Expression] = None,
+            stratified : bool = False,
+            as_arrow : bool = False
+            ) -> typing.Union[pd.DataFrame, pyarrow.Table]:
         """
 Get a sample of parameterized identifier's data
+
+Reading stops as soon as `n` rows are available and batches are sized to
+`n`, so the cost scales with the sample rather than the row group size
+
+columns: optional list of columns to project
+filter: optional `pyarrow.dataset.Expression` rows must satisfy
+stratified: bool whether to spread the sample over the entity's fragments
+    (files, or row groups of a single parquet file) instead of the head
+as_arrow: bool whether to return a `pyarrow.Table` instead of a DataFrame
         """
-        entity_dataset = ds.dataset(source=entity.identifier, filesystem=self._fs)
-        # grab the first batch of data for the sample
-        databatch = None
-        for batch in entity_dataset.to_batches():
-            databatch = batch
-            break
-        samp = databatch.slice(offset=0, length=n).to_pandas()
-        return samp
+        this_fs, _ = self.get_filesystem()
+        if (not stratified and filter is None
+                and self.storage_format == StorageFormat.parquet and not self.entities_are_partitioned):
+            # a single parquet file needs no dataset discovery
+            with this_fs.open_input_file(entity.identifier) as f:
+                parquet_file = pq.ParquetFile(f)
+                batches = []
+                remaining = n
+                if remaining > 0:
+                    for batch in parquet_file.iter_batches(batch_size=n, columns=columns):
+                        batches.append(batch.slice(0, remaining))
+                        remaining -= batch.num_rows
+                        # no batch past the sample is decoded
+                        if remaining <= 0:
+                            break
+                schema = parquet_file.schema_arrow
+            table = pyarrow.Table.from_batches(batches) if batches else schema.empty_table()
+            table = table.select(columns or schema.names)
+            return table if as_arrow else table.to_pandas()
+
+        entity_dataset = ds.dataset(source=entity.identifier, filesystem=this_fs, format=self._dataset_format())
+        if not stratified:
+            table = entity_dataset.head(n, columns=columns, filter=filter, batch_size=max(n, 1))
+            return table if as_arrow else table.to_pandas()
+
+        fragments = list(entity_dataset.get_fragments(filter=filter))
+        if len(fragments) == 1 and isinstance(fragments[0], ds.ParquetFileFragment):
+            fragments = fragments[0].split_by_row_group(filter=filter)
+        empty = entity_dataset.schema.empty_table().select(columns or entity_dataset.schema.names)
+        if not fragments or n <= 0:
+            return empty if as_arrow else empty.to_pandas()
+        # evenly spaced fragments, each contributing an equal share of rows
+        k = min(len(fragments), n)
+        picked = [i * len(fragments) // k for i in range(k)]
+        per_fragment = -(-n // k)
+        tables = []
+        taken = {}
+        remaining = n
+
+        def take(i, rows, skip=0):
+            table = fragments[i].head(
+                    skip + rows,
+                    columns=columns,
+                    filter=filter,
+                    batch_size=max(skip + rows, 1)).slice(skip)
+            taken[i] = taken.get(i, 0) + table.num_rows
+            tables.append(table)
+            return table.num_rows
+
+        for i in picked:
+            if remaining <= 0:
+                break
+            remaining -= take(i, min(per_fragment, remaining))
+        # fragments that came up short are topped up from the others, the
+        # ones not picked first, then the rest of the picked ones
+        unpicked = [i for i in range(len(fragments)) if i not in taken]
+        for i in unpicked + [i for i in picked if i in taken and taken[i] >= per_fragment]:
+            if remaining <= 0:
+                break
+            remaining -= take(i, remaining, skip=taken.get(i, 0))
+        table = pyarrow.concat_tables(tables) if tables else empty
+        return table if as_arrow else table.to_pandas()
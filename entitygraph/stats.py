@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+"""
+Column statistics a database already keeps, e.g. Postgres' `pg_stats`, so
+key uniqueness, null rates and value ranges are known without reading a
+single row of data
+"""
+
+# python standard libraries
+import math
+import typing
+
+# third party libraries
+import numpy as np
+
+# internal libs
+from entitygraph.names import reference_stem
+
+
+class ColumnStats:
+    __slots__ = ('null_frac', 'n_distinct', 'most_common_vals', 'most_common_freqs', 'histogram_bounds')
+
+    def __init__(self,
+            null_frac : float = 0.0,
+            n_distinct : float = 0.0,
+            most_common_vals : typing.Optional[typing.Sequence] = None,
+            most_common_freqs : typing.Optional[typing.Sequence[float]] = None,
+            histogram_bounds : typing.Optional[typing.Sequence] = None
+            ):
+        """
+Planner statistics of one column, as in `pg_stats`
+
+null_frac: float of the rows that are null
+n_distinct: float of distinct values, when negative the distinct values
+    per row, -1 for a column without repeats
+most_common_vals: optional sequence of the most common values
+most_common_freqs: optional sequence of the share of rows of each
+histogram_bounds: optional sequence of values splitting the remaining
+    values into equally populated buckets
+        """
+        self.null_frac = float(null_frac or 0.0)
+        self.n_distinct = float(n_distinct or 0.0)
+        self.most_common_vals = tuple(most_common_vals or ())
+        self.most_common_freqs = tuple(most_common_freqs or ())
+        self.histogram_bounds = tuple(histogram_bounds or ())
+
+    def __repr__(self):
+        return f'<ColumnStats (null_frac={self.null_frac}, n_distinct={self.n_distinct})>'
+
+    def distinct(self, rows : float) -> float:
+        """
+Estimated distinct values of the column in a table of `rows` rows
+        """
+        return self.n_distinct if self.n_distinct >= 0 else -self.n_distinct * rows
+
+    def uniqueness(self, rows : float) -> float:
+        """
+Distinct values per non null value, 1.0 for a column without repeats
+        """
+        present = 1.0 - self.null_frac
+        if present <= 0:
+            return 0.0
+        if self.n_distinct < 0:
+            # postgres stores -(1 - null_frac) for a column without repeats
+            return min(1.0, round(-self.n_distinct / present, 6))
+        if rows <= 0:
+            return 0.0
+        return min(1.0, self.n_distinct / (rows * present))
+
+    def numeric_values(self) -> np.ndarray:
+        """
+The sorted most common values and histogram bounds that are numbers,
+the values the statistics show of the column
+        """
+        return _numbers(self.most_common_vals + self.histogram_bounds)
+
+    def common_values(self) -> np.ndarray:
+        """
+The sorted most common values that are numbers
+        """
+        return _numbers(self.most_common_vals)
+
+
+def _numbers(values : typing.Iterable) -> np.ndarray:
+    found = []
+    for value in values:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(value):
+            found.append(value)
+    return np.unique(np.asarray(found, dtype=float))
+
+
+class TableStats:
+    __slots__ = ('rows', 'columns')
+
+    def __init__(self, rows : float, columns : typing.Optional[dict] = None):
+        """
+Statistics of one table: its estimated `rows` and a dict of column name ->
+`ColumnStats` for the columns that were analyzed
+        """
+        self.rows = float(rows)
+        self.columns = dict(columns or {})
+
+    def __repr__(self):
+        return f'<TableStats (rows={self.rows}, columns={len(self.columns)})>'
+
+    def __contains__(self, key) -> bool:
+        if isinstance(key, str):
+            return key in self.columns
+        return all(column in self.columns for column in key)
+
+    def key_uniqueness(self, key : typing.Union[str, tuple]) -> typing.Optional[float]:
+        """
+Uniqueness of a join key, see `ColumnStats.uniqueness`, None when it
+isn't known: the key has a column without statistics, or several columns
+whose combined distinct values the statistics don't hold. A multi column
+key with one unique column is unique
+        """
+        if key not in self:
+            return None
+        if isinstance(key, str):
+            return self.columns[key].uniqueness(self.rows)
+        uniqueness = max(self.columns[column].uniqueness(self.rows) for column in key)
+        return uniqueness if uniqueness >= 1.0 else None
+
+    def scores(self, columns : typing.Sequence[str]) -> tuple:
+        """
+`keys.column_scores` of the given columns from statistics, columns
+without statistics are left out
+
+Returns a (column names, uniqueness, null rate) tuple, uniqueness is NaN
+for columns with nulls
+        """
+        names = [c for c in columns if c in self.columns]
+        null_rate = np.array([self.columns[c].null_frac for c in names], dtype=float)
+        uniqueness = np.array([self.columns[c].uniqueness(self.rows) for c in names], dtype=float)
+        uniqueness[null_rate > 0] = np.nan
+        return names, uniqueness, null_rate
+
+
+def inclusion_dependencies(
+        columns : typing.List[tuple],
+        min_containment : float = 0.8,
+        min_uniqueness : float = 0.9,
+        min_common : float = 0.5
+        ) -> typing.List[tuple]:
+    """
+Integer column pairs whose values are estimated to be contained in the
+other's from statistics alone, a foreign key in a (nearly) unique key
+
+The values a column's statistics show, its most common values and
+histogram bounds, are contained in a key by the share of them inside the
+key's range, scaled by the key's density, its distinct values over the
+width of its range, so a sparse key only contains what it covers. Each
+contained column gets its best key, the tightest one covering its range
+when several contain it as well. (Nearly) unique columns are keys
+themselves and never taken as contained. Small integers such as a
+`quantity` fall in the range of any `id`, so a contained column also needs
+a reference name, see `names.reference_stem`, or most common values that
+are the key's. This is coarser than sketching values, see
+`sketches.SketchIndex`, and only meant to spare table scans
+
+columns: list of (key, `ColumnStats`, rows) of integer columns, a key
+    being (entity, column)
+min_common: float of the most common values of a contained column without
+    a reference name that must be most common values of the key
+
+Returns a list of (contained index, containing index, containment)
+    """
+    values = [stats.numeric_values() for _, stats, _ in columns]
+    distinct = np.array([stats.distinct(rows) for _, stats, rows in columns], dtype=float)
+    uniqueness = np.array([stats.uniqueness(rows) for _, stats, rows in columns], dtype=float)
+    has_range = np.array([len(v) >= 2 for v in values])
+    low = np.array([v[0] if len(v) else np.nan for v in values])
+    high = np.array([v[-1] if len(v) else np.nan for v in values])
+
+    keys = np.flatnonzero(has_range & (uniqueness >= min_uniqueness) & (distinct >= 2))
+    if not len(keys):
+        return []
+    key_low, key_high = low[keys], high[keys]
+    width = key_high - key_low + 1
+    density = np.minimum(1.0, distinct[keys] / width)
+    owners = {}
+    owner = np.array([owners.setdefault(key[0], len(owners)) for key, _, _ in columns])
+
+    found = []
+    # keys aren't contained in other keys, like two `id` sequences
+    for i in np.flatnonzero(has_range & (uniqueness < min_uniqueness)).tolist():
+        named = reference_stem(columns[i][0][1]) is not None
+        common = columns[i][1].common_values()
+        if not named and not len(common):
+            continue
+        v = values[i]
+        inside = np.searchsorted(v, key_high, side='right') - np.searchsorted(v, key_low, side='left')
+        containment = inside / len(v) * density
+        candidates = np.flatnonzero(
+            (containment >= min_containment)
+            # a key holds at least about as many values as what it contains
+            & (distinct[i] <= distinct[keys] * 1.05)
+            & (owner[keys] != owner[i])
+        )
+        if not named:
+            candidates = np.array([
+                c for c in candidates.tolist()
+                if np.isin(common, columns[keys[c]][1].common_values()).mean() >= min_common
+            ], dtype=int)
+        if not len(candidates):
+            continue
+        # the highest containment, then the key whose range the contained
+        # column spans the most of
+        best = candidates[containment[candidates] == containment[candidates].max()]
+        best = best[np.argmax((high[i] - low[i] + 1) / width[best])]
+        found.append((i, int(keys[best]), float(containment[best])))
+    return found
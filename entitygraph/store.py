@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+"""
+Binary snapshots of an `EntityGraph` as memory mapped Arrow IPC tables, so
+a process can open a built graph without touching its source
+"""
+
+# python standard libraries
+import json
+import os
+import typing
+
+# third party libraries
+import pyarrow
+import pyarrow.compute as pc
+import pyarrow.ipc
+
+# internal libs
+from entitygraph.catalog import _encode
+from entitygraph.entity import Entity
+
+
+FORMAT_VERSION = 1
+
+NODE_SCHEMA = pyarrow.schema([
+    ('identifier', pyarrow.string()),
+    ('columns', pyarrow.list_(pyarrow.string())),
+    ('types', pyarrow.list_(pyarrow.string())),
+    ('nullable', pyarrow.list_(pyarrow.bool_())),
+    ('pk', pyarrow.list_(pyarrow.string())),
+    ('dks', pyarrow.list_(pyarrow.string())),
+])
+
+# `n1` and `n2` are row numbers of the node table, the keys of an edge are
+# stored as lists and any other edge attribute as json, attributes an edge
+# doesn't have are null so they aren't added back on load
+EDGE_SCHEMA = pyarrow.schema([
+    ('n1', pyarrow.int32()),
+    ('n2', pyarrow.int32()),
+    ('n1_key', pyarrow.list_(pyarrow.string())),
+    ('n2_key', pyarrow.list_(pyarrow.string())),
+    ('from_schema', pyarrow.bool_()),
+    ('attr', pyarrow.string()),
+])
+
+
+def _as_list(key) -> typing.Optional[list]:
+    if key is None:
+        return None
+    if isinstance(key, str):
+        return [key]
+    return [str(k) for k in key]
+
+
+def _as_key(values : typing.Optional[list]):
+    # single column keys are plain strings, composite keys tuples
+    if values is None:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return tuple(values)
+
+
+def _aligned_types(ent : Entity) -> typing.Optional[list]:
+    types = ent.column_type_map
+    if not types:
+        return None
+    return [types.get(c) for c in ent.columns]
+
+
+def _write_table(path : str, table : pyarrow.Table):
+    # written next to the target and renamed so readers never see half a file
+    tmp = path + '.tmp'
+    with pyarrow.OSFile(tmp, 'wb') as sink:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path : str) -> pyarrow.Table:
+    # zero copy, the pages are read in lazily by the OS
+    with pyarrow.memory_map(path) as source:
+        return pyarrow.ipc.open_file(source).read_all()
+
+
+def write_snapshot(
+        path : str,
+        entities : typing.List[Entity],
+        edges : typing.Iterable[tuple],
+        source : typing.Optional[dict] = None
+        ):
+    """
+Writes a graph snapshot directory of `nodes.arrow`, `edges.arrow` and
+`graph.json`
+
+path: str of the snapshot directory, created if missing
+entities: list of `Entity` nodes
+edges: iterable of (n1 row, n2 row, attr) with rows indexing `entities`
+source: optional dict of the source type and config to reconnect with
+    """
+    os.makedirs(path, exist_ok=True)
+    nodes = pyarrow.table([
+        pyarrow.array([ent.identifier for ent in entities], pyarrow.string()),
+        pyarrow.array([list(ent.columns) for ent in entities], NODE_SCHEMA.field('columns').type),
+        pyarrow.array([_aligned_types(ent) for ent in entities], NODE_SCHEMA.field('types').type),
+        pyarrow.array([
+            list(ent.nullable) if ent.nullable is not None else None
+            for ent in entities], NODE_SCHEMA.field('nullable').type),
+        pyarrow.array([_as_list(ent.pk) for ent in entities], NODE_SCHEMA.field('pk').type),
+        pyarrow.array([list(ent.dks) for ent in entities], NODE_SCHEMA.field('dks').type),
+    ], schema=NODE_SCHEMA)
+
+    n1s, n2s, n1_keys, n2_keys, from_schema, attrs = [], [], [], [], [], []
+    for n1, n2, attr in edges:
+        attr = dict(attr)
+        n1s.append(n1)
+        n2s.append(n2)
+        n1_keys.append(_as_list(attr.pop(f'{entities[n1].identifier}_key', None)))
+        n2_keys.append(_as_list(attr.pop(f'{entities[n2].identifier}_key', None)))
+        from_schema.append(bool(attr.pop('from_schema')) if 'from_schema' in attr else None)
+        attrs.append(json.dumps(attr, default=_encode) if attr else None)
+    edge_table = pyarrow.table([
+        pyarrow.array(n1s, pyarrow.int32()),
+        pyarrow.array(n2s, pyarrow.int32()),
+        pyarrow.array(n1_keys, EDGE_SCHEMA.field('n1_key').type),
+        pyarrow.array(n2_keys, EDGE_SCHEMA.field('n2_key').type),
+        pyarrow.array(from_schema, pyarrow.bool_()),
+        pyarrow.array(attrs, pyarrow.string()),
+    ], schema=EDGE_SCHEMA)
+
+    _write_table(os.path.join(path, 'nodes.arrow'), nodes)
+    _write_table(os.path.join(path, 'edges.arrow'), edge_table)
+    with open(os.path.join(path, 'graph.json'), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'source': source}, f, default=_encode)
+
+
+class GraphSnapshot:
+    def __init__(self, path : str):
+        """
+A graph snapshot written by `write_snapshot`, its tables are memory
+mapped and entity columns are only decoded when first accessed
+
+path: str of the snapshot directory
+        """
+        self.path = path
+        with open(os.path.join(path, 'graph.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise Exception(f'Unsupported graph snapshot version {meta.get("version")} in {path}')
+        self.source = meta.get('source')
+        self.nodes = _read_table(os.path.join(path, 'nodes.arrow'))
+        self.edge_table = _read_table(os.path.join(path, 'edges.arrow'))
+        self._columns = self.nodes.column('columns').combine_chunks()
+        self._types = self.nodes.column('types').combine_chunks()
+        self._nullable = self.nodes.column('nullable').combine_chunks()
+
+    def row(self, i : int) -> tuple:
+        """
+The (columns, types, nullable) of node row `i`
+        """
+        return self._columns[i].as_py(), self._types[i].as_py(), self._nullable[i].as_py()
+
+    def entities(self, source) -> typing.List[Entity]:
+        """
+Deferred `Entity` objects of every node, in node table order
+        """
+        entities = Entity.deferred(source, self.nodes.column('identifier').to_pylist(), self)
+        # only the few entities with a primary or date keys are touched
+        for i, pk in _sparse(_keys(self.nodes.column('pk'))):
+            entities[i].pk = pk
+        dks = self.nodes.column('dks').combine_chunks()
+        for i in pc.indices_nonzero(pc.fill_null(pc.greater(pc.list_value_length(dks), 0), False)).to_pylist():
+            entities[i].dks = dks[i].as_py()
+        return entities
+
+    def edges(self, entities : typing.List[Entity]) -> typing.Iterator[tuple]:
+        """
+Edges as (`Entity`, `Entity`, attr) tuples
+        """
+        key_names = [f'{ent.identifier}_key' for ent in entities]
+        table = self.edge_table
+        for n1, n2, n1_key, n2_key, from_schema, attr in zip(
+                table.column('n1').to_pylist(),
+                table.column('n2').to_pylist(),
+                _keys(table.column('n1_key')),
+                _keys(table.column('n2_key')),
+                table.column('from_schema').to_pylist(),
+                table.column('attr').to_pylist()):
+            attr = json.loads(attr) if attr is not None else {}
+            if n1_key is not None:
+                attr[key_names[n1]] = n1_key
+            # a self referencing edge has a single key
+            if n2 != n1 and n2_key is not None:
+                attr[key_names[n2]] = n2_key
+            if from_schema is not None:
+                attr['from_schema'] = from_schema
+            yield entities[n1], entities[n2], attr
+
+
+def _keys(column : pyarrow.ChunkedArray) -> list:
+    """
+A list of string columns decoded as keys with `_as_key`, vectorized for the
+common single column keys
+    """
+    lists = column.combine_chunks()
+    keys = pc.list_element(lists, 0).to_pylist() if len(lists) else []
+    composite = pc.fill_null(pc.greater(pc.list_value_length(lists), 1), False)
+    for i in pc.indices_nonzero(composite).to_pylist():
+        keys[i] = tuple(lists[i].as_py())
+    return keys
+
+
+def _sparse(values : list) -> typing.Iterator[tuple]:
+    return ((i, v) for i, v in enumerate(values) if v is not None)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+Consolidates source data types onto `pyarrow` data types
+https://arrow.apache.org/docs/python/api/datatypes.html
+"""
+
+# python standard libraries
+import functools
+import re
+import typing
+
+# third party libraries
+import pyarrow
+
+
+POSTGRES_TYPES = {
+    'smallint': pyarrow.int16(),
+    'int2': pyarrow.int16(),
+    'integer': pyarrow.int32(),
+    'int': pyarrow.int32(),
+    'int4': pyarrow.int32(),
+    'bigint': pyarrow.int64(),
+    'int8': pyarrow.int64(),
+    'oid': pyarrow.uint32(),
+    'real': pyarrow.float32(),
+    'float4': pyarrow.float32(),
+    'double precision': pyarrow.float64(),
+    'float8': pyarrow.float64(),
+    'money': pyarrow.float64(),
+    'numeric': pyarrow.float64(),
+    'decimal': pyarrow.float64(),
+    'boolean': pyarrow.bool_(),
+    'bool': pyarrow.bool_(),
+    'text': pyarrow.string(),
+    'character varying': pyarrow.string(),
+    'varchar': pyarrow.string(),
+    'character': pyarrow.string(),
+    'char': pyarrow.string(),
+    'bpchar': pyarrow.string(),
+    'name': pyarrow.string(),
+    'citext': pyarrow.string(),
+    'uuid': pyarrow.string(),
+    'json': pyarrow.string(),
+    'jsonb': pyarrow.string(),
+    'xml': pyarrow.string(),
+    'inet': pyarrow.string(),
+    'cidr': pyarrow.string(),
+    'macaddr': pyarrow.string(),
+    'bytea': pyarrow.binary(),
+    'date': pyarrow.date32(),
+    'timestamp without time zone': pyarrow.timestamp('us'),
+    'timestamp': pyarrow.timestamp('us'),
+    'timestamp with time zone': pyarrow.timestamp('us', tz='UTC'),
+    'timestamptz': pyarrow.timestamp('us', tz='UTC'),
+    'time without time zone': pyarrow.time64('us'),
+    'time': pyarrow.time64('us'),
+    'time with time zone': pyarrow.time64('us'),
+    'timetz': pyarrow.time64('us'),
+    'interval': pyarrow.month_day_nano_interval(),
+}
+
+# `numeric(10,2)`, `character varying(255)`, `timestamp(3) without time zone`
+_MODIFIERS = re.compile(r'\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)')
+
+
+def postgres_to_arrow(data_type : str) -> pyarrow.DataType:
+    """
+Maps a Postgres type name, as reported by `information_schema.columns` or
+`format_type`, to a `pyarrow.DataType`, unknown types map to strings
+    """
+    data_type = data_type.strip().lower()
+    if data_type.endswith('[]'):
+        return pyarrow.list_(postgres_to_arrow(data_type[:-2]))
+    modifiers = _MODIFIERS.search(data_type)
+    base = _MODIFIERS.sub('', data_type).strip()
+    base = re.sub(r'\s+', ' ', base)
+    if base in ('numeric', 'decimal') and modifiers:
+        precision = int(modifiers.group(1))
+        scale = int(modifiers.group(2) or 0)
+        if precision <= 38:
+            return pyarrow.decimal128(precision, scale)
+        return pyarrow.decimal256(min(precision, 76), scale)
+    return POSTGRES_TYPES.get(base, pyarrow.string())
+
+
+@functools.lru_cache(maxsize=None)
+def postgres_arrow_type_name(data_type : str) -> str:
+    """
+Cached arrow type name of a Postgres type name, catalogs repeat a handful
+of type names millions of times
+    """
+    return str(postgres_to_arrow(data_type))
+
+
+# arrow type names `postgres_arrow_type_name` makes, back to their types
+_ARROW_TYPES = {str(t): t for t in POSTGRES_TYPES.values()}
+_DECIMAL = re.compile(r'decimal(128|256)\((\d+), (-?\d+)\)$')
+
+
+@functools.lru_cache(maxsize=None)
+def arrow_type(type_name : str) -> typing.Optional[pyarrow.DataType]:
+    """
+The `pyarrow.DataType` of an arrow type name made by
+`postgres_arrow_type_name`, None for names it can't be read back from
+    """
+    if type_name in _ARROW_TYPES:
+        return _ARROW_TYPES[type_name]
+    decimal = _DECIMAL.match(type_name)
+    if decimal:
+        width, precision, scale = decimal.groups()
+        factory = pyarrow.decimal128 if width == '128' else pyarrow.decimal256
+        return factory(int(precision), int(scale))
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def type_family(arrow_type : str) -> str:
+    """
+Coarse family of an arrow type name (`str(pyarrow.DataType)`) used to
+compare types across sources: integer, floating, decimal, string,
+binary, boolean, temporal, nested or other
+    """
+    if re.match(r'u?int\d+$', arrow_type):
+        return 'integer'
+    if arrow_type in ('halffloat', 'float', 'double'):
+        return 'floating'
+    if arrow_type.startswith('decimal'):
+        return 'decimal'
+    if arrow_type in ('string', 'large_string', 'utf8', 'large_utf8') or arrow_type.startswith('dictionary<values=string'):
+        return 'string'
+    if 'binary' in arrow_type:
+        return 'binary'
+    if arrow_type == 'bool':
+        return 'boolean'
+    if arrow_type.startswith(('date', 'timestamp', 'time', 'duration', 'month_day_nano_interval')):
+        return 'temporal'
+    if arrow_type.startswith(('list', 'large_list', 'fixed_size_list', 'struct', 'map')):
+        return 'nested'
+    return 'other'
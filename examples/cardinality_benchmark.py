@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Measures the throughput of `EntityGraph.infer_cardinalities` over a lake of
+generated parquet files, each `fact_i` referencing `dim_i` through `dim_i_id`
+
+Usage: `python examples/cardinality_benchmark.py [n_pairs] [n_rows]`
+"""
+import collections
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyarrow
+import pyarrow.parquet as pq
+
+from entitygraph.graph import EntityGraph
+from entitygraph.sources import FileSource
+
+
+def write_lake(path, n_pairs, n_rows):
+    rng = np.random.default_rng(0)
+    for i in range(n_pairs):
+        dim_ids = np.arange(n_rows)
+        pq.write_table(pyarrow.table({
+            'id': dim_ids,
+            'label': [f'label_{j}' for j in dim_ids]
+        }), os.path.join(path, f'dim{i}.parquet'))
+        pq.write_table(pyarrow.table({
+            'id': np.arange(n_rows),
+            f'dim{i}_id': rng.integers(0, n_rows // 10, n_rows),
+            'amount': rng.random(n_rows)
+        }), os.path.join(path, f'fact{i}.parquet'))
+
+
+if __name__ == '__main__':
+    n_pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    path = tempfile.mkdtemp(prefix='entitygraph-lake-')
+    try:
+        write_lake(path, n_pairs, n_rows)
+        path_root, prefix = path.strip('/').split('/', 1)
+        graph = EntityGraph(FileSource(path_root, prefix=prefix))
+        graph.build_graph()
+        start = time.perf_counter()
+        cardinalities = graph.infer_cardinalities(n=n_rows)
+        elapsed = time.perf_counter() - start
+        print(f'{len(cardinalities)} edges in {elapsed:.2f}s, {len(cardinalities) / elapsed:,.0f} edges per second')
+        print(dict(collections.Counter(c.value for c in cardinalities.values())))
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Measures the per-entity memory overhead of `Entity` against the previous
+dict-backed representation with per-entity column lists
+
+Usage: `python examples/entity_memory_benchmark.py [n_entities] [n_columns]`
+"""
+import gc
+import sys
+import tracemalloc
+
+from entitygraph.entity import Entity
+
+
+class DictEntity:
+    """
+The previous `Entity` layout: an instance `__dict__`, a per-entity list
+of column names and a per-entity type dict
+    """
+    def __init__(self, source, identifier, columns=[], column_type_map={}, column_df=None):
+        self.source = source
+        self.identifier = identifier
+        self.columns = columns
+        self.column_type_map = column_type_map
+        self._pk_candidates = []
+        self.pk = None
+        self.dks = []
+
+
+def catalog_rows(n_entities, n_columns):
+    """
+Catalog rows as a database driver hands them over: fresh strings per row
+    """
+    types = ['integer', 'text', 'timestamp without time zone', 'numeric', 'boolean']
+    for i in range(n_entities):
+        yield (
+            f'db.schema.table_{i}',
+            [''.join(['column_', str(j)]) for j in range(n_columns)],
+            [''.join(types[j % len(types)]) for j in range(n_columns)]
+        )
+
+
+def measure(cls, n_entities, n_columns):
+    """
+Bytes retained per entity once the catalog rows are gone
+    """
+    gc.collect()
+    tracemalloc.start()
+    entities = [
+        cls(None, identifier, columns=columns, column_type_map=dict(zip(columns, types)))
+        for identifier, columns, types in catalog_rows(n_entities, n_columns)
+    ]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / len(entities)
+
+
+if __name__ == '__main__':
+    n_entities = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    old = measure(DictEntity, n_entities, n_columns)
+    new = measure(Entity, n_entities, n_columns)
+    print(f'{n_entities} entities x {n_columns} columns')
+    print(f'dict entity:    {old:10.0f} bytes per entity')
+    print(f'slotted entity: {new:10.0f} bytes per entity')
+    print(f'reduction:      {1 - new / old:10.1%}')
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Measures `NameIndex` matching of reference columns to the tables they are
+named after, over generated tables whose columns refer to other tables in
+snake case, camel case and abbreviated styles
+
+Usage: `python examples/name_matching_benchmark.py [n_tables] [n_columns] [processes]`,
+with `processes` the column stems are scored in that many worker processes
+"""
+import sys
+import time
+
+import numpy as np
+
+from entitygraph import parallel
+from entitygraph.entity import Entity
+from entitygraph.names import NameIndex, reference_stem
+
+
+SYLLABLES = ['ba', 'ko', 'ri', 'tu', 'me', 'sa', 'lo', 'vi', 'ne', 'da', 'pu', 'ge', 'zo', 'fi', 'ha', 'ly']
+
+
+def table_names(n_tables, rng):
+    names = {}
+    while len(names) < n_tables:
+        words = [''.join(rng.choice(SYLLABLES, size=rng.integers(3, 5))) for _ in range(rng.integers(1, 3))]
+        names['_'.join(words) + 's'] = None
+    return list(names)
+
+
+def reference(name, style):
+    words = name[:-1].split('_')
+    if style == 0:
+        return '_'.join(words) + '_id'
+    if style == 1:
+        return ''.join(w.capitalize() for w in words) + 'Key'
+    # the last word abbreviated to its first five letters
+    return '_'.join(words[:-1] + [words[-1][:5]]) + '_sk'
+
+
+def build_entities(n_tables, n_columns, rng):
+    names = table_names(n_tables, rng)
+    entities, expected = [], []
+    n_references = min(3, n_columns - 1)
+    for i, name in enumerate(names):
+        targets = rng.integers(0, n_tables, n_references)
+        columns = ['id'] + [reference(names[t], int(t) % 3) for t in targets]
+        columns += [f'attribute_{j}' for j in range(n_columns - len(columns))]
+        entities.append(Entity(None, f'db.public.{name}', columns=columns))
+        expected.extend((columns[k + 1], names[t]) for k, t in enumerate(targets))
+    return entities, expected
+
+
+if __name__ == '__main__':
+    n_tables = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    rng = np.random.default_rng(0)
+    entities, expected = build_entities(n_tables, n_columns, rng)
+
+    start = time.perf_counter()
+    index = NameIndex(entities)
+    built = time.perf_counter()
+    matches = None
+    if processes:
+        stems = (reference_stem(column) for ent in entities for column in ent.columns)
+        matches = parallel.lookup_stems(index, [stem for stem in stems if stem is not None], processes=processes)
+    references = {}
+    for referenced, referencing, column, score in index.references(entities, matches=matches):
+        references.setdefault(column, referenced.identifier)
+    matched = time.perf_counter()
+
+    hits = sum(1 for column, name in expected if references.get(column, '').endswith(f'.{name}'))
+    print(f'{len(entities):,} tables, {len(entities) * n_columns:,} columns')
+    print(f'index built in {built - start:.2f}s, columns matched in {matched - built:.2f}s')
+    print(f'{hits / len(expected):.1%} of {len(expected):,} reference columns matched their table')
@@ -2,10 +2,13 @@
 import os
 import sys
 import json
+import itertools
 
 import networkx as nx
 import snowflake
 
+from entitygraph.dates import date_type_kind
+
 def get_snowflake_connection():
     from snowflake import connector
     conn = connector.Connect(
@@ -62,14 +65,8 @@ def extract_date_cols(G):
     for node in G.nodes:
         G.nodes[node]['date_columns'] = [
                 x for x in G.nodes[node]['columns']
-                                    if 'DATE' in x['type']
-                                    or 'TIMESTAMP' in x['type']
-                                    or 'DATETIME' in x['type']
-                                    or 'TIME' in x['type']
-                                    or 'TIMESTAMP_LTZ' in x['type']
-                                    or 'TIMESTAMP_NTZ' in x['type']
-                                    or 'TIMESTAMP_TZ' in x['type']
-                                    ]
+                if date_type_kind(x['type']) == 'date'
+                ]
 
 
 def build_warehouse_network(G):
@@ -107,49 +104,24 @@ def build_warehouse_network(G):
     return G
 
 
-def optimize_paths_distance_hops(G, start, end):
+def optimize_paths_distance_hops(G, start, end, k=5):
     """
-    Something like a Dijkstra's implementation for shortest path
+    Shortest paths between two nodes, a bidirectional breadth first
+    search for the shortest and Yen's algorithm for the others
 
     Usage: `optimize_paths_distance_hops(G, 'table1', 'table2')
-    -> ['table1', 'tableX', 'table2']
+    -> {'path' : ['table1', 'tableX', 'table2'], 'paths' : [...]}
 
     Parameters
     ----------
     start : str node to start with
     end : str node to end with
+    k : int of paths to return in `paths`
     Returns
     ---------
-    paths : list of paths to take
+    paths : dict of the shortest `path` and the `k` shortest `paths`
     """
-    nodes_to_traverse = []
-    paths = {}
-    for n in G.neighbors(start):
-        nodes_to_traverse.append( n )
-        try:
-            paths[n] = {
-                'path' : [start, n],
-                'paths' : []
-                }
-        except Exception as e:
-            print("Failed on node: {0}".format(n))
-    while len(nodes_to_traverse) > 0:
-        n = nodes_to_traverse[0]
-        del nodes_to_traverse[0]
-        for n1 in G.neighbors(n):
-            if not paths.get(n1):
-                paths[n1] = {
-                        'path' : paths[n]['path'] + [n1],
-                        'paths' : [ paths[n]['path'] + [n1] ]
-                        }
-                nodes_to_traverse.append(n1)
-            else:
-                paths[n1]['paths'].append(paths[n]['path'] + [n1])
-                if len(paths[n1]['path']) >= len(paths[n]['path'] + [n1]):
-                    paths[n1]['path'] = paths[n]['path'] + [n1]
-    return paths[end]
-
-
-
-
-
+    return {
+        'path' : nx.bidirectional_shortest_path(G, start, end),
+        'paths' : list(itertools.islice(nx.shortest_simple_paths(G, start, end), k))
+    }
@@ -0,0 +1,65 @@
+"""
+In-process stand-in for psycopg2 connections, a connection answers every
+query, and `COPY ... TO STDOUT` as csv, through a `responder(sql, params)`
+returning (column names, rows)
+"""
+
+
+class FakeCursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.description = None
+        self.itersize = None
+        self.closed = False
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql, params=None):
+        self.conn.queries.append((sql, params))
+        columns, rows = self.conn.responder(sql, params)
+        self.description = [(c,) for c in columns]
+        self._rows = list(rows)
+
+    def copy_expert(self, sql, file):
+        self.conn.queries.append((sql, None))
+        columns, rows = self.conn.responder(sql, None)
+        lines = [','.join(columns)] + [','.join('' if v is None else str(v) for v in row) for row in rows]
+        file.write(('\n'.join(lines) + '\n').encode())
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, responder):
+        self.responder = responder
+        self.queries = []
+        self.cursors = []
+        self.rollbacks = 0
+        self.closed = 0
+
+    def cursor(self, name=None):
+        self.cursors.append(FakeCursor(self, name))
+        return self.cursors[-1]
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = 1
@@ -0,0 +1,57 @@
+import gc
+import os
+import threading
+
+import pyarrow
+
+from entitygraph.cache import SampleCache
+
+
+def sample(n=200, value=0):
+    return pyarrow.table({'a': [value] * n})
+
+
+def test_spilled_samples_are_served_and_cleaned_up():
+    cache = SampleCache(max_bytes=2000)
+    for i in range(5):
+        cache.put(i, sample(value=i))
+    spill_dir = cache.spill_dir
+    assert len(cache) == 5
+    assert len(os.listdir(spill_dir)) >= 3
+    assert cache.get(0).column('a').to_pylist() == [0] * 200
+
+    # a key put again replaces its spilled copy
+    cache.put(0, sample(value=9))
+    assert cache.get(0).column('a')[0].as_py() == 9
+
+    cache.clear()
+    assert os.listdir(spill_dir) == [] and len(cache) == 0
+
+    for i in range(5):
+        cache.put(i, sample(value=i))
+    del cache
+    gc.collect()
+    assert not os.path.exists(spill_dir)
+
+
+def test_spill_files_are_written_outside_the_lock(monkeypatch):
+    cache = SampleCache(max_bytes=2000)
+    writing, release = threading.Event(), threading.Event()
+    spill = SampleCache._spill
+
+    def slow_spill(self, key, table):
+        writing.set()
+        release.wait(5)
+        spill(self, key, table)
+
+    monkeypatch.setattr(SampleCache, '_spill', slow_spill)
+    cache.put('a', sample())
+    writer = threading.Thread(target=cache.put, args=('b', sample()))
+    writer.start()
+    assert writing.wait(5)
+    # the evicted sample is served from memory while it's written out
+    assert cache.get('a').num_rows == 200
+    assert cache.get('b').num_rows == 200
+    release.set()
+    writer.join()
+    assert cache.get('a').num_rows == 200
@@ -0,0 +1,44 @@
+import os
+import time
+
+import pyarrow
+import pyarrow.parquet as pq
+
+from entitygraph.catalog import MetadataCatalog
+from entitygraph.sources import FileSource
+
+
+def file_source(path, **kwargs):
+    # the root is a single directory name, the rest of the path a prefix
+    root, prefix = str(path).lstrip('/').split('/', 1)
+    return FileSource(root, prefix=prefix, **kwargs)
+
+
+def test_partitioned_state_follows_part_files(tmp_path):
+    entity = tmp_path / 'orders.parquet'
+    (entity / 'year=2020').mkdir(parents=True)
+    part = entity / 'year=2020' / 'part-0.parquet'
+    pq.write_table(pyarrow.table({'id': [1, 2]}), part)
+    source = file_source(tmp_path, entities_are_partitioned=True)
+    before = source.get_entity_states()
+    assert list(before) == [str(entity)]
+
+    directory_mtime = os.stat(entity).st_mtime_ns
+    time.sleep(0.01)
+    pq.write_table(pyarrow.table({'id': [1, 2, 3]}), part)
+    assert os.stat(entity).st_mtime_ns == directory_mtime
+    assert source.get_entity_states() != before
+
+
+def test_warm_catalog_keeps_nullability(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    schema = pyarrow.schema([pyarrow.field('id', pyarrow.int64(), nullable=False), pyarrow.field('name', pyarrow.string())])
+    pq.write_table(pyarrow.table({'id': [1], 'name': ['a']}, schema=schema), data / 'things.parquet')
+    catalog = MetadataCatalog(str(tmp_path / 'catalog.db'))
+
+    cold = file_source(data)
+    assert cold.sync_catalog(catalog) == ([str(data / 'things.parquet')], [])
+    warm = file_source(data)
+    assert warm.sync_catalog(catalog) == ([], [])
+    assert warm.get_entities()[0].nullable == cold.get_entities()[0].nullable == (False, True)
@@ -0,0 +1,9 @@
+from entitygraph.dates import date_type_kind
+
+
+def test_warehouse_numeric_types_are_not_probed():
+    for type_name in ('NUMBER(38,0)', 'DECIMAL(10,2)', 'INT64', 'BIGINT', 'FLOAT8', 'DOUBLE'):
+        assert date_type_kind(type_name) is None
+    assert date_type_kind('TIMESTAMP_NTZ') == 'date'
+    assert date_type_kind('VARCHAR(16)') == 'probe'
+    assert date_type_kind('interval') is None
@@ -0,0 +1,417 @@
+import json
+
+import pyarrow
+import pyarrow.parquet as pq
+import pytest
+
+from entitygraph.cardinality import RelationalCardinality
+from entitygraph.catalog import MetadataCatalog
+from entitygraph.entity import Entity
+from entitygraph.graph import EntityGraph
+from entitygraph.sources import FileSource, PostgresSource
+from entitygraph.types import postgres_arrow_type_name
+
+from fakepg import FakeConnection
+
+
+def file_source(path, **kwargs):
+    # the root is a single directory name, the rest of the path a prefix
+    root, prefix = str(path).lstrip('/').split('/', 1)
+    return FileSource(root, prefix=prefix, **kwargs)
+
+
+def edge_set(graph):
+    return {
+        (frozenset([n1, n2]), json.dumps(attr, sort_keys=True, default=str))
+        for n1, n2, attr in graph.edge_records()
+    }
+
+
+def write(path, **columns):
+    pq.write_table(pyarrow.table({name: [1, 2] for name in columns}), path)
+
+
+def test_refresh_matches_rebuild_filesystem(tmp_path):
+    write(tmp_path / 'customers.parquet', id=1, name=1)
+    write(tmp_path / 'orders.parquet', id=1, customer_id=1)
+    write(tmp_path / 'reviews.parquet', id=1, order_id=1)
+    graph = EntityGraph(file_source(tmp_path))
+    graph.build_graph()
+    unbuilt = EntityGraph(file_source(tmp_path))
+    unbuilt.source.get_entities()
+
+    write(tmp_path / 'products.parquet', id=1)
+    write(tmp_path / 'payments.parquet', id=1, order_id=1)
+    write(tmp_path / 'orders.parquet', id=1, customer_id=1, product_id=1)
+    (tmp_path / 'reviews.parquet').unlink()
+    changes = dict(
+        added=lambda source: source.load_entities([str(tmp_path / 'products.parquet'), str(tmp_path / 'payments.parquet')]),
+        altered=lambda source: source.load_entities([str(tmp_path / 'orders.parquet')]),
+        removed=lambda source: [str(tmp_path / 'reviews.parquet')])
+    for g in (graph, unbuilt):
+        g.refresh(**{name: change(g.source) for name, change in changes.items()})
+
+    rebuilt = EntityGraph(file_source(tmp_path))
+    rebuilt.build_graph()
+    assert len(edge_set(rebuilt)) == 3
+    assert edge_set(graph) == edge_set(rebuilt)
+    assert edge_set(unbuilt) == edge_set(rebuilt)
+    assert sorted(e.identifier for e in graph.nodes()) == sorted(e.identifier for e in rebuilt.nodes())
+
+
+class CatalogServer:
+    """
+A mutable Postgres catalog of one `public` schema answering the column,
+foreign key and key constraint queries of a streaming `PostgresSource`
+    """
+    def __init__(self):
+        # table -> [(column, type)]
+        self.tables = {}
+        # (table, column, referenced table, referenced column)
+        self.fks = []
+        # table -> [(contype, [columns])]
+        self.keys = {}
+
+    def connect(self, database):
+        return FakeConnection(self.respond)
+
+    def respond(self, sql, params):
+        params = params or {}
+        if 'AS state' in sql:
+            return ['table_catalog', 'table_schema', 'table_name', 'state'], [
+                ('db', 'public', table, json.dumps([self.tables[table], self.keys.get(table)]))
+                for table in sorted(self.tables)
+            ]
+        if "contype IN ('p', 'u')" in sql:
+            return ['table_catalog', 'table_schema', 'table_name', 'constraint_type', 'key_columns'], [
+                ('db', 'public', table, contype, columns)
+                for table in sorted(self.keys) for contype, columns in self.keys[table]
+            ]
+        if "contype = 'f'" in sql:
+            touching = params.get('touching')
+            return [
+                'constraint_name', 'constraint_catalog', 'constraint_schema', 'constraint_table', 'constraint_columns',
+                'referenced_schema', 'referenced_table', 'referenced_columns'], [
+                (f'{table}_fk', 'db', 'public', table, [column], 'public', referenced, [referenced_column])
+                for table, column, referenced, referenced_column in sorted(self.fks)
+                if touching is None or f'public.{table}' in touching or f'public.{referenced}' in touching
+            ]
+        relations = params.get('relations')
+        return ['table_catalog', 'table_schema', 'table_name', 'column_name', 'ordinal_position', 'data_type', 'is_nullable'], [
+            ('db', 'public', table, column, i + 1, data_type, 'YES')
+            for table in sorted(self.tables) for i, (column, data_type) in enumerate(self.tables[table])
+            if relations is None or f'public.{table}' in relations
+        ]
+
+    def entity(self, source, table):
+        columns = self.tables[table]
+        return Entity(
+                source,
+                f'db.public.{table}',
+                columns=[c for c, _ in columns],
+                column_type_map={c: postgres_arrow_type_name(t) for c, t in columns},
+                nullable=[True] * len(columns))
+
+
+def postgres_source(server):
+    return PostgresSource('host', 'user', 'pw', 5432, 'db', use_pg_catalog=True, stream=True, connection_factory=server.connect)
+
+
+def test_refresh_matches_rebuild_postgres():
+    server = CatalogServer()
+    server.tables = {
+        'customers': [('id', 'integer'), ('name', 'text')],
+        'orders': [('id', 'integer'), ('customer_id', 'integer')],
+        'reviews': [('id', 'integer'), ('order_id', 'integer')],
+    }
+    server.fks = [('orders', 'customer_id', 'customers', 'id'), ('reviews', 'order_id', 'orders', 'id')]
+    graph = EntityGraph(postgres_source(server))
+    graph.build_graph()
+    unbuilt = EntityGraph(postgres_source(server))
+    unbuilt.source.get_entities()
+
+    # a declared primary key that isn't `id`
+    server.tables['products'] = [('sku', 'text'), ('name', 'text')]
+    server.keys['products'] = [('p', ['sku'])]
+    server.tables['payments'] = [('id', 'integer'), ('order_id', 'integer')]
+    server.tables['orders'].append(('product_id', 'text'))
+    del server.tables['reviews']
+    server.fks = [('orders', 'customer_id', 'customers', 'id'), ('payments', 'order_id', 'orders', 'id')]
+    for g in (graph, unbuilt):
+        g.refresh(
+                added=[server.entity(g.source, 'products'), server.entity(g.source, 'payments')],
+                altered=[server.entity(g.source, 'orders')],
+                removed=['db.public.reviews'])
+
+    rebuilt = EntityGraph(postgres_source(server))
+    rebuilt.build_graph()
+    assert len(edge_set(rebuilt)) == 3
+    assert (frozenset(['db.public.products', 'db.public.orders']), json.dumps({
+        'db.public.orders_key': 'product_id', 'db.public.products_key': 'sku', 'from_schema': False}, sort_keys=True)) in edge_set(rebuilt)
+    assert edge_set(graph) == edge_set(rebuilt)
+    assert edge_set(unbuilt) == edge_set(rebuilt)
+
+
+def test_warm_catalog_keeps_primary_keys(tmp_path):
+    server = CatalogServer()
+    server.tables = {
+        'products': [('sku', 'text'), ('name', 'text')],
+        'orders': [('id', 'integer'), ('product_id', 'text')],
+    }
+    server.keys = {'products': [('p', ['sku'])]}
+    catalog = MetadataCatalog(str(tmp_path / 'catalog.db'))
+    cold = EntityGraph(postgres_source(server))
+    cold.build_graph(catalog=catalog)
+
+    server.tables['customers'] = [('code', 'text')]
+    server.keys['customers'] = [('p', ['code'])]
+    server.tables['orders'].append(('customer_id', 'text'))
+    warm = EntityGraph(postgres_source(server))
+    warm.build_graph(catalog=catalog)
+    assert {ent.identifier: ent.pk for ent in warm.nodes()} == {
+        'db.public.products': 'sku', 'db.public.orders': None, 'db.public.customers': 'code'}
+    rebuilt = EntityGraph(postgres_source(server))
+    rebuilt.build_graph()
+    assert len(edge_set(rebuilt)) == 2
+    assert edge_set(warm) == edge_set(rebuilt)
+
+    # a new primary key alone marks the table as changed
+    server.keys['orders'] = [('p', ['id'])]
+    warmer = EntityGraph(postgres_source(server))
+    warmer.build_graph(catalog=catalog)
+    assert {ent.identifier: ent.pk for ent in warmer.nodes()}['db.public.orders'] == 'id'
+
+
+def test_save_load_round_trips_edges(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    write(data / 'customers.parquet', id=1, name=1)
+    write(data / 'orders.parquet', id=1, customer_id=1)
+    graph = EntityGraph(file_source(data))
+    graph.build_graph()
+    customers, orders = sorted(graph.nodes(), key=lambda e: e.identifier)
+    # an edge without keys or `from_schema`, e.g. added by hand
+    graph.add_edge(customers, customers, attr={'note': 'self'})
+    graph.save(str(tmp_path / 'snapshot'))
+
+    loaded = EntityGraph.load(str(tmp_path / 'snapshot'), source=file_source(data))
+    assert edge_set(loaded) == edge_set(graph)
+    assert len(edge_set(loaded)) == 2
+
+
+def test_measured_one_to_one_is_kept(tmp_path):
+    pq.write_table(pyarrow.table({'id': [1, 2, 3]}), tmp_path / 'customers.parquet')
+    pq.write_table(pyarrow.table({'id': [7, 8, 9], 'customer_id': [1, 2, 3]}), tmp_path / 'passports.parquet')
+    source = file_source(tmp_path)
+    customers, passports = sorted(source.get_entities(), key=lambda e: e.identifier)
+    graph = EntityGraph(source)
+    graph.add_edge(customers, passports, attr={
+        f'{customers.identifier}_key': 'id', f'{passports.identifier}_key': 'customer_id'})
+    cardinalities = graph.infer_cardinalities()
+    assert list(cardinalities.values()) == [RelationalCardinality.one_to_one]
+
+
+def test_inclusion_edges_of_large_integer_ids(tmp_path):
+    # ids a float64 can't tell apart
+    ids = [2 ** 60 + i for i in range(200)]
+    pq.write_table(pyarrow.table({'id': ids}), tmp_path / 'accounts.parquet')
+    pq.write_table(pyarrow.table({
+        'id': list(range(400)),
+        'payer': [ids[i % 150] for i in range(400)]}), tmp_path / 'transfers.parquet')
+    graph = EntityGraph(file_source(tmp_path))
+    graph.add_nodes_from(graph.source.get_entities())
+    inferred = graph.infer_edges_dtypes()
+    assert len(inferred) == 1
+    accounts, transfers = inferred[0]
+    attr = graph[accounts][transfers]['attr']
+    assert attr[f'{accounts.identifier}_key'] == 'id'
+    assert attr[f'{transfers.identifier}_key'] == 'payer'
+    assert attr['from_schema'] is False
+
+
+def test_name_edges_are_marked_inferred(tmp_path):
+    write(tmp_path / 'customers.parquet', id=1, name=1)
+    write(tmp_path / 'orders.parquet', id=1, cust_id=1)
+    graph = EntityGraph(file_source(tmp_path))
+    graph.add_nodes_from(graph.source.get_entities())
+    inferred = graph.infer_edges_nlp()
+    assert len(inferred) == 1
+    customers, orders = inferred[0]
+    attr = graph[customers][orders]['attr']
+    assert attr[f'{orders.identifier}_key'] == 'cust_id'
+    assert attr['from_schema'] is False
+
+
+def test_naming_edges_keep_declared_keys():
+    server = CatalogServer()
+    server.tables = {
+        'customers': [('id', 'integer'), ('name', 'text')],
+        'orders': [('id', 'integer'), ('buyer', 'integer'), ('customer_id', 'integer')],
+    }
+    server.fks = [('orders', 'buyer', 'customers', 'id')]
+    graph = EntityGraph(postgres_source(server))
+    graph.build_graph()
+    assert graph.edge_records() == [('db.public.customers', 'db.public.orders', {
+        'db.public.orders_key': 'buyer', 'db.public.customers_key': 'id', 'from_schema': True})]
+
+
+def test_elected_keys_only_replace_guessed_ids(tmp_path):
+    pq.write_table(pyarrow.table({'sku': ['a', 'b', 'c']}), tmp_path / 'products.parquet')
+    pq.write_table(pyarrow.table({'code': [7, 8, 9], 'id': [1, 2, 3]}), tmp_path / 'customers.parquet')
+    pq.write_table(pyarrow.table({
+        'id': [1, 2, 3, 4], 'customer_id': [1, 2, 3, 3], 'product_id': ['a', 'b', 'c', 'c']}), tmp_path / 'orders.parquet')
+    graph = EntityGraph(file_source(tmp_path))
+    graph.build_graph()
+    customers, orders, products = sorted(graph.nodes(), key=lambda e: e.identifier)
+    graph.remove_edge(customers, orders)
+    graph.infer_edges_dtypes(entities=[customers, orders])
+    inclusion = dict(graph[customers][orders]['attr'])
+    assert 'inclusion' in inclusion
+    assert graph[products][orders]['attr'][f'{products.identifier}_key'] == 'id'
+
+    # a declared key that isn't `id`
+    customers.pk = 'code'
+    graph._rekey_edges([customers])
+    assert graph[customers][orders]['attr'] == inclusion
+    graph.elect_pks()
+    assert products.pk == 'sku'
+    assert graph[products][orders]['attr'][f'{products.identifier}_key'] == 'sku'
+
+
+def test_inclusions_between_sequences_are_skipped(tmp_path):
+    pq.write_table(pyarrow.table({'id': list(range(1, 201))}), tmp_path / 'customers.parquet')
+    pq.write_table(pyarrow.table({
+        'oid': list(range(400)),
+        'cust': [1 + i % 150 for i in range(400)]}), tmp_path / 'orders.parquet')
+    graph = EntityGraph(file_source(tmp_path))
+    graph.add_nodes_from(graph.source.get_entities())
+    inferred = graph.infer_edges_dtypes()
+    assert len(inferred) == 1
+    customers, orders = inferred[0]
+    attr = graph[customers][orders]['attr']
+    assert (attr[f'{customers.identifier}_key'], attr[f'{orders.identifier}_key']) == ('id', 'cust')
+
+
+class InferringFileSource(FileSource):
+    # like the COPY csv reader, columns sampled without a catalog type are
+    # parsed by inference, so numeric text becomes integers
+    def get_sample(self, entity, n=100, columns=None, as_arrow=False, **kwargs):
+        table = super().get_sample(entity, n=n, columns=columns, as_arrow=True, **kwargs)
+        types = entity.column_type_map
+        for i, name in enumerate(table.column_names):
+            if name not in types:
+                try:
+                    table = table.set_column(i, name, table.column(name).cast(pyarrow.int64()))
+                except pyarrow.ArrowInvalid:
+                    pass
+        return table if as_arrow else table.to_pandas()
+
+
+def test_sketches_match_across_processes(tmp_path):
+    codes = [f'{i:03d}' for i in range(1, 201)]
+    pq.write_table(pyarrow.table({'code': codes}), tmp_path / 'accounts.parquet')
+    pq.write_table(pyarrow.table({
+        'id': list(range(300)),
+        'account_code': [codes[i % 150] for i in range(299)] + ['X99']}), tmp_path / 'transfers.parquet')
+    root, prefix = str(tmp_path).lstrip('/').split('/', 1)
+    found = []
+    for processes in (1, 2):
+        graph = EntityGraph(InferringFileSource(root, prefix=prefix))
+        graph.add_nodes_from(graph.source.get_entities())
+        graph.infer_edges_dtypes(processes=processes)
+        found.append(edge_set(graph))
+    assert len(found[0]) == 1
+    assert found[0] == found[1]
+
+
+def join_graph(path):
+    # customers reach stores through the large orders table in two hops or
+    # through the small regions and countries dimensions in three
+    tables = {
+        'customers': {'id': 10, 'region_id': 10},
+        'orders': {'id': 5000, 'customer_id': 5000, 'store_id': 5000},
+        'stores': {'id': 20, 'country_id': 20},
+        'regions': {'id': 5, 'country_id': 5},
+        'countries': {'id': 3},
+    }
+    for name, columns in tables.items():
+        pq.write_table(pyarrow.table({c: list(range(n)) for c, n in columns.items()}), path / f'{name}.parquet')
+    graph = EntityGraph(file_source(path))
+    ents = {ent.identifier.rsplit('/', 1)[-1].split('.')[0]: ent for ent in graph.source.get_entities()}
+    graph.add_nodes_from(ents.values())
+    for n1, key1, n2, key2 in [
+            ('customers', 'id', 'orders', 'customer_id'),
+            ('stores', 'id', 'orders', 'store_id'),
+            ('regions', 'id', 'customers', 'region_id'),
+            ('countries', 'id', 'regions', 'country_id'),
+            ('countries', 'id', 'stores', 'country_id')]:
+        graph.add_edge(ents[n1], ents[n2], attr={
+            f'{ents[n1].identifier}_key': key1, f'{ents[n2].identifier}_key': key2})
+    return graph, ents
+
+
+def path_nodes(path):
+    return [path[0][0]] + [hop[1] for hop in path] if path else []
+
+
+def test_join_paths_are_shortest_first_and_follow_edits(tmp_path):
+    graph, ents = join_graph(tmp_path)
+    customers, orders, stores = ents['customers'], ents['orders'], ents['stores']
+    paths = graph.join_paths(customers, stores, k=3)
+    assert [path_nodes(path) for path in paths] == [
+        [customers, orders, stores],
+        [customers, ents['regions'], ents['countries'], stores]]
+    assert paths[0][0] == (customers, orders, 'id', 'customer_id')
+    assert graph.join_paths(stores.identifier, stores) == [[]]
+
+    # cached paths are dropped whenever an edge changes
+    attr = graph[orders][stores]['attr']
+    graph.remove_edge(orders, stores)
+    assert [path_nodes(path) for path in graph.join_paths(customers, stores)] == [
+        [customers, ents['regions'], ents['countries'], stores]]
+    graph.add_edge(orders, stores, attr=attr)
+    assert [path_nodes(path) for path in graph.join_paths(customers, stores)] == [[customers, orders, stores]]
+    graph.remove_node(orders)
+    assert graph.join_paths(customers, ents['countries']) != []
+    assert graph.join_paths(ents['countries'], ents['countries'], k=2) == [[]]
+
+
+def test_join_paths_batch_matches_join_paths(tmp_path):
+    graph, ents = join_graph(tmp_path)
+    # two ends of one start are answered by a shared search
+    pairs = [(ents['customers'], ents['stores']), (ents['customers'], ents['countries']),
+             (ents['orders'], ents['orders']), (ents['regions'].identifier, ents['stores'].identifier)]
+    expected = [graph.join_paths(start, end) for start, end in pairs]
+    graph._clear_path_cache()
+    assert graph.join_paths_batch(pairs) == expected
+    assert graph.join_paths_batch(pairs, k=2) == [graph.join_paths(start, end, k=2) for start, end in pairs]
+
+    graph.remove_edge(ents['customers'], ents['orders'])
+    assert path_nodes(graph.join_paths_batch(pairs[:1])[0][0]) == [
+        ents['customers'], ents['regions'], ents['countries'], ents['stores']]
+
+
+def test_plan_join_takes_the_cheapest_route(tmp_path):
+    graph, ents = join_graph(tmp_path)
+    customers, orders, stores = ents['customers'], ents['orders'], ents['stores']
+    detour = [customers, ents['regions'], ents['countries'], stores]
+    plan = graph.plan_join([customers, stores])
+    # the detour has more hops but never reads the orders table
+    assert plan['entities'] == detour
+    assert [(hop['left'], hop['right']) for hop in plan['hops']] == list(zip(detour, detour[1:]))
+    assert plan['cost'] == sum(hop['cost'] for hop in plan['hops'])
+    rows = graph.source.get_row_estimates()
+    through_orders = graph.join_cost(customers, orders, rows)['cost'] + graph.join_cost(orders, stores, rows)['cost']
+    assert plan['cost'] < through_orders
+
+    # later entities join onto the cheapest entity already joined
+    plan = graph.plan_join([customers.identifier, stores, orders, customers])
+    assert plan['entities'] == detour + [orders]
+    assert (plan['hops'][-1]['left'], plan['hops'][-1]['right']) == (customers, orders)
+    assert graph.plan_join([orders]) == {'entities': [orders], 'hops': [], 'cost': 0}
+
+    with pytest.raises(Exception, match='at least one entity'):
+        graph.plan_join([])
+    graph.remove_edges_from([(customers, orders), (stores, orders)])
+    with pytest.raises(Exception, match='cannot be joined'):
+        graph.plan_join([customers, orders])
@@ -0,0 +1,53 @@
+from entitygraph.entity import Entity
+from entitygraph.inference import FKNameIndex, PathTokenIndex, column_prefix
+
+
+def entities(tables, prefix=''):
+    return [Entity(None, prefix + identifier, columns=columns) for identifier, columns in tables.items()]
+
+
+def test_fk_name_index_edges():
+    customers, orders, dim_products, reviews = entities({
+        'db.public.customers': ['id', 'name'],
+        'db.public.orders': ['id', 'customer_id', 'product_id'],
+        'db.public.dim_products': ['id'],
+        'db.public.reviews': ['id', 'order_id', 'customer_name'],
+    })
+    index = FKNameIndex([customers, orders, dim_products, reviews])
+    assert list(index.edges()) == [(customers, orders, 'customer_id'), (orders, reviews, 'order_id')]
+    assert list(index.referenced_by(orders)) == [(customers, 'customer_id')]
+
+    stripped = FKNameIndex([customers, orders, dim_products, reviews], strip_prefix=True)
+    assert (dim_products, orders, 'product_id') in list(stripped.edges())
+
+    index.remove(customers)
+    assert list(index.edges()) == [(orders, reviews, 'order_id')]
+    index.add(customers)
+    assert sorted(index.referencing(customers), key=lambda r: r[1]) == [(orders, 'customer_id')]
+
+
+def test_column_prefix_only_takes_id_columns():
+    assert column_prefix('customer_id') == 'customer'
+    assert column_prefix('dim_customer_ID') == 'dim_customer'
+    assert column_prefix('customer_name') == ''
+    assert column_prefix('order_total') == ''
+    assert column_prefix('id') == ''
+
+
+def test_path_token_index_edges():
+    customers, orders, shipments = entities({
+        'customers.parquet': ['id', 'name'],
+        'orders.parquet': ['id', 'customer_id', 'customer_name'],
+        'shipments.parquet': ['id', 'order_total'],
+    }, prefix='/lake/')
+    index = PathTokenIndex([customers, orders, shipments], root='/lake/')
+    assert list(index.edges()) == [(orders, customers, 'customer_id')]
+    assert list(index.referencing(customers)) == [(orders, 'customer_id')]
+    assert list(index.referenced_by(shipments)) == []
+
+    dim = Entity(None, '/lake/dim/dim_shipment.parquet', columns=['id'])
+    index.add(dim)
+    index.add(Entity(None, '/lake/events.parquet', columns=['shipment_id']))
+    assert [(ent.identifier, column) for ent, column in index.referencing(dim)] == [('/lake/events.parquet', 'shipment_id')]
+    index.remove(dim)
+    assert index.match('shipment') == [shipments]
@@ -0,0 +1,237 @@
+import io
+import threading
+import time
+
+import psycopg2.sql
+import pyarrow
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from entitygraph.entity import Entity
+from entitygraph.sources import FileSource, PostgresSource
+from entitygraph.types import postgres_arrow_type_name
+
+from fakepg import FakeConnection
+
+
+CATALOG_COLUMNS = ['table_catalog', 'table_schema', 'table_name', 'column_name', 'ordinal_position', 'data_type', 'is_nullable']
+FK_COLUMNS = [
+    'constraint_name', 'constraint_catalog', 'constraint_schema', 'constraint_table',
+    'constraint_columns', 'referenced_schema', 'referenced_table', 'referenced_columns']
+
+
+class CatalogServer:
+    """
+Answers the catalog queries of every schema in `schemas` of any database,
+queries of later schemas finish first so results arrive out of order
+    """
+    def __init__(self, schemas):
+        self.schemas = schemas
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def connect(self, database):
+        return FakeConnection(lambda sql, params: self.respond(database, sql, params))
+
+    def respond(self, database, sql, params):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if 'FROM pg_namespace' in sql and 'nspname FROM' in sql:
+                return ['nspname'], [(schema,) for schema in self.schemas]
+            schema = params['schemas'][0]
+            time.sleep(0.01 * (len(self.schemas) - self.schemas.index(schema)))
+            if "contype = 'f'" in sql:
+                return FK_COLUMNS, [('fk', database, schema, 'orders', ['customer_id'], schema, 'customers', ['id'])]
+            return CATALOG_COLUMNS, [
+                (database, schema, 'customers', 'id', 1, 'integer', 'NO'),
+                (database, schema, 'orders', 'id', 1, 'integer', 'NO'),
+                (database, schema, 'orders', 'customer_id', 2, 'integer', 'YES'),
+            ]
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_concurrent_catalog_is_merged_in_order_and_bounded():
+    server = CatalogServer(['s1', 's2', 's3', 's4'])
+    source = PostgresSource(
+            'host', 'user', 'pw', 5432, 'db1',
+            databases=['db1', 'db2'],
+            use_pg_catalog=True,
+            concurrent=True,
+            max_workers=2,
+            connection_factory=server.connect)
+    identifiers = [ent.identifier for ent in source.get_entities()]
+    assert identifiers == [
+        f'{db}.{schema}.{table}'
+        for db in ['db1', 'db2']
+        for schema in server.schemas
+        for table in ['customers', 'orders']
+    ]
+    assert 1 < server.peak <= 2
+    edges = source.get_defined_edges()
+    assert len(edges) == 8
+
+
+def file_source(path, **kwargs):
+    # the root is a single directory name, the rest of the path a prefix
+    root, prefix = str(path).lstrip('/').split('/', 1)
+    return FileSource(root, prefix=prefix, **kwargs)
+
+
+def test_stratified_sample_handles_empty_and_short_fragments(tmp_path):
+    table = pyarrow.table({'id': list(range(100)), 'v': [i % 3 for i in range(100)]})
+    # row groups of 10, 8 of them hold only `v == 0` rows past the filter
+    pq.write_table(table, tmp_path / 'things.parquet', row_group_size=10)
+    source = file_source(tmp_path)
+    ent = source.get_entities()[0]
+
+    empty = source.get_sample(ent, n=0, columns=['id'], stratified=True, as_arrow=True)
+    assert empty.num_rows == 0 and empty.column_names == ['id']
+    none = source.get_sample(ent, n=5, columns=['id'], filter=ds.field('id') > 1000, stratified=True, as_arrow=True)
+    assert none.num_rows == 0 and none.column_names == ['id']
+
+    # the 10 row groups have 3 or 4 rows with `v == 0`, a share of 5 each
+    # comes up short and is topped up from the other groups
+    sample = source.get_sample(ent, n=30, filter=ds.field('v') == 0, stratified=True, as_arrow=True)
+    assert sample.num_rows == 30
+    assert len(set(sample.column('id').to_pylist())) == 30
+    assert set(sample.column('v').to_pylist()) == {0}
+
+
+def test_copy_sample_keeps_catalog_types():
+    source = PostgresSource('host', 'user', 'pw', 5432, 'db')
+    types = {
+        'code': 'character varying', 'active': 'boolean', 'amount': 'numeric(12,2)',
+        'created': 'timestamp with time zone', 'tags': 'text[]', 'at': 'time with time zone'}
+    ent = Entity(source, 'db.public.things', columns=list(types) + ['untyped'],
+            column_type_map={c: postgres_arrow_type_name(t) for c, t in types.items()})
+    csv = (b'code,active,amount,created,tags,at,untyped\n'
+           b'007,t,12.50,2020-01-01 10:00:00+00,"{a,b}",10:00:00+02,1\n'
+           b',f,,,,,2\n')
+    table = source._read_copy_csv(io.BytesIO(csv), ent)
+    assert table.schema.field('code').type == pyarrow.string()
+    assert table.column('code').to_pylist() == ['007', None]
+    assert table.column('active').to_pylist() == [True, False]
+    assert table.schema.field('amount').type == pyarrow.decimal128(12, 2)
+    assert table.schema.field('created').type == pyarrow.timestamp('us', tz='UTC')
+    assert table.schema.field('tags').type == pyarrow.string()
+    # a time zone offset the csv reader can't parse leaves only that column a string
+    assert table.schema.field('at').type == pyarrow.string()
+    assert table.schema.field('untyped').type == pyarrow.int64()
+
+
+class PandasFileSource(FileSource):
+    # a custom source whose `get_sample` predates `as_arrow`
+    def get_sample(self, entity, n=100, columns=None):
+        return super().get_sample(entity, n=n, columns=columns)
+
+
+def test_cached_sample_of_source_without_as_arrow(tmp_path):
+    pq.write_table(pyarrow.table({'id': [1, 2, 3]}), tmp_path / 'customers.parquet')
+    root, prefix = str(tmp_path).lstrip('/').split('/', 1)
+    source = PandasFileSource(root, prefix=prefix)
+    ent = source.get_entities()[0]
+    table = source.get_cached_sample(ent, n=10, as_arrow=True)
+    assert isinstance(table, pyarrow.Table)
+    assert table.column('id').to_pylist() == [1, 2, 3]
+    assert source.get_cached_sample(ent, n=10)['id'].tolist() == [1, 2, 3]
+
+
+def test_tablesample_with_one_pooled_connection(monkeypatch):
+    def respond(sql, params):
+        if 'reltuples' in str(sql):
+            return ['table_catalog', 'table_schema', 'table_name', 'row_estimate'], [('db', 'public', 'things', 1000)]
+        return ['id'], [(1,), (2,)]
+
+    # the fake connection can't quote, only the query's text is checked
+    monkeypatch.setattr(psycopg2.sql.Composed, 'as_string', lambda self, context: repr(self))
+    source = PostgresSource('host', 'user', 'pw', 5432, 'db', max_workers=1,
+            connection_factory=lambda database: FakeConnection(respond))
+    ent = Entity(source, 'db.public.things', columns=['id'], column_type_map={'id': 'int32'})
+    result = {}
+    sampler = threading.Thread(target=lambda: result.setdefault(
+            'sample', source.get_sample(ent, n=2, method='system', as_arrow=True)), daemon=True)
+    sampler.start()
+    sampler.join(timeout=10)
+    assert not sampler.is_alive()
+    assert result['sample'].column('id').to_pylist() == [1, 2]
+
+
+def test_parquet_sample_stops_at_n_rows(tmp_path, monkeypatch):
+    pq.write_table(pyarrow.table({'id': list(range(30))}), tmp_path / 'things.parquet', row_group_size=10)
+    decoded = []
+    iter_batches = pq.ParquetFile.iter_batches
+
+    def counting(self, *args, **kwargs):
+        for batch in iter_batches(self, *args, **kwargs):
+            decoded.append(batch.num_rows)
+            yield batch
+
+    monkeypatch.setattr(pq.ParquetFile, 'iter_batches', counting)
+    source = file_source(tmp_path)
+    ent = source.get_entities()[0]
+    assert source.get_sample(ent, n=10, as_arrow=True).column('id').to_pylist() == list(range(10))
+    assert decoded == [10]
+    assert source.get_sample(ent, n=0, as_arrow=True).num_rows == 0
+    assert decoded == [10]
+
+
+def test_composite_foreign_keys_are_ordered_tuples():
+    def respond(sql, params):
+        if "contype = 'f'" in sql:
+            return FK_COLUMNS, [
+                ('fk_note_line', 'db', 'public', 'line_notes', ['order_id', 'line_no'], 'public', 'order_lines', ['order_id', 'line_no']),
+                ('fk_line_order', 'db', 'public', 'order_lines', ['order_id'], 'public', 'orders', ['id']),
+            ]
+        return CATALOG_COLUMNS, [
+            ('db', 'public', 'line_notes', 'line_no', 1, 'integer', 'NO'),
+            ('db', 'public', 'line_notes', 'order_id', 2, 'integer', 'NO'),
+            ('db', 'public', 'order_lines', 'order_id', 1, 'integer', 'NO'),
+            ('db', 'public', 'order_lines', 'line_no', 2, 'integer', 'NO'),
+            ('db', 'public', 'orders', 'id', 1, 'integer', 'NO'),
+        ]
+
+    source = PostgresSource('host', 'user', 'pw', 5432, 'db', stream=True, fetch_size=1,
+            connection_factory=lambda database: FakeConnection(respond))
+    edges = [(a.identifier, b.identifier, ka, kb) for a, b, ka, kb in source.get_defined_edges()]
+    assert edges == [
+        ('db.public.line_notes', 'db.public.order_lines', ('order_id', 'line_no'), ('order_id', 'line_no')),
+        ('db.public.order_lines', 'db.public.orders', 'order_id', 'id'),
+    ]
+    notes = source._entity_index['db.public.line_notes']
+    touching = source.get_defined_edges(touching=[notes])
+    assert [(ka, kb) for _, _, ka, kb in touching] == [(('order_id', 'line_no'), ('order_id', 'line_no')), ('order_id', 'id')]
+
+
+def test_streamed_batches_and_named_cursor_cleanup(monkeypatch):
+    monkeypatch.setattr(psycopg2.sql.Composed, 'as_string', lambda self, context: repr(self))
+    connections = []
+
+    def connect(database):
+        connections.append(FakeConnection(lambda sql, params: (['id'], [(i,) for i in range(5)])))
+        return connections[-1]
+
+    source = PostgresSource('host', 'user', 'pw', 5432, 'db', fetch_size=2, connection_factory=connect)
+    ent = Entity(source, 'db.public.things', columns=['id'])
+    batches = list(source.iter_batches(ent, batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert [v for batch in batches for v in batch.column('id').to_pylist()] == list(range(5))
+    con, = connections
+    assert con.cursors[-1].name.startswith('entitygraph_') and con.cursors[-1].closed
+    assert con.rollbacks == 1
+
+    # abandoning a stream still closes its cursor and ends the transaction
+    stream = source.iter_batches(ent, batch_size=2)
+    next(stream)
+    stream.close()
+    assert con.cursors[-1].closed and con.rollbacks == 2
+
+    rows = source._iter_query('SELECT id FROM things', con=con)
+    assert next(rows).id == 0
+    rows.close()
+    assert con.cursors[-1].closed and con.rollbacks == 3
+    assert con.cursors[-1].itersize == 2
@@ -0,0 +1,26 @@
+from entitygraph.keys import pk_candidates
+from entitygraph.stats import ColumnStats, TableStats, inclusion_dependencies
+
+
+def test_small_integers_need_a_name_or_common_values():
+    ids = ColumnStats(n_distinct=-1, histogram_bounds=range(1, 1001, 10))
+    columns = [
+        (('customers', 'id'), ids, 1000),
+        # contained in `customers.id` by range alone
+        (('orders', 'quantity'), ColumnStats(n_distinct=10, most_common_vals=range(1, 11)), 5000),
+        (('orders', 'customer_id'), ColumnStats(n_distinct=900, histogram_bounds=range(1, 1001, 10)), 5000),
+        (('orders', 'buyer'), ColumnStats(n_distinct=900, most_common_vals=[3, 5], histogram_bounds=range(1, 1001, 10)), 5000),
+    ]
+    found = inclusion_dependencies(columns)
+    assert [(columns[i][0], columns[j][0]) for i, j, _ in found] == [(('orders', 'customer_id'), ('customers', 'id'))]
+
+    columns[0] = (('customers', 'id'), ColumnStats(n_distinct=-0.95, most_common_vals=[3, 5], histogram_bounds=range(1, 1001, 10)), 1000)
+    found = inclusion_dependencies(columns)
+    assert sorted(columns[i][0][1] for i, _, _ in found) == ['buyer', 'customer_id']
+
+
+def test_statistics_of_too_few_rows_elect_nothing():
+    stats = TableStats(1, {'id': ColumnStats(n_distinct=-1)})
+    assert pk_candidates('db.public.t', ['id'], scores=stats.scores(['id']), rows=stats.rows) == []
+    stats = TableStats(100, {'id': ColumnStats(n_distinct=-1)})
+    assert pk_candidates('db.public.t', ['id'], scores=stats.scores(['id']), rows=stats.rows) == ['id']